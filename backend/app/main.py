@@ -1,6 +1,7 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
@@ -8,8 +9,15 @@ from pathlib import Path
 from pydantic import BaseModel
 
 # Import route modules
-from .routes import caddie, course_ai, mcp, media, sponsor, swing, chatbot
-from .services.golf_chatbot import get_golf_chat_response
+from .middleware.admission import AdmissionControlMiddleware
+from .middleware.metrics import MetricsMiddleware
+from .middleware.profiling import ProfilingMiddleware
+from .routes import admin, caddie, course_ai, mcp, media, sponsor, swing, chatbot
+from .services.golf_chatbot import get_golf_chat_response, get_golf_chatbot
+from .services.knowledge_retrieval import get_knowledge_index
+from .services.linkedin_auth import get_token_manager
+from .services.linkedin_invitations import get_invitation_dispatcher
+from .services.metrics import get_metrics_registry
 
 class ChatMessage(BaseModel):
     message: str
@@ -32,11 +40,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); added before admission control so shed requests are never profiled
+app.add_middleware(ProfilingMiddleware)
+
+# Per-player and global rate limits plus load shedding for the media and swing APIs
+app.add_middleware(AdmissionControlMiddleware)
+
+# Per-route latency, status and payload size metrics; outermost, so shed requests are counted too (under their router prefix)
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+def load_golf_knowledge():
+    """Build the chatbot and its knowledge index before the first question"""
+    get_knowledge_index()
+    get_golf_chatbot()
+
+@app.on_event("startup")
+def resume_invitation_outbox():
+    """Fetch the LinkedIn token and resume delivering invitations left in the outbox by a previous run"""
+    get_token_manager().start()
+    get_invitation_dispatcher().start()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "OnlyGolfers DAC-SMART"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
+
 # Direct golf chat endpoint for compatibility
 @app.post("/api/golf-chat", response_model=ChatResponse)
 async def golf_chat_direct(chat_message: ChatMessage):
@@ -57,6 +91,7 @@ app.include_router(media.router, prefix="/api/media", tags=["media"])
 app.include_router(sponsor.router, prefix="/api/sponsor", tags=["sponsor"])
 app.include_router(swing.router, prefix="/api/swing", tags=["swing"])
 app.include_router(chatbot.router, prefix="/api/golf", tags=["chatbot"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
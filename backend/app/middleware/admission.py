@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+from backend.app.services.job_queue import DEFAULT_WORKERS, get_job_queue
+from backend.app.services.rate_limiter import SharedTokenBuckets, get_shared_buckets
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_PREFIXES = ("/api/media", "/api/swing")
+PLAYER_RATE = float(os.getenv("ADMISSION_PLAYER_RATE", "2"))
+PLAYER_BURST = float(os.getenv("ADMISSION_PLAYER_BURST", "20"))
+GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "200"))
+GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "400"))
+# Reads (job polling, SSE streams) have their own per-player budget, apart from the POST one
+READ_RATE = float(os.getenv("ADMISSION_READ_RATE", "20"))
+READ_BURST = float(os.getenv("ADMISSION_READ_BURST", "60"))
+# Every request also draws on a bucket for its client address, this many
+# players' worth, so rotating player ids from one address gains little while
+# a few players behind one NAT (a range's wifi) are not throttled as one
+PLAYERS_PER_CLIENT = float(os.getenv("ADMISSION_PLAYERS_PER_CLIENT", "5"))
+# New work is refused while this many analysis jobs are already waiting
+SHED_QUEUE_DEPTH = int(os.getenv("ADMISSION_SHED_QUEUE_DEPTH", "500"))
+QUEUE_DEPTH_REFRESH_SECONDS = 1.0
+# Bodies up to this size are peeked at for a player id when no header names one
+MAX_PEEK_BYTES = 64 * 1024
+
+_PLAYER_PATH = re.compile(r"^/api/swing/(?:analysis-history|trends)/([^/]+)")
+_PLAYER_FIELDS = ("player_id", "from", "From")
+
+class AdmissionControlMiddleware:
+    """
+    Token-bucket admission control and load shedding for the media and swing APIs
+
+    Each player gets its own bucket for POSTs (429 when empty) and all
+    players share a global one (503 when empty); both live in a shared memory
+    map so every uvicorn worker enforces the same limits. POSTs add work and
+    are shed with 503 while the analysis queue is deeper than
+    SHED_QUEUE_DEPTH. Reads such as job polling and SSE streams draw on a
+    separate, larger per-player bucket, so polling never eats into the
+    budget for submitting work.
+    The player is taken from X-Player-Id, a player_id query parameter, the
+    path, or (for small JSON bodies) the payload, falling back to client IP.
+    Those ids are client-supplied, so each request is also charged to a
+    bucket for its client address (PLAYERS_PER_CLIENT times the player
+    budget); behind a proxy, run uvicorn with --proxy-headers so the address
+    is the real client's.
+    """
+
+    def __init__(self, app, prefixes: Tuple[str, ...] = ADMISSION_PREFIXES,
+                 buckets: Optional[SharedTokenBuckets] = None):
+        self.app = app
+        self.prefixes = prefixes
+        self.buckets = buckets
+        self._queue_depth = 0
+        self._depth_checked_at = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        buckets = self.buckets or get_shared_buckets()
+        client = self._client_key(scope)
+        if scope["method"] != "POST":
+            player, receive = await self._player_key(scope, receive)
+            allowed, wait = self._acquire_for(buckets, "read", player, client, READ_RATE, READ_BURST, time.time())
+            if not allowed:
+                await self._reject(send, 429, "Too many requests for this player", wait)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        depth = await self._current_queue_depth()
+        if depth >= SHED_QUEUE_DEPTH:
+            # Roughly how long the workers need to get back under the threshold
+            retry_after = (depth - SHED_QUEUE_DEPTH + 1) / max(1, DEFAULT_WORKERS)
+            await self._reject(send, 503, "Swing analysis is at capacity, please retry later", retry_after)
+            return
+
+        player, receive = await self._player_key(scope, receive)
+        now = time.time()
+        allowed, wait = self._acquire_for(buckets, "player", player, client, PLAYER_RATE, PLAYER_BURST, now)
+        if not allowed:
+            await self._reject(send, 429, "Too many requests for this player", wait)
+            return
+        allowed, wait = buckets.acquire("global", GLOBAL_RATE, GLOBAL_BURST, now)
+        if not allowed:
+            await self._reject(send, 503, "Server is busy, please retry later", wait)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _acquire_for(buckets: SharedTokenBuckets, kind: str, player: str, client: str,
+                     rate: float, burst: float, now: float) -> Tuple[bool, float]:
+        # The player first, so a player retrying while throttled doesn't drain
+        # the address's budget for the others behind it
+        allowed, wait = buckets.acquire(f"{kind}:{player}", rate, burst, now)
+        if not allowed:
+            return allowed, wait
+        return buckets.acquire(f"{kind}-client:{client}", rate * PLAYERS_PER_CLIENT,
+                               burst * PLAYERS_PER_CLIENT, now)
+
+    @staticmethod
+    def _client_key(scope) -> str:
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "anonymous"
+
+    async def _current_queue_depth(self) -> int:
+        # The depth is a COUNT over SQLite: sampled at most once a second, in a
+        # thread so the event loop never waits on the database
+        now = time.monotonic()
+        if now - self._depth_checked_at >= QUEUE_DEPTH_REFRESH_SECONDS:
+            self._depth_checked_at = now
+            try:
+                self._queue_depth = await asyncio.to_thread(get_job_queue().depth)
+            except Exception as e:
+                logger.warning(f"Could not read job queue depth: {e}")
+        return self._queue_depth
+
+    async def _player_key(self, scope, receive):
+        for name, value in scope["headers"]:
+            if name == b"x-player-id" and value:
+                return value.decode("latin-1"), receive
+
+        query = scope.get("query_string") or b""
+        if b"player_id=" in query:
+            values = parse_qs(query.decode("latin-1")).get("player_id")
+            if values:
+                return values[0], receive
+
+        match = _PLAYER_PATH.match(scope["path"])
+        if match:
+            return match.group(1), receive
+
+        if scope["method"] == "POST":
+            player, receive = await self._player_from_body(scope, receive)
+            if player:
+                return player, receive
+
+        return self._client_key(scope), receive
+
+    async def _player_from_body(self, scope, receive):
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length")
+        if b"json" not in headers.get(b"content-type", b"") or not length or int(length) > MAX_PEEK_BYTES:
+            return None, receive
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None, receive
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None, replay
+        if isinstance(payload, dict):
+            for field in _PLAYER_FIELDS:
+                if payload.get(field):
+                    return str(payload[field]), replay
+        return None, replay
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(min(retry_after, 3600)))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
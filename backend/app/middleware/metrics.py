@@ -0,0 +1,93 @@
+import os
+import time
+
+from backend.app.services.metrics import SIZE_BUCKETS, MetricsRegistry, get_metrics_registry
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Requests that matched no route share one label, so scanners cannot blow up the series count
+UNMATCHED_ROUTE = "<unmatched>"
+# Path segments that make up a router prefix (/api/swing)
+PREFIX_SEGMENTS = 2
+
+class MetricsMiddleware:
+    """
+    Per-route request metrics for Prometheus
+
+    Records, labelled by method and route template (e.g.
+    /api/swing/jobs/{job_id}): a latency histogram, a request counter by
+    status code, request and response body size histograms, and a gauge of
+    requests in flight. The route template is read from the scope after the
+    router has matched it, so recording costs a few dict and list updates
+    per request and nothing per body chunk beyond a length.
+
+    Requests that never reach a route, such as those admission control
+    sheds with 429/503 (or 404s), are labelled with the router prefix they
+    were aimed at, e.g. /api/swing/*. Only prefixes of registered routes
+    are used and anything else is <unmatched>, so the label set stays bounded.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = None, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+        self._prefixes = None
+        registry = registry or get_metrics_registry()
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by status code", ("method", "route", "status"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests currently being served", ("method",))
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "HTTP request body size", ("method", "route"), buckets=SIZE_BUCKETS)
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "HTTP response body size", ("method", "route"), buckets=SIZE_BUCKETS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        sizes = [0, 0]  # request bytes, response bytes
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        self.in_flight.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight.dec((method,))
+            labels = (method, self._route_label(scope))
+            self.latency.observe(elapsed, labels)
+            self.requests.inc(labels + (str(status[0]),))
+            self.request_size.observe(sizes[0], labels)
+            self.response_size.observe(sizes[1], labels)
+
+    @staticmethod
+    def _prefix(path: str) -> str:
+        return "/".join(path.split("/")[:PREFIX_SEGMENTS + 1])
+
+    def _route_label(self, scope) -> str:
+        path = getattr(scope.get("route"), "path", None)
+        if path:
+            return path
+        if self._prefixes is None:
+            # Starlette puts the application in the scope before any middleware runs
+            routes = getattr(scope.get("app"), "routes", ())
+            self._prefixes = frozenset(self._prefix(r.path) for r in routes if getattr(r, "path", None))
+        prefix = self._prefix(scope["path"])
+        return prefix + "/*" if prefix in self._prefixes else UNMATCHED_ROUTE
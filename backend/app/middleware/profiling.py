@@ -0,0 +1,101 @@
+import asyncio
+import functools
+import hmac
+import logging
+import random
+import time
+
+from fastapi.routing import APIRoute
+
+from backend.app.services.profiling import (
+    ADMIN_TOKEN, PROFILE_SAMPLE_RATE, ProfileStore, RequestProfile, current_profile,
+    get_profile_store, reset_current_profile, set_current_profile
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SKIP_PREFIXES = ("/metrics", "/api/admin")
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling
+
+    A request is profiled when it carries X-Profile set to the admin token,
+    or at random for a PROFILE_SAMPLE_RATE fraction of traffic. The event
+    loop thread runs under cProfile for the whole request, which covers
+    async handlers end to end (other requests' work on the loop while this
+    one awaits shows up too); sync handlers on routers built with
+    ProfiledRoute are profiled in their threadpool thread as well. The
+    profile is saved with its route and timing, and the response carries
+    X-Profile-Id to look it up under /api/admin/profiles.
+
+    One request is profiled at a time; others pass through untouched.
+    """
+
+    def __init__(self, app, store: ProfileStore = None, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._active = False
+
+    def _requested(self, scope) -> bool:
+        if ADMIN_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    # Bytes, not str: compare_digest rejects non-ASCII str with TypeError
+                    return hmac.compare_digest(value, ADMIN_TOKEN.encode("utf-8"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or self._active or scope["path"].startswith(PROFILE_SKIP_PREFIXES)
+                or not self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status = [None]
+
+        async def tagging_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        self._active = True
+        token = set_current_profile(profile)
+        started = time.perf_counter()
+        profile.profilers[0].enable()
+        try:
+            await self.app(scope, receive, tagging_send)
+        finally:
+            profile.profilers[0].disable()
+            duration = time.perf_counter() - started
+            reset_current_profile(token)
+            self._active = False
+            route = getattr(scope.get("route"), "path", None)
+            try:
+                # Writing the profile is file I/O; keep it off the event loop
+                await asyncio.get_running_loop().run_in_executor(
+                    None, (self.store or get_profile_store()).save, profile, route, status[0], duration)
+                logger.info(f"Profiled {profile.method} {profile.path} in {duration * 1000:.0f} ms as {profile.id}")
+            except Exception as e:
+                logger.error(f"Could not save profile {profile.id}: {e}")
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoints are also profiled in the threadpool thread
+    they run in, when their request is being profiled
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            def profiled_call(*args, **kwargs):
+                profile = current_profile()
+                if profile is None:
+                    return call(*args, **kwargs)
+                return profile.run_profiled(call, *args, **kwargs)
+            self.dependant.call = profiled_call
+        return super().get_route_handler()
@@ -14,6 +14,10 @@ class PlayerProfile(BaseModel):
     handicap: Optional[float] = None
     favorite_courses: Optional[List[str]] = []
     equipment_preferences: Optional[Dict[str, str]] = {}
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    distance_km: Optional[float] = None
+    compatibility_score: Optional[float] = None
 
 class AlternativeClub(BaseModel):
     club: str
@@ -65,8 +69,13 @@ class SwingAnalysis(BaseModel):
     pro_comparison: Optional[ProComparison] = None
     analysis_timestamp: Optional[str] = None
     video_context: Optional[Dict[str, str]] = {}
+    content_hash: Optional[str] = None
+    analyzer_version: Optional[str] = None
+    swing_features: Optional[Dict[str, Any]] = None
+    near_duplicate_of: Optional[str] = None
 
 class SponsorOffer(BaseModel):
+    campaign_id: Optional[str] = None
     sponsor_name: str
     offer_text: str
     url: Optional[str] = None
@@ -82,6 +91,7 @@ class MediaUpload(BaseModel):
     voice_tag: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = {}
     analysis_requested: Optional[bool] = True
+    message_id: Optional[str] = None  # provider message id, used to drop webhook retries
 
 class CourseConditions(BaseModel):
     wind_speed: float
@@ -0,0 +1,39 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from backend.app.services.profiling import ADMIN_TOKEN, get_profile_store
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints answer only to X-Admin-Token, and not at all while ADMIN_TOKEN is unset"""
+    supplied = (x_admin_token or "").encode("utf-8")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """
+    Recent request profiles, newest first
+
+    Profile a request by sending it with X-Profile set to the admin token
+    (or enable PROFILE_SAMPLE_RATE); its response carries X-Profile-Id.
+    """
+    return {"profiles": get_profile_store().recent(limit)}
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """A profile's route and timing metadata with its slowest functions"""
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/profiles/{profile_id}/download")
+def download_profile(profile_id: str):
+    """The raw profile, in pstats format (python -m pstats <file>, or snakeviz)"""
+    path = get_profile_store().profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -3,8 +3,9 @@ from fastapi import APIRouter, Query, HTTPException
 from typing import Optional
 from backend.app.models import ShotRecommendation
 from backend.app.services.ai_caddie import get_ai_shot_recommendation
+from backend.app.middleware.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/recommend-shot", response_model=ShotRecommendation)
 def recommend_shot(
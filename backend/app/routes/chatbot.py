@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict
 from pydantic import BaseModel
-from backend.app.services.golf_chatbot import get_golf_chat_response
+import asyncio
+import json
+from backend.app.services.conversation_store import get_conversation_store, merge_context
+from backend.app.services.golf_chatbot import get_golf_chat_response, get_golf_chatbot, iter_answer_chunks
+from backend.app.middleware.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# How often a stream checks whether its client went away while it waits for the answer
+STREAM_DISCONNECT_POLL_SECONDS = 0.1
 
 class ChatMessage(BaseModel):
     message: str
     context: Optional[List[Dict]] = []
     player_id: Optional[str] = None
+    conversation_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -19,24 +28,100 @@ class ChatResponse(BaseModel):
 def golf_chat(chat_message: ChatMessage):
     """
     Get AI-powered golf advice and answers through chat interface
+
+    Conversations are kept server-side: send back the returned
+    conversation_id with just the new message. A client-supplied context
+    list is added after the stored turns, skipping turns already stored.
     """
     try:
         from datetime import datetime
+
+        store = get_conversation_store()
+        conversation_id, history = store.open(chat_message.conversation_id, chat_message.player_id)
         
         response_text = get_golf_chat_response(
             message=chat_message.message,
-            context=chat_message.context
+            context=merge_context(history, chat_message.context)
         )
+        store.append(conversation_id, "user", chat_message.message)
+        store.append(conversation_id, "assistant", response_text)
         
         return ChatResponse(
             response=response_text,
             timestamp=datetime.now().isoformat(),
-            conversation_id=f"conv_{chat_message.player_id or 'guest'}_{int(datetime.now().timestamp())}"
+            conversation_id=conversation_id
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
 
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def golf_chat_stream(chat_message: ChatMessage, request: Request):
+    """
+    Stream a chat answer as server-sent events
+
+    A "start" event carrying the conversation_id goes out before any work is
+    done. The chatbot answers in one piece (a knowledge lookup, not token
+    generation), so the whole answer is computed in a worker thread and then
+    sent as word-group "chunk" events, followed by a final "done". If the
+    client disconnects the stream stops and the turn is not recorded; a
+    lookup already running in its thread still completes, its answer unused.
+    """
+    store = get_conversation_store()
+    conversation_id, history = store.open(chat_message.conversation_id, chat_message.player_id)
+
+    async def event_stream():
+        from datetime import datetime
+
+        yield _sse("start", {"conversation_id": conversation_id})
+
+        answer = asyncio.ensure_future(asyncio.to_thread(
+            get_golf_chat_response, chat_message.message, merge_context(history, chat_message.context)
+        ))
+        try:
+            while not answer.done():
+                await asyncio.wait({answer}, timeout=STREAM_DISCONNECT_POLL_SECONDS)
+                if not answer.done() and await request.is_disconnected():
+                    return
+            response_text = answer.result()
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error processing chat message: {str(e)}"})
+            return
+        finally:
+            # Detaches an abandoned answer; the thread itself cannot be interrupted
+            answer.cancel()
+
+        for chunk in iter_answer_chunks(response_text):
+            if await request.is_disconnected():
+                return
+            yield _sse("chunk", {"text": chunk})
+
+        store.append(conversation_id, "user", chat_message.message)
+        store.append(conversation_id, "assistant", response_text)
+        yield _sse("done", {
+            "conversation_id": conversation_id,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat/cache-stats")
+def get_chat_cache_stats():
+    """
+    Answer cache and conversation store metrics for the golf chatbot
+    """
+    return {
+        "answer_cache": get_golf_chatbot().answer_cache.metrics(),
+        "conversations": get_conversation_store().metrics()
+    }
+
 @router.get("/golf-tips")
 def get_daily_golf_tips():
     """
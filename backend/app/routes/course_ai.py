@@ -4,8 +4,9 @@ from pydantic import BaseModel
 from typing import Dict, Optional
 import json
 from ..services.course_ai import get_real_time_strategy, get_enhanced_strategy, store_shot_result
+from ..middleware.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/course-ai", tags=["Course AI"])
+router = APIRouter(prefix="/course-ai", tags=["Course AI"], route_class=ProfiledRoute)
 
 class StrategyRequest(BaseModel):
     weather_data: Dict
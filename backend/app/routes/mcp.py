@@ -1,18 +1,109 @@
 
-from fastapi import APIRouter, Query, HTTPException
-from typing import List
+from fastapi import APIRouter, Query, HTTPException, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from backend.app.models import PlayerProfile
 from backend.app.services.linkedin_agent import search_golfers, send_linkedin_invitation
+from backend.app.services.linkedin_invitations import get_invitation_batch, queue_invitations
+from backend.app.services.player_matching import match_players
+from backend.app.middleware.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+class InvitationItem(BaseModel):
+    linkedin_member_id: str
+    message: Optional[str] = None  # falls back to the batch message
+
+class BulkInvitationRequest(BaseModel):
+    invitations: List[InvitationItem] = Field(..., min_length=1)
+    message: Optional[str] = None
 
 @router.get("/search-players", response_model=List[PlayerProfile])
-def search_players_nearby(location: str = Query(...)):
-    results = search_golfers(location)
+def search_players_nearby(
+    response: Response,
+    location: Optional[str] = Query(None),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0),
+    k: Optional[int] = Query(None, ge=1, le=1000),
+    skill_level: Optional[str] = None,
+    min_handicap: Optional[float] = None,
+    max_handicap: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Players near a location (name or lat/lon), nearest first
+
+    radius_km bounds the search (50 km by default); k asks for the k nearest
+    instead (within radius_km if also given). A location name no profile
+    carries lists players unranked, without distance_km. The next page's
+    cursor is returned in the X-Next-Cursor header.
+    """
+    try:
+        results, next_cursor = search_golfers(
+            location, latitude=lat, longitude=lon, radius_km=radius_km, k=k,
+            skill_level=skill_level, min_handicap=min_handicap, max_handicap=max_handicap,
+            limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [PlayerProfile(**p) for p in results]
+
+@router.get("/match-players", response_model=List[PlayerProfile])
+def match_playing_partners(
+    player_id: str = Query(...),
+    k: int = Query(10, ge=1, le=100),
+    radius_km: Optional[float] = Query(None, gt=0)
+):
+    """
+    Most compatible playing partners for a player (handicap, skill level,
+    interests and favourite courses), optionally only those within radius_km
+    """
+    try:
+        results = match_players(player_id, k=k, radius_km=radius_km)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Player not found")
     return [PlayerProfile(**p) for p in results]
 
 @router.post("/send-invitation")
-def send_invitation(linkedin_member_id: str, message: str):
-    if send_linkedin_invitation(linkedin_member_id, message):
+def send_invitation(linkedin_member_id: str, message: str, response: Response):
+    """Send one invitation; 202 with its id when delivery is still under way after a short wait"""
+    invitation = send_linkedin_invitation(linkedin_member_id, message)
+    if invitation["status"] == "sent":
         return {"status": "sent", "to": linkedin_member_id}
-    raise HTTPException(status_code=500, detail="Failed to send invitation")
+    if invitation["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to send invitation: {invitation['error']}")
+    response.status_code = 202
+    return {"status": "queued", "to": linkedin_member_id, "invitation_id": invitation["id"]}
+
+@router.post("/send-invitations", status_code=202)
+def send_invitations(bulk_request: BulkInvitationRequest):
+    """
+    Queue invitations for a whole list of players (e.g. an event's field)
+
+    Delivery runs in the background at the provider's rate limit; poll
+    GET /invitations/{batch_id} for progress.
+    """
+    invitations = []
+    for item in bulk_request.invitations:
+        message = item.message or bulk_request.message
+        if not message:
+            raise HTTPException(status_code=400, detail=f"No message for {item.linkedin_member_id}")
+        invitations.append({"member_id": item.linkedin_member_id, "message": message})
+    try:
+        batch = queue_invitations(invitations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing invitations: {str(e)}")
+    return {**batch, "status_url": f"/api/mcp/invitations/{batch['batch_id']}"}
+
+@router.get("/invitations/{batch_id}")
+def get_invitations(batch_id: str):
+    batch = get_invitation_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Invitation batch not found")
+    return batch
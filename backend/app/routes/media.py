@@ -1,70 +1,121 @@
-
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from urllib.parse import parse_qs
+import json
+import os
 from backend.app.models import MediaUpload, SwingAnalysis
-from backend.app.services.swing_analysis import analyze_swing
-from backend.app.services.media_processor import process_media_upload, extract_voice_tag
+from backend.app.services.idempotency import get_idempotency_store, idempotency_key
+from backend.app.services.job_queue import get_job_queue
+from backend.app.services.media_ingest import parse_whatsapp_payload, analyze_media_upload, enqueue_media_upload
+from backend.app.middleware.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# "async" acknowledges webhooks immediately and analyses in the background; "sync" analyses inline
+WHATSAPP_WEBHOOK_MODE = os.getenv("WHATSAPP_WEBHOOK_MODE", "async").lower()
 
-router = APIRouter()
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="This upload is already being processed",
+        headers={"Retry-After": "5"}
+    )
+
+def _job_failed(ack: dict) -> bool:
+    """Whether the analysis job behind a stored webhook acknowledgement has failed"""
+    job = get_job_queue().get(ack["job_id"]) if ack.get("job_id") else None
+    return job is not None and job["status"] == "failed"
 
 @router.post("/receive", response_model=SwingAnalysis)
 def receive_media(upload: MediaUpload):
     """
     Receive media upload from WhatsApp (Meta Ray-Ban Smart Glasses)
     and automatically analyze swing footage
+
+    Re-sent uploads (same message id, or same player and video URL) replay
+    the stored analysis instead of running it again.
     """
+    store = get_idempotency_store()
+    # Keys are per endpoint: /receive replays analyses, the webhook replays acknowledgements
+    key = "receive:" + idempotency_key(upload.model_dump())
+    seen = store.claim(key)
+    if seen is not None:
+        if seen["status"] == "pending":
+            raise _in_progress()
+        return SwingAnalysis(**seen["response"])
+
     try:
-        # Process the media upload (validate, log, etc.)
-        processed_upload = process_media_upload(upload)
-        
-        # Extract voice tag if audio is present (stubbed for now)
-        if not upload.voice_tag and upload.video_url:
-            extracted_voice_tag = extract_voice_tag(upload.video_url)
-            processed_upload.voice_tag = extracted_voice_tag
-        
-        # Analyze the swing using existing analysis service
-        analysis_result = analyze_swing(processed_upload.video_url)
-        
-        # Enhance analysis with metadata from upload
-        enhanced_analysis = {
-            **analysis_result,
-            "video_url": processed_upload.video_url,
-            "summary": f"Analysis for player {processed_upload.player_id}: {analysis_result['summary']}",
-            "advice": f"{analysis_result['advice']} (Analyzed from WhatsApp upload at {processed_upload.timestamp or 'unknown time'})"
-        }
-        
-        return SwingAnalysis(**enhanced_analysis)
+        analysis = analyze_media_upload(upload)
+        store.complete(key, analysis)
+        return SwingAnalysis(**analysis)
         
     except Exception as e:
+        store.release(key)
         raise HTTPException(status_code=500, detail=f"Media processing failed: {str(e)}")
 
+async def webhook_payload(request: Request) -> dict:
+    """The webhook body: JSON, or the form encoding Twilio posts"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/x-www-form-urlencoded":
+        fields = parse_qs(body.decode("utf-8", "replace"), keep_blank_values=True)
+        return {name: values[0] for name, values in fields.items()}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body must be JSON or form-encoded")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid WhatsApp payload format")
+    return payload
+
 @router.post("/webhook")
-def whatsapp_webhook(payload: dict):
+def whatsapp_webhook(payload: dict = Depends(webhook_payload)):
     """
     WhatsApp webhook endpoint for Twilio/WhatsApp Cloud API
     Simulates receiving media from Meta Ray-Ban Smart Glasses
+
+    In async mode the upload is validated, persisted to the durable job queue
+    and acknowledged right away; the analysis is pushed to the player when done.
+    Provider retries of the same message get the original acknowledgement
+    back, unless its queued analysis failed, in which case the retry queues
+    it again.
     """
     try:
-        # Extract media URL and metadata from WhatsApp payload
-        # This is a simplified simulation - real implementation would parse Twilio/WhatsApp format
-        if "media_url" in payload and "from" in payload:
-            upload = MediaUpload(
-                player_id=payload.get("from", "unknown"),
-                video_url=payload["media_url"],
-                timestamp=payload.get("timestamp"),
-                voice_tag=payload.get("caption", payload.get("voice_tag"))
-            )
-            
-            # Process through main media handler
-            analysis = receive_media(upload)
-            
-            return {
-                "status": "success",
-                "message": "Swing analysis complete",
-                "analysis_summary": analysis.summary,
-                "player_id": upload.player_id
-            }
-        else:
-            raise HTTPException(status_code=400, detail="Invalid WhatsApp payload format")
+        upload = parse_whatsapp_payload(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if WHATSAPP_WEBHOOK_MODE == "sync":
+        # Process through main media handler (which deduplicates itself)
+        analysis = receive_media(upload)
+        return {
+            "status": "success",
+            "message": "Swing analysis complete",
+            "analysis_summary": analysis.summary,
+            "player_id": upload.player_id
+        }
+
+    store = get_idempotency_store()
+    key = "webhook:" + idempotency_key(upload.model_dump())
+    seen = store.claim(key)
+    if seen is not None and seen["status"] == "completed" and _job_failed(seen["response"]):
+        store.forget(key)
+        seen = store.claim(key)
+    if seen is not None:
+        if seen["status"] == "pending":
+            raise _in_progress()
+        return {**seen["response"], "duplicate": True}
+
+    try:
+        job_id = enqueue_media_upload(upload)
+        ack = {
+            "status": "accepted",
+            "message": "Swing analysis queued",
+            "job_id": job_id,
+            "player_id": upload.player_id
+        }
+        store.complete(key, ack)
+        return ack
             
     except Exception as e:
+        store.release(key)
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
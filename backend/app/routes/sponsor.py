@@ -1,12 +1,42 @@
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import List
 from backend.app.models import PlayerProfile, SponsorOffer
+from backend.app.services.job_queue import get_job_queue
+from backend.app.services.sponsor_batch import submit_sponsor_matching
 from backend.app.services.sponsor_match import match_sponsors
+from backend.app.services.sponsor_offers import get_offer_store
+from backend.app.middleware.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/match", response_model=List[SponsorOffer])
 def sponsor_match(player: PlayerProfile):
     offers = match_sponsors(player)
     return [SponsorOffer(**o) for o in offers]
+
+@router.post("/rematch", status_code=202)
+def sponsor_rematch():
+    """
+    Queue a bulk re-match of every player against the current campaigns
+
+    /match serves the resulting offers table; run nightly (or after large
+    campaign changes) with this endpoint or `python -m backend.app.services.sponsor_batch`.
+    """
+    try:
+        job_id = submit_sponsor_matching()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing sponsor matching: {str(e)}")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/sponsor/rematch/{job_id}"}
+
+@router.get("/rematch/status")
+def sponsor_rematch_status():
+    """When the offers table was last rebuilt, for how many players and which campaign version"""
+    return get_offer_store().status()
+
+@router.get("/rematch/{job_id}")
+def sponsor_rematch_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,10 +1,38 @@
 
-from fastapi import APIRouter, HTTPException, Body
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
 from backend.app.models import SwingAnalysis, MediaUpload
-from backend.app.services.swing_analysis import analyze_swing
+from backend.app.services.swing_analysis import analyze_swing_cached
+from backend.app.services.job_queue import get_job_queue
+from backend.app.services.swing_jobs import submit_swing_analysis
+from backend.app.services.swing_compare import compare_swings_parallel
+from backend.app.services.swing_history import get_swing_history_store
+from backend.app.services.swing_session import analyze_session
+from backend.app.middleware.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+JOB_EVENT_POLL_SECONDS = 0.25
+
+class SwingJobRequest(BaseModel):
+    video_url: str
+    metadata: Optional[Dict[str, Any]] = None
+    player_id: Optional[str] = None
+    priority: int = 0
+
+class SwingSessionRequest(BaseModel):
+    video_urls: List[str]
+    metadata: Optional[Dict[str, Any]] = None
+    player_id: Optional[str] = None
+
+class SwingCompareRequest(BaseModel):
+    video_urls: List[str]
+    baseline_index: int = 0
+    metadata: Optional[Dict[str, Any]] = None
 
 @router.post("/analyze", response_model=SwingAnalysis)
 def swing_analysis(
@@ -16,7 +44,9 @@ def swing_analysis(
     Analyze a golf swing video using AI and provide comprehensive feedback
     """
     try:
-        result = analyze_swing(video_url, metadata)
+        result = analyze_swing_cached(video_url, metadata)
+        if player_id:
+            get_swing_history_store().record(player_id, result)
         return SwingAnalysis(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing swing: {str(e)}")
@@ -28,41 +58,109 @@ def upload_and_analyze_swing(media_upload: MediaUpload):
     """
     try:
         # Process the media upload
-        result = analyze_swing(
+        result = analyze_swing_cached(
             video_url=media_upload.video_url,
             metadata=media_upload.metadata
         )
+        get_swing_history_store().record(media_upload.player_id, result)
         return SwingAnalysis(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing video upload: {str(e)}")
 
+@router.post("/analyze-session")
+def analyze_practice_session(session_request: SwingSessionRequest):
+    """
+    Analyse all clips from one range session and report session-level consistency
+    """
+    try:
+        return analyze_session(
+            session_request.video_urls,
+            metadata=session_request.metadata,
+            player_id=session_request.player_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing session: {str(e)}")
+
+@router.post("/jobs", status_code=202)
+def submit_swing_job(job_request: SwingJobRequest):
+    """
+    Queue a swing analysis and return immediately with a job id
+
+    Poll GET /jobs/{job_id} or subscribe to GET /jobs/{job_id}/events for the result.
+    """
+    try:
+        job_id = submit_swing_analysis(
+            video_url=job_request.video_url,
+            metadata=job_request.metadata,
+            player_id=job_request.player_id,
+            priority=job_request.priority
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing swing analysis: {str(e)}")
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/swing/jobs/{job_id}",
+        "events_url": f"/api/swing/jobs/{job_id}/events"
+    }
+
+@router.get("/jobs/{job_id}")
+def get_swing_job(job_id: str):
+    """
+    Get the status of a queued swing analysis, including the result once completed
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_swing_job_events(job_id: str, request: Request):
+    """
+    Server-sent events stream of status changes for a swing analysis job
+    """
+    queue = get_job_queue()
+    if await asyncio.to_thread(queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_status = None
+        while not await request.is_disconnected():
+            job = await asyncio.to_thread(queue.get, job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'job_id': job_id, 'detail': 'Job not found'})}\n\n"
+                break
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(job)}\n\n"
+            if last_status in ("completed", "failed"):
+                break
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @router.get("/analysis-history/{player_id}")
 def get_analysis_history(player_id: str, limit: int = 10):
     """
     Get swing analysis history for a player
     """
-    # Mock data - in production this would come from a database
+    return get_swing_history_store().history(player_id, limit=limit)
+
+@router.get("/trends/{player_id}")
+def get_swing_trends(player_id: str):
+    """
+    Get rolling 7, 30 and 90-day averages of a player's swing ratings and mechanics
+    """
     return {
         "player_id": player_id,
-        "total_analyses": 25,
-        "recent_analyses": [
-            {
-                "analysis_id": "ana_001",
-                "date": "2024-01-15",
-                "overall_rating": 78.5,
-                "primary_focus": "tempo_improvement",
-                "video_url": "https://example.com/video1.mp4"
-            },
-            {
-                "analysis_id": "ana_002", 
-                "date": "2024-01-10",
-                "overall_rating": 76.2,
-                "primary_focus": "balance_work",
-                "video_url": "https://example.com/video2.mp4"
-            }
-        ],
-        "improvement_trend": "positive",
-        "avg_rating_last_30_days": 77.3
+        "rollups": get_swing_history_store().trends(player_id)
     }
 
 @router.get("/compare-swings")
@@ -76,8 +174,8 @@ def compare_swings(
     """
     try:
         # Analyze both swings
-        analysis_1 = analyze_swing(video_url_1)
-        analysis_2 = analyze_swing(video_url_2)
+        analysis_1 = analyze_swing_cached(video_url_1)
+        analysis_2 = analyze_swing_cached(video_url_2)
         
         # Generate comparison insights
         comparison = {
@@ -109,6 +207,22 @@ def compare_swings(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparing swings: {str(e)}")
 
+@router.post("/compare")
+def compare_many_swings(compare_request: SwingCompareRequest):
+    """
+    Compare N swing clips (e.g. a practice bucket) pairwise and against a baseline clip
+    """
+    try:
+        return compare_swings_parallel(
+            compare_request.video_urls,
+            baseline_index=compare_request.baseline_index,
+            metadata=compare_request.metadata
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error comparing swings: {str(e)}")
+
 @router.get("/pro-swing-library")
 def get_pro_swing_library(category: Optional[str] = None):
     """
@@ -2,6 +2,8 @@
 import math
 from typing import Dict, List, Optional
 
+from backend.app.services.metrics import timed
+
 class GolfAICaddie:
     """Advanced AI Caddie with sophisticated club selection and strategy logic"""
     
@@ -74,6 +76,7 @@ class GolfAICaddie:
         
         return int(effective_distance)
 
+    @timed("club_lookup")
     def find_best_club(self, target_distance: int, skill_level: str) -> Dict[str, str]:
         """Find the best club for the target distance"""
         distances = self.club_distances.get(skill_level, self.club_distances["Amateur"])
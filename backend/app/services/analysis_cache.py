@@ -0,0 +1,133 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("SWING_CACHE_DIR", os.path.join(".data", "swing_cache"))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("SWING_CACHE_MEMORY_ENTRIES", "1024"))
+
+def content_hash_for(video_url: str, content: Optional[bytes] = None) -> str:
+    """
+    Hash identifying a swing video
+
+    Uses the video bytes when available, otherwise falls back to the URL.
+    """
+    digest = hashlib.sha256()
+    if content is not None:
+        digest.update(content)
+    else:
+        digest.update(b"url:" + video_url.encode("utf-8"))
+    return digest.hexdigest()
+
+def content_hash_for_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Content hash of a local video file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """Two-tier (memory LRU + on-disk JSON) cache for swing analysis results"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(content_hash: str, analyzer_version: str, context: Optional[Dict] = None) -> str:
+        """Build a cache key from content hash, analyzer version and analysis context"""
+        context_part = ""
+        if context:
+            context_json = json.dumps(context, sort_keys=True)
+            context_part = "-" + hashlib.sha1(context_json.encode("utf-8")).hexdigest()[:12]
+        return f"{analyzer_version}/{content_hash}{context_part}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look a result up in memory first, then on disk; returns a private copy"""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return copy.deepcopy(result)
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, result)
+        return copy.deepcopy(result)
+
+    def set(self, key: str, result: Dict) -> None:
+        """Store a result in both tiers"""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, result: Dict) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        version, name = key.split("/", 1)
+        # Shard by hash prefix to keep directories small
+        return os.path.join(self.cache_dir, version, name[:2], f"{name}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable swing cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, result: Dict) -> None:
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist swing cache entry {key}: {e}")
+
+_analysis_cache: Optional[AnalysisCache] = None
+_analysis_cache_lock = threading.Lock()
+
+def get_analysis_cache() -> AnalysisCache:
+    """Process-wide swing analysis cache"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _analysis_cache_lock:
+            if _analysis_cache is None:
+                _analysis_cache = AnalysisCache()
+    return _analysis_cache
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SESSIONS_DB = os.getenv("CHAT_SESSIONS_DB", os.path.join(".data", "chat_sessions.db"))
+MAX_TURNS_PER_SESSION = int(os.getenv("CHAT_SESSION_MAX_TURNS", "20"))
+SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "1800"))
+MAX_TOTAL_BYTES = int(os.getenv("CHAT_SESSIONS_MAX_BYTES", str(32 * 1024 * 1024)))
+MAX_MESSAGE_CHARS = int(os.getenv("CHAT_MESSAGE_MAX_CHARS", "4000"))
+# Rough per-turn bookkeeping cost on top of the message text
+TURN_OVERHEAD_BYTES = 96
+
+def merge_context(history: List[Dict[str, str]], context: Optional[List[Dict]]) -> List[Dict]:
+    """
+    Stored turns followed by any client-supplied context turns not already stored
+
+    A client that resends its own transcript adds nothing twice, and context
+    the server never saw (e.g. from another device) still counts as the most
+    recent exchange.
+    """
+    if not context:
+        return list(history)
+    stored = {(turn["role"], turn["content"]) for turn in history}
+    return list(history) + [
+        turn for turn in context
+        if (turn.get("role"), turn.get("content")) not in stored
+    ]
+
+class ConversationStore:
+    """
+    Bounded chat sessions keyed by conversation id, in a local SQLite file
+
+    Every uvicorn worker sharing the file sees the same sessions, so a
+    conversation_id stays valid whichever process serves the next message.
+    Sessions idle past the TTL are dropped as new ones open, and the least
+    recently active sessions go first when the stored turns exceed the byte
+    budget. Each session keeps only its last MAX_TURNS_PER_SESSION turns.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_SESSIONS_DB, max_turns: int = MAX_TURNS_PER_SESSION,
+                 ttl_seconds: float = SESSION_TTL_SECONDS, max_total_bytes: int = MAX_TOTAL_BYTES,
+                 max_message_chars: int = MAX_MESSAGE_CHARS):
+        self.db_path = db_path
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.max_message_chars = max_message_chars
+        self._stats_lock = threading.Lock()
+        # Counted by this process only
+        self.stats = {"created": 0, "expired": 0, "evicted": 0}
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    player_id TEXT,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_active REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_idle ON sessions (last_active)")
+            conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (conversation_id, seq)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        if n:
+            with self._stats_lock:
+                self.stats[stat] += n
+
+    @staticmethod
+    def _drop(conn: sqlite3.Connection, conversation_id: str) -> None:
+        conn.execute("DELETE FROM turns WHERE conversation_id = ?", (conversation_id,))
+        conn.execute("DELETE FROM sessions WHERE id = ?", (conversation_id,))
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        idle = conn.execute(
+            "SELECT id FROM sessions WHERE last_active < ?", (now - self.ttl_seconds,)
+        ).fetchall()
+        for row in idle:
+            self._drop(conn, row["id"])
+        self._count("expired", len(idle))
+
+    def _is_live(self, conn: sqlite3.Connection, conversation_id: Optional[str], now: float) -> bool:
+        if not conversation_id:
+            return False
+        row = conn.execute("SELECT last_active FROM sessions WHERE id = ?", (conversation_id,)).fetchone()
+        if row is not None and now - row["last_active"] > self.ttl_seconds:
+            self._drop(conn, conversation_id)
+            self._count("expired")
+            return False
+        return row is not None
+
+    @staticmethod
+    def _turns(conn: sqlite3.Connection, conversation_id: str) -> List[Dict[str, str]]:
+        rows = conn.execute(
+            "SELECT role, content FROM turns WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+        ).fetchall()
+        return [{"role": row["role"], "content": row["content"]} for row in rows]
+
+    def open(self, conversation_id: Optional[str] = None,
+             player_id: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Resume a session (or start one when the id is missing, unknown or expired)
+
+        Returns the session's id and a copy of its recent turns.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire(conn, now)
+            if not self._is_live(conn, conversation_id, now):
+                conversation_id = f"conv_{uuid.uuid4().hex[:16]}"
+                conn.execute(
+                    "INSERT INTO sessions (id, player_id, last_active) VALUES (?, ?, ?)",
+                    (conversation_id, player_id, now)
+                )
+                self._count("created")
+            else:
+                conn.execute("UPDATE sessions SET last_active = ? WHERE id = ?", (now, conversation_id))
+            return conversation_id, self._turns(conn, conversation_id)
+
+    def append(self, conversation_id: str, role: str, content: str) -> None:
+        """Record a turn; a no-op if the session has since been evicted"""
+        content = content[:self.max_message_chars]
+        size = len(content.encode("utf-8")) + TURN_OVERHEAD_BYTES
+        now = time.time()
+        with self._transaction() as conn:
+            if not self._is_live(conn, conversation_id, now):
+                return
+            conn.execute(
+                "INSERT INTO turns (conversation_id, role, content, size_bytes) VALUES (?, ?, ?, ?)",
+                (conversation_id, role, content, size)
+            )
+            old_turns = ("FROM turns WHERE conversation_id = ? AND seq NOT IN "
+                         "(SELECT seq FROM turns WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?)")
+            args = (conversation_id, conversation_id, self.max_turns)
+            dropped = conn.execute(f"SELECT COALESCE(SUM(size_bytes), 0) {old_turns}", args).fetchone()[0]
+            conn.execute(f"DELETE {old_turns}", args)
+            conn.execute(
+                "UPDATE sessions SET size_bytes = size_bytes + ?, last_active = ? WHERE id = ?",
+                (size - dropped, now, conversation_id)
+            )
+
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM sessions").fetchone()[0]
+            while total > self.max_total_bytes:
+                oldest = conn.execute(
+                    "SELECT id, size_bytes FROM sessions WHERE id != ? ORDER BY last_active LIMIT 1",
+                    (conversation_id,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._drop(conn, oldest["id"])
+                total -= oldest["size_bytes"]
+                self._count("evicted")
+
+    def recent(self, conversation_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        now = time.time()
+        with self._transaction() as conn:
+            return self._turns(conn, conversation_id)[-limit:] if self._is_live(conn, conversation_id, now) else []
+
+    def metrics(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            total_bytes = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM sessions").fetchone()[0]
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "sessions": sessions,
+            "total_bytes": total_bytes,
+            "max_total_bytes": self.max_total_bytes
+        }
+
+_conversation_store: Optional[ConversationStore] = None
+_conversation_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    """Process-wide handle on the shared chat conversation store"""
+    global _conversation_store
+    if _conversation_store is None:
+        with _conversation_store_lock:
+            if _conversation_store is None:
+                _conversation_store = ConversationStore()
+    return _conversation_store
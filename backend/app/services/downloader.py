@@ -0,0 +1,373 @@
+import asyncio
+import fcntl
+import hashlib
+import ipaddress
+import logging
+import mimetypes
+import os
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = os.getenv("MEDIA_DOWNLOAD_DIR", os.path.join(".data", "downloads"))
+MAX_DOWNLOAD_BYTES = int(os.getenv("MEDIA_MAX_DOWNLOAD_BYTES", str(200 * 1024 * 1024)))
+MAX_CONNECTIONS = int(os.getenv("MEDIA_DOWNLOAD_MAX_CONNECTIONS", "200"))
+PER_HOST_LIMIT = int(os.getenv("MEDIA_DOWNLOAD_PER_HOST", "8"))
+MAX_ATTEMPTS = int(os.getenv("MEDIA_DOWNLOAD_ATTEMPTS", "4"))
+CHUNK_SIZE = 64 * 1024
+# Finished downloads remembered per URL, so later stages (audio, frames) reuse the file
+COMPLETED_CACHE_SIZE = 1024
+# A failed URL fails fast for this long instead of being retried by every stage
+FAILED_TTL_SECONDS = 60.0
+# Comma-separated media hosts (a name also allows its subdomains); empty allows any public host
+ALLOWED_HOSTS = tuple(h.strip().lower() for h in os.getenv("MEDIA_DOWNLOAD_ALLOWED_HOSTS", "").split(",") if h.strip())
+# Only for local development: lets media URLs point at loopback and private addresses
+ALLOW_PRIVATE_NETWORKS = os.getenv("MEDIA_DOWNLOAD_ALLOW_PRIVATE", "false").lower() in ("1", "true", "yes")
+MAX_REDIRECTS = 5
+# Downloads and abandoned part files older than this are deleted
+RETENTION_SECONDS = float(os.getenv("MEDIA_DOWNLOAD_RETENTION_HOURS", "24")) * 3600
+SWEEP_INTERVAL_SECONDS = 600.0
+
+class DownloadError(Exception):
+    """A media download failed permanently (bad status, too large, retries exhausted, blocked address)"""
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+class VideoDownloader:
+    """
+    Streams remote media to disk through one pooled, keep-alive HTTP client
+
+    Bodies are written in fixed-size chunks and hashed as they arrive, so
+    memory stays flat no matter how large or how many the downloads are.
+    Interrupted transfers resume with an HTTP Range request guarded by
+    If-Range, and a semaphore per host keeps a burst from hammering a single
+    media server.
+
+    URLs come from webhooks, so every hop (redirects are followed by hand)
+    must be http(s), on an allowed host, and resolve only to public
+    addresses. The name is resolved again when connecting, so a
+    DNS-rebinding host can still receive the request (a GET with no
+    credentials, only Range/If-Range headers); the address actually
+    connected to is checked before any of the response is used, so nothing
+    it returns is stored or reported. Part files are
+    locked with flock, so processes fetching the same URL take turns
+    instead of writing one file together.
+    """
+
+    def __init__(self, download_dir: str = DOWNLOAD_DIR, max_bytes: int = MAX_DOWNLOAD_BYTES,
+                 max_connections: int = MAX_CONNECTIONS, per_host_limit: int = PER_HOST_LIMIT,
+                 max_attempts: int = MAX_ATTEMPTS, timeout: float = 30.0,
+                 allowed_hosts: tuple = ALLOWED_HOSTS, allow_private_networks: bool = ALLOW_PRIVATE_NETWORKS,
+                 retention_seconds: float = RETENTION_SECONDS):
+        self.download_dir = download_dir
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.allowed_hosts = allowed_hosts
+        self.allow_private_networks = allow_private_networks
+        self.retention_seconds = retention_seconds
+        self._swept_at = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._completed: "OrderedDict[str, Dict]" = OrderedDict()
+        self._failed: Dict[str, tuple] = {}
+        os.makedirs(download_dir, exist_ok=True)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout),
+                follow_redirects=False
+            )
+        return self._client
+
+    async def _check_url(self, url: str) -> None:
+        """Refuse non-http(s) URLs, hosts off the allowlist and names resolving to non-public addresses"""
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower()
+        if parsed.scheme not in ("http", "https") or not host:
+            raise DownloadError(f"Refusing to download {url}: only http(s) URLs are fetched")
+        if self.allowed_hosts and not any(host == allowed or host.endswith("." + allowed)
+                                          for allowed in self.allowed_hosts):
+            raise DownloadError(f"Refusing to download {url}: {host} is not an allowed media host")
+        if self.allow_private_networks:
+            return
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, parsed.port or (443 if parsed.scheme == "https" else 80), type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError) as e:
+            raise DownloadError(f"Cannot resolve {host}: {e}") from e
+        for info in infos:
+            if not _is_public(info[4][0]):
+                raise DownloadError(f"Refusing to download {url}: {host} resolves to a non-public address")
+
+    def _check_peer(self, response: httpx.Response, url: str) -> None:
+        """
+        The address actually connected to must be public too (the name may
+        have re-resolved); by now the request has been sent, but its
+        response is discarded
+        """
+        if self.allow_private_networks:
+            return
+        stream = response.extensions.get("network_stream")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+        if peer and not _is_public(peer[0]):
+            raise DownloadError(f"Refusing to download {url}: connected to a non-public address")
+
+    @asynccontextmanager
+    async def _stream(self, url: str, headers: Dict[str, str]):
+        """GET url, following redirects by hand so every hop is checked"""
+        for _ in range(MAX_REDIRECTS + 1):
+            await self._check_url(url)
+            async with self._get_client().stream("GET", url, headers=headers) as response:
+                self._check_peer(response, url)
+                if response.is_redirect:
+                    url = urljoin(str(response.url), response.headers["location"])
+                    continue
+                yield response
+                return
+        raise DownloadError(f"Too many redirects for {url}")
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete downloads and abandoned part files older than the retention period"""
+        cutoff = (time.time() if now is None else now) - self.retention_seconds
+        removed = 0
+        for name in os.listdir(self.download_dir):
+            path = os.path.join(self.download_dir, name)
+            try:
+                if os.stat(path).st_mtime >= cutoff:
+                    continue
+                if name.endswith((".part", ".validator", ".lock")):
+                    # Only touch a transfer's files while no process holds its lock
+                    lock_path = os.path.join(self.download_dir, name.split(".")[0] + ".part.lock")
+                    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.remove(path)
+                    finally:
+                        os.close(fd)
+                else:
+                    os.remove(path)
+                removed += 1
+            except OSError:
+                continue  # in use, or removed by another process
+        return removed
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._swept_at < SWEEP_INTERVAL_SECONDS:
+            return
+        self._swept_at = now
+        asyncio.get_running_loop().run_in_executor(None, self._sweep_quietly)
+
+    def _sweep_quietly(self) -> None:
+        try:
+            removed = self.sweep()
+            if removed:
+                logger.info(f"Removed {removed} expired files from {self.download_dir}")
+        except OSError as e:
+            logger.warning(f"Download sweep failed: {e}")
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def download(self, url: str) -> Dict:
+        """Download url into the download directory; returns path, content hash, size and type"""
+        self._maybe_sweep()
+        done = self._completed.get(url)
+        if done is not None and os.path.exists(done["path"]):
+            self._completed.move_to_end(url)
+            # Reuse counts as use: keep it clear of the retention sweep
+            os.utime(done["path"])
+            return done
+        failed = self._failed.get(url)
+        if failed is not None:
+            if time.monotonic() - failed[0] < FAILED_TTL_SECONDS:
+                raise DownloadError(failed[1])
+            del self._failed[url]
+        # Concurrent requests for the same URL share one transfer (and one part file)
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._limited_download(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _limited_download(self, url: str) -> Dict:
+        async with self._host_limit(url):
+            try:
+                result = await self._download(url)
+            except DownloadError as e:
+                if len(self._failed) >= COMPLETED_CACHE_SIZE:
+                    self._failed.clear()
+                self._failed[url] = (time.monotonic(), str(e))
+                raise
+        self._completed[url] = result
+        while len(self._completed) > COMPLETED_CACHE_SIZE:
+            self._completed.popitem(last=False)
+        return result
+
+    async def _download(self, url: str) -> Dict:
+        part_path = os.path.join(self.download_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part")
+        # Other processes may be fetching the same URL into the same part file: take turns
+        fd = os.open(part_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.1)
+            os.utime(part_path + ".lock")
+            return await self._download_locked(url, part_path)
+        finally:
+            os.close(fd)
+
+    async def _download_locked(self, url: str, part_path: str) -> Dict:
+        validator_path = part_path + ".validator"
+        digest = hashlib.sha256()
+        written = 0
+        validator = None
+        # A partial file left by an earlier process is resumed, but only with the
+        # validator (ETag / Last-Modified) it was fetched under; its bytes are re-hashed first
+        if os.path.exists(part_path):
+            try:
+                with open(validator_path, "r", encoding="utf-8") as f:
+                    validator = f.read().strip() or None
+            except OSError:
+                pass
+            if validator is None:
+                os.remove(part_path)
+            else:
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        written += len(chunk)
+
+        content_type = None
+        attempt = 0
+        while True:
+            attempt += 1
+            headers = {}
+            if written and validator:
+                headers["Range"] = f"bytes={written}-"
+                headers["If-Range"] = validator
+            elif written:
+                # Nothing to prove the rest belongs to the same body: start over
+                digest, written = hashlib.sha256(), 0
+            try:
+                async with self._stream(url, headers) as response:
+                    if response.status_code == 416 and written:
+                        # Nothing left to fetch: the part file already holds the whole body
+                        break
+                    if response.status_code not in (200, 206):
+                        raise DownloadError(f"GET {url} returned HTTP {response.status_code}")
+                    if response.status_code == 200 and written:
+                        # Server ignored the Range header: start over
+                        digest, written = hashlib.sha256(), 0
+                    validator = response.headers.get("etag") or response.headers.get("last-modified")
+                    if validator:
+                        with open(validator_path, "w", encoding="utf-8") as f:
+                            f.write(validator)
+                    elif os.path.exists(validator_path):
+                        os.remove(validator_path)
+                    content_type = response.headers.get("content-type", content_type)
+                    expected = response.headers.get("content-length")
+                    if expected is not None and written + int(expected) > self.max_bytes:
+                        raise DownloadError(f"{url} exceeds the {self.max_bytes} byte download limit")
+
+                    with open(part_path, "ab" if written else "wb") as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            written += len(chunk)
+                            if written > self.max_bytes:
+                                raise DownloadError(f"{url} exceeds the {self.max_bytes} byte download limit")
+                            digest.update(chunk)
+                            f.write(chunk)
+                break
+            except DownloadError:
+                for path in (part_path, validator_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+            except httpx.HTTPError as e:
+                if attempt >= self.max_attempts:
+                    raise DownloadError(f"Download of {url} failed after {attempt} attempts: {e}") from e
+                delay = min(8.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random())
+                logger.warning(f"Download of {url} interrupted at {written} bytes ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        content_hash = digest.hexdigest()
+        extension = os.path.splitext(urlparse(url).path)[1] or \
+            mimetypes.guess_extension((content_type or "").split(";")[0].strip()) or ""
+        final_path = os.path.join(self.download_dir, content_hash + extension)
+        # Content-addressed: a clip already on disk under the same hash is reused as is
+        os.replace(part_path, final_path)
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        return {
+            "url": url,
+            "path": final_path,
+            "content_hash": content_hash,
+            "size": written,
+            "content_type": content_type
+        }
+
+    async def download_many(self, urls: List[str]) -> List[Dict]:
+        """Download several URLs concurrently; failures are returned as {"url", "error"} entries"""
+        results = await asyncio.gather(*(self.download(url) for url in urls), return_exceptions=True)
+        return [
+            {"url": url, "error": str(result)} if isinstance(result, Exception) else result
+            for url, result in zip(urls, results)
+        ]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+_downloader: Optional[VideoDownloader] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_downloader_lock = threading.Lock()
+
+def _get_loop_and_downloader():
+    """Background event loop owning the shared downloader, so sync callers share one connection pool"""
+    global _downloader, _loop
+    if _loop is None:
+        with _downloader_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="media-downloader", daemon=True).start()
+                _downloader = VideoDownloader()
+                _loop = loop
+    return _loop, _downloader
+
+def download_video(url: str) -> Dict:
+    """Blocking download through the shared downloader (callable from worker threads)"""
+    loop, downloader = _get_loop_and_downloader()
+    return asyncio.run_coroutine_threadsafe(downloader.download(url), loop).result()
+
+def download_videos(urls: List[str]) -> List[Dict]:
+    """Blocking concurrent download of many URLs through the shared downloader"""
+    loop, downloader = _get_loop_and_downloader()
+    return asyncio.run_coroutine_threadsafe(downloader.download_many(urls), loop).result()
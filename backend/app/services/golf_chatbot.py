@@ -1,7 +1,119 @@
+import os
 import random
-from typing import List, Dict
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime
 
+from backend.app.services.intent_router import IntentRouter, RouteMatch, tokenize
+from backend.app.services.knowledge_retrieval import retrieve_answer
+from backend.app.services.metrics import timed
+
+# Top-level intents, highest priority first; "word*" matches any word starting with "word"
+INTENT_KEYWORDS = [
+    ("rules", 70, ["rule", "rules", "legal", "penalty", "penalties"]),
+    ("technique", 60, ["technique*", "how to", "improv*", "tip", "tips", "swing*"]),
+    ("equipment", 50, ["equipment", "club*", "driver*", "iron*", "putter*"]),
+    ("strategy", 40, ["strategy", "course", "management", "play*"]),
+    ("greeting", 20, ["hello", "hi", "hey", "start"]),
+    ("closing", 10, ["thank*", "bye", "goodbye"])
+]
+TERM_PRIORITY = 30
+# Greetings, closings and the general fallback pick a random reply, so they aren't cached
+UNCACHED_INTENTS = (None, "greeting", "closing")
+# Intent -> the topic group its answer is chosen from
+TOPIC_GROUPS = {
+    "rules": "rules",
+    "technique": "technique",
+    "equipment": "equipment",
+    "strategy": "course_management"
+}
+
+ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", "4096"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("CHAT_ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Topics within an intent: (group, label, priority, keywords)
+TOPIC_KEYWORDS = [
+    ("rules", "water_hazard", 4, ["water", "hazard*"]),
+    ("rules", "out_of_bounds", 3, ["out of bounds", "ob"]),
+    ("rules", "lost_ball", 2, ["lost"]),
+    ("rules", "unplayable", 1, ["unplayable"]),
+    ("technique", "driving", 4, ["driv*"]),
+    ("technique", "putting", 3, ["putt*"]),
+    ("technique", "chipping", 2, ["chip*"]),
+    ("technique", "bunker", 1, ["bunker*", "sand"]),
+    ("equipment", "driver", 4, ["driver*"]),
+    ("equipment", "irons", 3, ["iron*"]),
+    ("equipment", "putters", 2, ["putter*"]),
+    ("equipment", "wedges", 1, ["wedge*"]),
+    ("course_management", "club_selection", 2, ["club selection", "which club"]),
+    ("course_management", "mental_game", 1, ["mental", "pressure"])
+]
+
+def normalize_question(message: str) -> str:
+    """Cache key for a question: lowercase words only, so case, punctuation and spacing don't matter"""
+    return " ".join(tokenize(message))
+
+def last_user_message(history: Optional[List[Dict]]) -> Optional[str]:
+    """Most recent user turn in a conversation history ({"role", "content"} or {"message"} dicts)"""
+    for turn in reversed(history or []):
+        if turn.get("role", "user") == "user":
+            content = turn.get("content") or turn.get("message")
+            if content:
+                return content
+    return None
+
+class AnswerCache:
+    """LRU cache of chatbot answers keyed by normalized question, with a TTL and hit metrics"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, answer = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return answer
+
+    def set(self, key: str, answer: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+
 class GolfChatbotAI:
     """AI Golf Chatbot for answering golf-related questions"""
     
@@ -47,81 +159,130 @@ class GolfChatbotAI:
             "gimme": "A short putt that's conceded by opponents"
         }
 
+        self._router = self._compile_router()
+        self.answer_cache = AnswerCache()
+
+    def _compile_router(self) -> IntentRouter:
+        """Build the keyword router from the intent, topic and glossary tables"""
+        router = IntentRouter()
+        for intent, priority, keywords in INTENT_KEYWORDS:
+            router.add("intent", intent, keywords, priority)
+        for group, label, priority, keywords in TOPIC_KEYWORDS:
+            router.add(group, label, keywords, priority)
+        for term in self.golf_terms:
+            phrase = term.replace("_", " ")
+            router.add("intent", "term", [phrase], TERM_PRIORITY)
+            # Longer terms win ("double bogey" over "bogey")
+            router.add("term", term, [phrase], len(phrase.split()))
+        return router
+
+    def answer(self, user_message: str, history: Optional[List[Dict]] = None) -> str:
+        """
+        Answer a question: cached answer, else best knowledge passage, else keyword routing
+
+        With conversation history, follow-ups ("what about putting?", "what's
+        the penalty for that?") borrow the missing intent or topic from the
+        previous question; those answers depend on context and aren't cached.
+        """
+        previous = last_user_message(history)
+        if previous:
+            response, intent, used_context = self._route(user_message, previous)
+            if used_context:
+                return response
+
+        key = normalize_question(user_message)
+        cached = self.answer_cache.get(key)
+        if cached is not None:
+            return cached
+
+        passage = retrieve_answer(user_message)
+        if passage:
+            response, intent = passage["text"], "knowledge"
+        else:
+            response, intent, _ = self._route(user_message)
+        if len(response) < 10:
+            response = "I'd be happy to help with your golf question! Could you provide a bit more detail?"
+        if intent not in UNCACHED_INTENTS:
+            self.answer_cache.set(key, response)
+        return response
+
     def generate_response(self, user_message: str) -> str:
         """Generate an AI response to the user's golf question"""
-        message_lower = user_message.lower()
-        
-        # Check for specific topics
-        if any(word in message_lower for word in ["rule", "rules", "legal", "penalty"]):
-            return self._get_rules_response(message_lower)
-        elif any(word in message_lower for word in ["technique", "how to", "improve", "tips", "swing"]):
-            return self._get_technique_response(message_lower)
-        elif any(word in message_lower for word in ["equipment", "club", "clubs", "driver", "iron", "putter"]):
-            return self._get_equipment_response(message_lower)
-        elif any(word in message_lower for word in ["strategy", "course", "management", "play"]):
-            return self._get_strategy_response(message_lower)
-        elif any(term in message_lower for term in self.golf_terms.keys()):
-            return self._get_term_explanation(message_lower)
-        elif any(word in message_lower for word in ["hello", "hi", "hey", "start"]):
+        return self._route(user_message)[0]
+
+    @timed("chatbot_routing")
+    def _route(self, user_message: str, previous: Optional[str] = None) -> Tuple[str, Optional[str], bool]:
+        # One tokenizing pass yields every intent, topic and term hit
+        match = self._router.match(user_message)
+        intent = match.best("intent")
+        used_context = False
+        if previous and (intent is None or intent in TOPIC_GROUPS):
+            prior = self._router.match(previous)
+            prior_intent = prior.best("intent")
+            if intent is None and prior_intent in TOPIC_GROUPS:
+                # No intent of its own: stay in the previous question's area unless
+                # the follow-up only names a topic from another one
+                intent = prior_intent
+                if not match.hits.get(TOPIC_GROUPS[intent]):
+                    intent = next((i for i, g in TOPIC_GROUPS.items() if match.hits.get(g)), intent)
+                used_context = True
+            elif intent in TOPIC_GROUPS and not match.hits.get(TOPIC_GROUPS[intent]) \
+                    and prior.hits.get(TOPIC_GROUPS[intent]):
+                # Right area but no topic ("what's the penalty for that?"): reuse the earlier one
+                used_context = True
+            if used_context:
+                match = match.merged_over(prior)
+        return self._respond_to_intent(intent, match, user_message), intent, used_context
+
+    def _respond_to_intent(self, intent: Optional[str], match: RouteMatch, user_message: str) -> str:
+        if intent == "rules":
+            return self._get_rules_response(match)
+        elif intent == "technique":
+            return self._get_technique_response(match)
+        elif intent == "equipment":
+            return self._get_equipment_response(match)
+        elif intent == "strategy":
+            return self._get_strategy_response(match)
+        elif intent == "term":
+            return self._get_term_explanation(match)
+        elif intent == "greeting":
             return self._get_greeting_response()
-        elif any(word in message_lower for word in ["thank", "thanks", "bye", "goodbye"]):
+        elif intent == "closing":
             return self._get_closing_response()
         else:
-            return self._get_general_response(message_lower)
+            return self._get_general_response(user_message.lower())
 
-    def _get_rules_response(self, message: str) -> str:
+    def _get_rules_response(self, match: RouteMatch) -> str:
         """Get response about golf rules"""
-        if "water" in message or "hazard" in message:
-            return self.golf_knowledge["rules"]["water_hazard"]
-        elif "out of bounds" in message or "ob" in message:
-            return self.golf_knowledge["rules"]["out_of_bounds"]
-        elif "lost" in message:
-            return self.golf_knowledge["rules"]["lost_ball"]
-        elif "unplayable" in message:
-            return self.golf_knowledge["rules"]["unplayable"]
-        else:
-            return "Golf rules can be complex! The main principles are: play the ball as it lies, play the course as you find it, and if you can't do either, do what's fair. What specific rule situation are you asking about?"
+        topic = match.best("rules")
+        if topic:
+            return self.golf_knowledge["rules"][topic]
+        return "Golf rules can be complex! The main principles are: play the ball as it lies, play the course as you find it, and if you can't do either, do what's fair. What specific rule situation are you asking about?"
 
-    def _get_technique_response(self, message: str) -> str:
+    def _get_technique_response(self, match: RouteMatch) -> str:
         """Get response about golf techniques"""
-        if "driv" in message:
-            return self.golf_knowledge["techniques"]["driving"]
-        elif "putt" in message:
-            return self.golf_knowledge["techniques"]["putting"]
-        elif "chip" in message:
-            return self.golf_knowledge["techniques"]["chipping"]
-        elif "bunker" in message or "sand" in message:
-            return self.golf_knowledge["techniques"]["bunker"]
-        else:
-            return "Golf technique improvement comes from practice and proper fundamentals. Focus on: setup, alignment, tempo, and balance. What specific aspect of your game would you like to work on?"
+        topic = match.best("technique")
+        if topic:
+            return self.golf_knowledge["techniques"][topic]
+        return "Golf technique improvement comes from practice and proper fundamentals. Focus on: setup, alignment, tempo, and balance. What specific aspect of your game would you like to work on?"
 
-    def _get_equipment_response(self, message: str) -> str:
+    def _get_equipment_response(self, match: RouteMatch) -> str:
         """Get response about golf equipment"""
-        if "driver" in message:
-            return self.golf_knowledge["equipment"]["driver"]
-        elif "iron" in message:
-            return self.golf_knowledge["equipment"]["irons"]
-        elif "putter" in message:
-            return self.golf_knowledge["equipment"]["putters"]
-        elif "wedge" in message:
-            return self.golf_knowledge["equipment"]["wedges"]
-        else:
-            return "Golf equipment should match your skill level and swing characteristics. What specific club or equipment question do you have?"
+        topic = match.best("equipment")
+        if topic:
+            return self.golf_knowledge["equipment"][topic]
+        return "Golf equipment should match your skill level and swing characteristics. What specific club or equipment question do you have?"
 
-    def _get_strategy_response(self, message: str) -> str:
+    def _get_strategy_response(self, match: RouteMatch) -> str:
         """Get response about course strategy"""
-        if "club selection" in message or "which club" in message:
-            return self.golf_knowledge["course_management"]["club_selection"]
-        elif "mental" in message or "pressure" in message:
-            return self.golf_knowledge["course_management"]["mental_game"]
-        else:
-            return self.golf_knowledge["course_management"]["strategy"]
+        topic = match.best("course_management") or "strategy"
+        return self.golf_knowledge["course_management"][topic]
 
-    def _get_term_explanation(self, message: str) -> str:
+    def _get_term_explanation(self, match: RouteMatch) -> str:
         """Explain golf terms"""
-        for term, explanation in self.golf_terms.items():
-            if term in message:
-                return f"{term.replace('_', ' ').title()}: {explanation}"
+        term = match.best("term")
+        if term:
+            return f"{term.replace('_', ' ').title()}: {self.golf_terms[term]}"
         return "That's a great golf term! Could you be more specific about what you'd like to know?"
 
     def _get_greeting_response(self) -> str:
@@ -154,19 +315,26 @@ class GolfChatbotAI:
         ]
         return random.choice(general_responses)
 
+_chatbot: Optional[GolfChatbotAI] = None
+_chatbot_lock = threading.Lock()
+
+def get_golf_chatbot() -> GolfChatbotAI:
+    """Process-wide chatbot; its knowledge tables, router and answer cache are built once"""
+    global _chatbot
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                _chatbot = GolfChatbotAI()
+    return _chatbot
+
 def get_golf_chat_response(message: str, context: List[Dict] = None) -> str:
     """Main function to get a golf chatbot response"""
-    chatbot = GolfChatbotAI()
-    
-    # Add some context awareness if needed
-    if context and len(context) > 0:
-        # Could use context to provide more personalized responses
-        pass
-    
-    response = chatbot.generate_response(message)
-    
-    # Add timestamp and ensure response quality
-    if len(response) < 10:
-        response = "I'd be happy to help with your golf question! Could you provide a bit more detail?"
-    
-    return response
+    # Earlier turns of the conversation let follow-up questions be resolved
+    return get_golf_chatbot().answer(message, history=context)
+
+def iter_answer_chunks(text: str, words_per_chunk: int = 6):
+    """Split an answer into word-group chunks for streaming (joined back together they give the text)"""
+    words = text.split(" ")
+    for start in range(0, len(words), words_per_chunk):
+        chunk = " ".join(words[start:start + words_per_chunk])
+        yield chunk if start + words_per_chunk >= len(words) else chunk + " "
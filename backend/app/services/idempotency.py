@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+DEFAULT_IDEMPOTENCY_DB = os.getenv("MEDIA_IDEMPOTENCY_DB", os.path.join(".data", "idempotency.db"))
+DEFAULT_TTL_SECONDS = float(os.getenv("MEDIA_IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A claim that never completed (worker died mid-request) can be taken over after this long
+PENDING_TIMEOUT_SECONDS = 300
+PRUNE_EVERY = 1000
+
+MESSAGE_ID_FIELDS = ("message_id", "MessageSid", "SmsMessageSid", "id")
+
+def idempotency_key(payload: Dict[str, Any]) -> str:
+    """Provider message id when present, otherwise a hash of sender and media URL"""
+    for field in MESSAGE_ID_FIELDS:
+        if payload.get(field):
+            return f"msg:{payload[field]}"
+    sender = payload.get("player_id") or payload.get("from") or payload.get("From") or ""
+    media = payload.get("video_url") or payload.get("media_url") or payload.get("MediaUrl0") or ""
+    return "content:" + hashlib.sha256(f"{sender}|{media}".encode("utf-8")).hexdigest()
+
+class IdempotencyStore:
+    """
+    Time-windowed seen-set of processed media messages
+
+    A per-process LRU answers repeat duplicates without I/O; the SQLite table
+    is the exact, shared record that all uvicorn workers claim keys against.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_IDEMPOTENCY_DB, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_local_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_messages (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    completed_at REAL,
+                    response TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS seen_created ON seen_messages (created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _local_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            stored_at, response = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return response
+
+    def _local_put(self, key: str, response: Dict[str, Any], stored_at: float) -> None:
+        with self._lock:
+            self._local[key] = (stored_at, response)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def claim(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Try to become the processor for a message
+
+        Returns None when the caller now owns the key and should process it.
+        Otherwise returns {"status": "completed", "response": ...} for a
+        finished duplicate or {"status": "pending"} while another request
+        is still working on it.
+        """
+        now = time.time()
+        response = self._local_get(key, now)
+        if response is not None:
+            return {"status": "completed", "response": response}
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT created_at, completed_at, response FROM seen_messages WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    created_at, completed_at, stored = row
+                    expired = now - created_at > self.ttl_seconds
+                    stale = completed_at is None and now - created_at > PENDING_TIMEOUT_SECONDS
+                    if not expired and not stale:
+                        conn.execute("COMMIT")
+                        if completed_at is None:
+                            return {"status": "pending"}
+                        response = json.loads(stored)
+                        self._local_put(key, response, completed_at)
+                        return {"status": "completed", "response": response}
+                conn.execute(
+                    "INSERT OR REPLACE INTO seen_messages (key, created_at, completed_at, response) "
+                    "VALUES (?, ?, NULL, NULL)",
+                    (key, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._maybe_prune()
+        return None
+
+    def complete(self, key: str, response: Dict[str, Any]) -> None:
+        """Store the response to replay for later duplicates"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE seen_messages SET completed_at = ?, response = ? WHERE key = ?",
+                (now, json.dumps(response), key)
+            )
+        self._local_put(key, response, now)
+
+    def release(self, key: str) -> None:
+        """Forget a claim whose processing failed so a retry can run it again"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM seen_messages WHERE key = ? AND completed_at IS NULL", (key,))
+
+    def forget(self, key: str) -> None:
+        """Drop a completed key too, so the next claim processes the message again"""
+        with self._lock:
+            self._local.pop(key, None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM seen_messages WHERE key = ?", (key,))
+
+    def _maybe_prune(self) -> None:
+        self._writes += 1
+        if self._writes % PRUNE_EVERY:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM seen_messages WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+_idempotency_store: Optional[IdempotencyStore] = None
+_idempotency_store_lock = threading.Lock()
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Process-wide media idempotency store"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        with _idempotency_store_lock:
+            if _idempotency_store is None:
+                _idempotency_store = IdempotencyStore()
+    return _idempotency_store
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; the only pass over the raw message"""
+    return _TOKEN.findall(text.lower())
+
+class RouteMatch:
+    """Every keyword hit from one pass over a message, grouped by namespace"""
+
+    def __init__(self):
+        # group -> label -> (priority, position of first hit)
+        self.hits: Dict[str, Dict[str, Tuple[int, int]]] = {}
+
+    def _add(self, group: str, label: str, priority: int, position: int) -> None:
+        labels = self.hits.setdefault(group, {})
+        current = labels.get(label)
+        if current is None or (priority, -position) > (current[0], -current[1]):
+            labels[label] = (priority, position)
+
+    def best(self, group: str) -> Optional[str]:
+        """Highest-priority label hit in a group; earlier in the message wins ties"""
+        labels = self.hits.get(group)
+        if not labels:
+            return None
+        return max(labels.items(), key=lambda item: (item[1][0], -item[1][1]))[0]
+
+    def has(self, group: str, label: str) -> bool:
+        return label in self.hits.get(group, {})
+
+    def merged_over(self, previous: "RouteMatch") -> "RouteMatch":
+        """This match, with groups it has no hits in filled from an earlier message's match"""
+        merged = RouteMatch()
+        merged.hits = {**previous.hits, **self.hits}
+        return merged
+
+class IntentRouter:
+    """
+    Compiled, word-bounded multi-keyword matcher
+
+    Keywords are whole words, multi-word phrases ("out of bounds") or word
+    prefixes ending in "*" ("putt*" matches putt, putter, putting). They are
+    indexed by their first token and by prefix length, so matching a message
+    is one tokenization plus a few dict lookups per token however large the
+    vocabulary grows.
+    """
+
+    def __init__(self):
+        # first token -> [(remaining tokens, group, label, priority)]
+        self._words: Dict[str, List[Tuple[Tuple[str, ...], str, str, int]]] = {}
+        # word prefix -> [(group, label, priority)]
+        self._prefixes: Dict[str, List[Tuple[str, str, int]]] = {}
+        self._prefix_lengths: List[int] = []
+
+    def add(self, group: str, label: str, keywords: Iterable[str], priority: int = 0) -> "IntentRouter":
+        for keyword in keywords:
+            tokens = tokenize(keyword)
+            if keyword.endswith("*") and len(tokens) == 1:
+                prefix = tokens[0]
+                self._prefixes.setdefault(prefix, []).append((group, label, priority))
+                if len(prefix) not in self._prefix_lengths:
+                    self._prefix_lengths.append(len(prefix))
+                    self._prefix_lengths.sort()
+            elif tokens:
+                self._words.setdefault(tokens[0], []).append((tuple(tokens[1:]), group, label, priority))
+        return self
+
+    def match(self, text: str) -> RouteMatch:
+        result = RouteMatch()
+        tokens = tokenize(text)
+        for position, token in enumerate(tokens):
+            for rest, group, label, priority in self._words.get(token, ()):
+                if not rest or tuple(tokens[position + 1:position + 1 + len(rest)]) == rest:
+                    result._add(group, label, priority, position)
+            for length in self._prefix_lengths:
+                if length > len(token):
+                    break
+                for group, label, priority in self._prefixes.get(token[:length], ()):
+                    result._add(group, label, priority, position)
+        return result
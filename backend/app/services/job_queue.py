@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_DB = os.getenv("JOB_QUEUE_DB", os.path.join(".data", "jobs.db"))
+DEFAULT_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+# A running job whose lease expires (worker crashed or was restarted) is picked up again
+DEFAULT_LEASE_SECONDS = float(os.getenv("JOB_QUEUE_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = 3
+
+JobHandler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# Handlers are registered at import time by the services that own each job kind
+_job_handlers: Dict[str, JobHandler] = {}
+
+def register_job_handler(kind: str, handler: JobHandler) -> None:
+    """Register the function that processes jobs of the given kind"""
+    _job_handlers[kind] = handler
+
+class JobQueue:
+    """
+    Durable priority job queue backed by a local SQLite file
+
+    Jobs are claimed with a lease so several worker threads (and several
+    uvicorn processes sharing the same file) can drain the queue safely, and
+    jobs left running by a dead worker are retried once the lease expires.
+    A live worker renews its lease every quarter lease while the handler
+    runs, so a slow job is never picked up a second time.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_JOB_DB, workers: int = DEFAULT_WORKERS,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.handlers = _job_handlers
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = 0,
+               job_id: Optional[str] = None) -> str:
+        """Persist a new job and wake a worker; higher priority runs first"""
+        job_id = job_id or f"job_{uuid.uuid4().hex}"
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, priority, json.dumps(payload), now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a job, including its result once completed"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "priority": row["priority"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the highest priority ready job, if any"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                        "lease_until = ?, updated_at = ? WHERE id = ?",
+                        (now + self.lease_seconds, now, row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def renew(self, job_id: str, attempt: int) -> bool:
+        """
+        Extend the lease of a running job; False if the lease was lost
+
+        The attempt number guards against extending a lease that has since
+        expired and been claimed by another worker.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+                (time.time() + self.lease_seconds, job_id, attempt)
+            )
+        return cursor.rowcount == 1
+
+    def _heartbeat(self, job_id: str, attempt: int, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 4):
+            try:
+                if not self.renew(job_id, attempt):
+                    logger.warning(f"Job {job_id} lost its lease while running")
+                    return
+            except sqlite3.Error:
+                # Retried on the next beat; the lease still has three quarters left
+                logger.exception(f"Could not renew the lease of job {job_id}")
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def run_once(self) -> bool:
+        """Claim and process a single job; returns False when the queue is empty"""
+        row = self.claim()
+        if row is None:
+            return False
+
+        job_id = row["id"]
+        if row["attempts"] + 1 > MAX_ATTEMPTS:
+            self._finish(job_id, "failed", error="Job abandoned after repeated worker failures")
+            return True
+
+        handler = self.handlers.get(row["kind"])
+        if handler is None:
+            self._finish(job_id, "failed", error=f"No handler registered for job kind '{row['kind']}'")
+            return True
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, row["attempts"] + 1, done),
+                                     name=f"job-lease-{job_id}", daemon=True)
+        heartbeat.start()
+        try:
+            result = handler(json.loads(row["payload"]))
+            self._finish(job_id, "completed", result=result)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            # Poll as a fallback for jobs submitted by other processes
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Start the worker pool (idempotent)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.workers} job workers on {self.db_path}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker pool; queued jobs stay on disk for the next start"""
+        with self._start_lock:
+            self._stopping.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue with its worker pool running"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    _job_queue.start()
+    return _job_queue
@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.app.services.intent_router import tokenize
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = os.getenv("GOLF_KNOWLEDGE_DIR", "")
+KNOWLEDGE_INDEX = os.getenv("GOLF_KNOWLEDGE_INDEX", "")
+# Below this BM25 score the best passage is not relevant enough to answer with
+MIN_SCORE = float(os.getenv("GOLF_KNOWLEDGE_MIN_SCORE", "3.0"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+CORPUS_EXTENSIONS = (".md", ".txt", ".jsonl")
+
+STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from get got have how i i'm if in into is it it's
+me my of on or should so than that the their them then there this to too up was what what's when where
+which who why will with would you your hi hello hey thanks thank please
+""".split())
+
+def analyze(text: str) -> List[str]:
+    """Index/query terms: word tokens minus stopwords, with plurals and -ing/-ed folded"""
+    terms = []
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 5 and token.endswith("ing"):
+            token = token[:-3]
+        elif len(token) > 4 and token.endswith("ed"):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+def load_corpus_dir(corpus_dir: str) -> List[Dict[str, str]]:
+    """
+    Passages from a corpus directory
+
+    .md/.txt files are split on blank lines (a "# heading" becomes the title
+    of the passages under it); .jsonl files hold one {"title", "text"} per line.
+    """
+    passages = []
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            if not name.endswith(CORPUS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            source = os.path.relpath(path, corpus_dir)
+            with open(path, "r", encoding="utf-8") as f:
+                if name.endswith(".jsonl"):
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            passages.append({"title": entry.get("title", source), "text": entry["text"], "source": source})
+                    continue
+                title = os.path.splitext(name)[0].replace("_", " ").replace("-", " ").title()
+                for block in f.read().split("\n\n"):
+                    block = block.strip()
+                    if block.startswith("#"):
+                        heading, _, block = block.partition("\n")
+                        title = heading.lstrip("#").strip()
+                        block = block.strip()
+                    if block:
+                        passages.append({"title": title, "text": " ".join(block.split()), "source": source})
+    return passages
+
+class KnowledgeIndex:
+    """
+    BM25 inverted index over knowledge passages
+
+    Postings store precomputed BM25 term weights (impact scores) in flat
+    numpy arrays, so a query is one vectorised scatter-add per query term and
+    a partial sort, well under a millisecond for tens of thousands of passages.
+    """
+
+    def __init__(self, passages: List[Dict[str, str]], vocabulary: Dict[str, int],
+                 offsets: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray):
+        self.passages = passages
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    @classmethod
+    def build(cls, passages: List[Dict[str, str]], k1: float = BM25_K1, b: float = BM25_B) -> "KnowledgeIndex":
+        postings: Dict[str, List[tuple]] = {}
+        lengths = []
+        for doc_id, passage in enumerate(passages):
+            terms = analyze(f"{passage.get('title', '')} {passage['text']}")
+            lengths.append(len(terms))
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        count = len(passages)
+        avg_length = (sum(lengths) / count) if count else 0.0
+        vocabulary = {}
+        offsets = [0]
+        doc_ids, weights = [], []
+        for term_id, (term, entries) in enumerate(sorted(postings.items())):
+            vocabulary[term] = term_id
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for doc_id, tf in entries:
+                norm = k1 * (1 - b + b * lengths[doc_id] / avg_length) if avg_length else k1
+                doc_ids.append(doc_id)
+                weights.append(idf * tf * (k1 + 1) / (tf + norm))
+            offsets.append(len(doc_ids))
+
+        return cls(
+            passages, vocabulary,
+            np.array(offsets, dtype=np.int64),
+            np.array(doc_ids, dtype=np.int32),
+            np.array(weights, dtype=np.float32)
+        )
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Top-k passages for a query, best first, with their BM25 scores"""
+        term_ids = {self.vocabulary[t] for t in analyze(query) if t in self.vocabulary}
+        if not term_ids or not self.passages:
+            return []
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A passage appears once per term's postings, so plain fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self.passages[i], "score": round(float(scores[i]), 3)}
+            for i in top if scores[i] > 0
+        ]
+
+    def save(self, path: str) -> None:
+        """Write a compact prebuilt index (one .npz holding postings, vocabulary and passages)"""
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                passages=np.frombuffer(json.dumps(self.passages).encode("utf-8"), dtype=np.uint8)
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "KnowledgeIndex":
+        with np.load(path) as data:
+            terms = data["terms"].tobytes().decode("utf-8").split("\n") if data["terms"].size else []
+            passages = json.loads(data["passages"].tobytes().decode("utf-8"))
+            return cls(
+                passages, {term: i for i, term in enumerate(terms)},
+                data["offsets"], data["doc_ids"], data["weights"]
+            )
+
+_knowledge_index: Optional[KnowledgeIndex] = None
+_knowledge_index_loaded = False
+_knowledge_index_lock = threading.Lock()
+
+def _load_configured_index() -> Optional[KnowledgeIndex]:
+    if KNOWLEDGE_INDEX and os.path.exists(KNOWLEDGE_INDEX):
+        index = KnowledgeIndex.load(KNOWLEDGE_INDEX)
+        logger.info(f"Loaded golf knowledge index {KNOWLEDGE_INDEX} ({len(index)} passages)")
+        return index
+    if KNOWLEDGE_DIR and os.path.isdir(KNOWLEDGE_DIR):
+        index = KnowledgeIndex.build(load_corpus_dir(KNOWLEDGE_DIR))
+        logger.info(f"Indexed golf knowledge corpus {KNOWLEDGE_DIR} ({len(index)} passages)")
+        return index
+    return None
+
+def get_knowledge_index() -> Optional[KnowledgeIndex]:
+    """Process-wide knowledge index, or None when no corpus or index file is configured"""
+    global _knowledge_index, _knowledge_index_loaded
+    if not _knowledge_index_loaded:
+        with _knowledge_index_lock:
+            if not _knowledge_index_loaded:
+                try:
+                    _knowledge_index = _load_configured_index()
+                except Exception:
+                    logger.exception("Could not load the golf knowledge index; using keyword routing only")
+                _knowledge_index_loaded = True
+    return _knowledge_index
+
+def retrieve_answer(question: str, min_score: float = MIN_SCORE) -> Optional[Dict[str, Any]]:
+    """Best passage for a question when it clears the relevance threshold"""
+    index = get_knowledge_index()
+    if index is None:
+        return None
+    hits = index.search(question, k=1)
+    if hits and hits[0]["score"] >= min_score:
+        return hits[0]
+    return None
+
+def build_index_file(corpus_dir: str, index_path: str) -> KnowledgeIndex:
+    """Index a corpus directory and write the prebuilt index file"""
+    index = KnowledgeIndex.build(load_corpus_dir(corpus_dir))
+    index.save(index_path)
+    return index
+
+if __name__ == "__main__":
+    # python -m backend.app.services.knowledge_retrieval <corpus_dir> <index_file>
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m backend.app.services.knowledge_retrieval <corpus_dir> <index_file>")
+    built = build_index_file(sys.argv[1], sys.argv[2])
+    print(f"Indexed {len(built)} passages into {sys.argv[2]}")
@@ -1,34 +1,46 @@
+import logging
 
-import os
+from backend.app.services.linkedin_auth import get_token_manager
+from backend.app.services.linkedin_invitations import get_invitation_dispatcher
+from backend.app.services.player_index import get_player_index
+
+logger = logging.getLogger(__name__)
 
 def get_linkedin_access_token():
-    # Real production: implement OAuth flow here
-    return os.getenv("LINKEDIN_ACCESS_TOKEN", "demo_token")
-
-def search_golfers(location):
-    # Use LinkedIn API in production.
-    # Here, demo data:
-    return [
-        {
-            "id": "1234",
-            "name": "Jordan Smith",
-            "headline": "Weekend Golfer & Software Engineer",
-            "location": "San Diego, CA",
-            "linkedin_url": "https://linkedin.com/in/jordansmith",
-            "skill_level": "Amateur",
-            "interests": ["Networking", "Charity Events"]
-        },
-        {
-            "id": "5678",
-            "name": "Taylor Kim",
-            "headline": "USC Golf Alum | PGA Hopeful",
-            "location": "San Diego, CA",
-            "linkedin_url": "https://linkedin.com/in/taylorkim",
-            "skill_level": "Pro",
-            "interests": ["Sponsorship", "Clinics"]
-        },
-    ]
+    """Cached OAuth access token (LINKEDIN_ACCESS_TOKEN when no OAuth client is configured)"""
+    return get_token_manager().get_token()
+
+def refresh_linkedin_access_token(rejected):
+    """A new access token in place of one the API answered 401 to"""
+    return get_token_manager().reject(rejected)
+
+def search_golfers(location=None, latitude=None, longitude=None, **filters):
+    """
+    Nearby golfers from the player discovery index, nearest first
+
+    Either coordinates or a location name is required; filters are passed
+    through to PlayerIndex.search. A name no indexed profile carries can't
+    be placed, so it lists players unranked (distance_km None), as the
+    search did before it was location-aware. Returns (profiles, next_cursor).
+    """
+    index = get_player_index()
+    if latitude is None or longitude is None:
+        if not location:
+            raise ValueError("Pass a location or latitude and longitude")
+        coordinates = index.locate(location)
+        if coordinates is None:
+            logger.info(f"Unknown location {location!r}; listing players unranked")
+            filters.pop("radius_km", None)
+            filters.pop("k", None)
+            return index.browse(**filters)
+        latitude, longitude = coordinates
+    return index.search(latitude, longitude, **filters)
 
 def send_linkedin_invitation(member_id, message):
-    # Stub for LinkedIn API POST
-    return True
+    """
+    Send one invitation through the shared dispatcher, waiting a bounded time
+
+    Returns its outbox row; status 'sent', 'failed', or still 'pending' /
+    'sending' when delivery outlasted the wait.
+    """
+    return get_invitation_dispatcher().send_now(member_id, message)
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are coalesced per process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = os.getenv("LINKEDIN_TOKEN_URL", "https://www.linkedin.com/oauth/v2/accessToken")
+CLIENT_ID = os.getenv("LINKEDIN_CLIENT_ID", "")
+CLIENT_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET", "")
+# With a refresh token the refresh_token grant is used, otherwise client_credentials
+REFRESH_TOKEN = os.getenv("LINKEDIN_REFRESH_TOKEN", "")
+# Used as is (never refreshed) when no OAuth client is configured
+STATIC_ACCESS_TOKEN = os.getenv("LINKEDIN_ACCESS_TOKEN", "demo_token")
+TOKEN_CACHE_PATH = os.getenv("LINKEDIN_TOKEN_CACHE", os.path.join(".data", "linkedin_token.json"))
+# Tokens are refreshed this long before they expire
+REFRESH_MARGIN_SECONDS = float(os.getenv("LINKEDIN_TOKEN_REFRESH_MARGIN", "300"))
+RETRY_SECONDS = 15.0
+
+class TokenRefreshError(Exception):
+    """The token endpoint could not issue an access token"""
+
+class LinkedInTokenManager:
+    """
+    Cached LinkedIn access token, refreshed in the background before it expires
+
+    Callers read the in-memory token; a timer refreshes it REFRESH_MARGIN
+    seconds ahead of expiry, so in steady state nobody waits on the token
+    endpoint. Refreshes are single-flight within a process (a lock) and
+    across uvicorn workers (a file lock plus a shared cache file that every
+    worker re-reads before calling the endpoint itself).
+    """
+
+    def __init__(self, token_url: str = TOKEN_URL, client_id: str = CLIENT_ID,
+                 client_secret: str = CLIENT_SECRET, refresh_token: str = REFRESH_TOKEN,
+                 cache_path: str = TOKEN_CACHE_PATH, refresh_margin: float = REFRESH_MARGIN_SECONDS,
+                 static_token: str = STATIC_ACCESS_TOKEN, timeout: float = 10.0):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.static_token = static_token
+        self.timeout = timeout
+        self._token: Optional[Dict[str, Any]] = None
+        self._refresh_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._background: Optional[threading.Thread] = None
+        self._background_lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self.stats = {"refreshes": 0, "shared_hits": 0, "failures": 0}
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    def _margin(self, token: Dict[str, Any]) -> float:
+        # Short-lived tokens are refreshed half way through instead
+        return min(self.refresh_margin, token.get("lifetime", float("inf")) / 2)
+
+    def _fresh(self, token: Optional[Dict[str, Any]], now: float, rejected: Optional[str] = None) -> bool:
+        return (token is not None and now < token["expires_at"] - self._margin(token)
+                and token["access_token"] != rejected)
+
+    def get_token(self) -> str:
+        """Current access token; only blocks when there is no unexpired token at all"""
+        if not self.configured:
+            return self.static_token
+        token = self._token
+        now = time.time()
+        if self._fresh(token, now):
+            return token["access_token"]
+        if token is not None and now < token["expires_at"]:
+            # Inside the refresh window but still valid: hand it out and refresh behind the caller
+            self._refresh_in_background()
+            return token["access_token"]
+        return self.refresh()["access_token"]
+
+    def start(self) -> None:
+        """Load or fetch the first token off the request path (e.g. at application startup)"""
+        if self.configured:
+            self._refresh_in_background()
+
+    def reject(self, access_token: str) -> str:
+        """
+        The API refused access_token (401): replace it and return the new token
+
+        A caller that lost the race finds the replacement another caller (or
+        worker) already fetched instead of refreshing again.
+        """
+        if not self.configured:
+            return self.static_token
+        return self.refresh(rejected=access_token)["access_token"]
+
+    def refresh(self, rejected: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Make sure a fresh token is cached and return it
+
+        Concurrent callers in this process wait on the one refresh already
+        running; other processes are kept out by the file lock and then pick
+        up the token the winner wrote to the shared cache. A rejected token
+        never counts as fresh.
+        """
+        with self._refresh_lock:
+            if self._fresh(self._token, time.time(), rejected):
+                return self._token
+            with self._file_lock():
+                shared = self._read_cache()
+                if self._fresh(shared, time.time(), rejected):
+                    self.stats["shared_hits"] += 1
+                    token = shared
+                else:
+                    try:
+                        token = self._fetch(shared)
+                    except TokenRefreshError:
+                        self.stats["failures"] += 1
+                        self._schedule(time.time() + RETRY_SECONDS)
+                        raise
+                    self._write_cache(token)
+                    self.stats["refreshes"] += 1
+            self._token = token
+            # Jitter spreads the workers' timers; all but the first find the shared token
+            self._schedule(token["expires_at"] - self._margin(token) * (1 - 0.2 * random.random()))
+            return token
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("LinkedIn token refresh failed")
+
+    def _refresh_in_background(self) -> None:
+        with self._background_lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(target=self._refresh_quietly, name="linkedin-token-refresh",
+                                                daemon=True)
+            self._background.start()
+
+    def _schedule(self, at: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(0.0, at - time.time()), self._refresh_quietly)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fetch(self, shared: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # A rotated refresh token written by another worker supersedes the configured one
+        refresh_token = (shared or {}).get("refresh_token") or self.refresh_token
+        form = {"client_id": self.client_id, "client_secret": self.client_secret}
+        if refresh_token:
+            form.update(grant_type="refresh_token", refresh_token=refresh_token)
+        else:
+            form["grant_type"] = "client_credentials"
+        if self._client is None:
+            self._client = httpx.Client(timeout=httpx.Timeout(self.timeout))
+        try:
+            response = self._client.post(self.token_url, data=form)
+        except httpx.HTTPError as e:
+            raise TokenRefreshError(f"Token endpoint unreachable: {e}") from e
+        if response.status_code != 200:
+            raise TokenRefreshError(f"Token endpoint returned HTTP {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        if "access_token" not in body:
+            raise TokenRefreshError("Token endpoint response has no access_token")
+        lifetime = float(body.get("expires_in", 3600))
+        return {
+            "access_token": body["access_token"],
+            "expires_at": time.time() + lifetime,
+            "lifetime": lifetime,
+            "refresh_token": body.get("refresh_token") or refresh_token or None
+        }
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                token = json.load(f)
+            return token if token.get("access_token") and token.get("expires_at") else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, token: Dict[str, Any]) -> None:
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(token, f)
+        os.replace(temp_path, self.cache_path)
+
+    def _file_lock(self):
+        return _FileLock(f"{self.cache_path}.lock")
+
+    def metrics(self) -> Dict[str, Any]:
+        token = self._token
+        return {
+            **self.stats,
+            "configured": self.configured,
+            "expires_in": round(token["expires_at"] - time.time(), 1) if token else None
+        }
+
+class _FileLock:
+    """Exclusive advisory lock on a file, held for the duration of a with block"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+_token_manager: Optional[LinkedInTokenManager] = None
+_token_manager_lock = threading.Lock()
+
+def get_token_manager() -> LinkedInTokenManager:
+    """Process-wide LinkedIn token manager"""
+    global _token_manager
+    if _token_manager is None:
+        with _token_manager_lock:
+            if _token_manager is None:
+                _token_manager = LinkedInTokenManager()
+    return _token_manager
@@ -0,0 +1,479 @@
+import asyncio
+import fcntl
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from backend.app.services.linkedin_auth import TokenRefreshError
+
+logger = logging.getLogger(__name__)
+
+# Unset: invitations are logged and marked sent without calling any API (local development)
+LINKEDIN_API_BASE = os.getenv("LINKEDIN_API_BASE", "")
+DEFAULT_OUTBOX_DB = os.getenv("LINKEDIN_OUTBOX_DB", os.path.join(".data", "linkedin_outbox.db"))
+CONCURRENCY = int(os.getenv("LINKEDIN_INVITE_CONCURRENCY", "16"))
+# Provider quota: sustained invitations per second and the burst allowed on top
+RATE_PER_SECOND = float(os.getenv("LINKEDIN_INVITE_RATE", "10"))
+BURST = int(os.getenv("LINKEDIN_INVITE_BURST", "20"))
+MAX_ATTEMPTS = int(os.getenv("LINKEDIN_INVITE_ATTEMPTS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("LINKEDIN_INVITE_MAX_BATCH", "5000"))
+# An invitation left 'sending' by a dead process is picked up again after this long;
+# the dispatcher renews the leases of everything it holds well before then
+LEASE_SECONDS = 120.0
+LEASE_RENEW_SECONDS = LEASE_SECONDS / 4
+# How often a process that is not draining the outbox checks whether the drainer died
+LEADER_RETRY_SECONDS = 5.0
+# How long the single-invitation endpoint waits for delivery before answering "queued"
+SEND_NOW_TIMEOUT = float(os.getenv("LINKEDIN_SEND_NOW_TIMEOUT", "15"))
+INVITATIONS_PATH = "/v2/invitations"
+RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+class InvitationOutbox:
+    """
+    Durable record of every invitation to send, backed by a local SQLite file
+
+    Invitations are written before any request goes out and claimed with a
+    lease, so a crash or restart resumes the unsent (and the in-flight)
+    ones instead of losing them. Each invitation's id travels as an
+    idempotency key, letting the provider drop the rare double send.
+    Higher-priority rows (single sends someone is waiting on) are claimed
+    before queued batches.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_OUTBOX_DB):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS invitations (
+                    id TEXT PRIMARY KEY,
+                    batch_id TEXT NOT NULL,
+                    member_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(invitations)")}
+            if "priority" not in columns:
+                conn.execute("ALTER TABLE invitations ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS invitations_ready ON invitations (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS invitations_batch ON invitations (batch_id, status)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, batch_id: str, invitations: List[Dict[str, str]], priority: int = 0) -> List[Dict[str, Any]]:
+        """Persist a batch of {"member_id", "message"} invitations for the dispatcher, in one transaction"""
+        now = time.time()
+        rows = [{
+            "id": f"inv_{uuid.uuid4().hex}",
+            "batch_id": batch_id,
+            "member_id": invitation["member_id"],
+            "message": invitation["message"],
+            "attempts": 0
+        } for invitation in invitations]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO invitations (id, batch_id, member_id, message, status, priority, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                    [(r["id"], batch_id, r["member_id"], r["message"], priority, now, now) for r in rows]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def claim(self, limit: int, lease_seconds: float = LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Atomically lease up to limit pending (or abandoned in-flight) invitations, by priority then age"""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, batch_id, member_id, message, attempts FROM invitations "
+                    "WHERE status = 'pending' OR (status = 'sending' AND lease_until < ?) "
+                    "ORDER BY priority DESC, created_at LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE invitations SET status = 'sending', lease_until = ?, updated_at = ? WHERE id = ?",
+                    [(now + lease_seconds, now, row["id"]) for row in rows]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [dict(row) for row in rows]
+
+    def renew(self, invitation_ids: List[str], lease_seconds: float = LEASE_SECONDS) -> None:
+        """Extend the leases of invitations still being worked on"""
+        if not invitation_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE invitations SET lease_until = ? WHERE id = ? AND status = 'sending'",
+                [(time.time() + lease_seconds, invitation_id) for invitation_id in invitation_ids]
+            )
+
+    def get(self, invitation_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, member_id, status, attempts, error FROM invitations WHERE id = ?", (invitation_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def finish(self, outcomes: List[Tuple[str, str, int, Optional[str]]]) -> None:
+        """Record (invitation id, status, attempts, error) outcomes in one transaction"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE invitations SET status = ?, attempts = ?, error = ?, lease_until = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    [(status, attempts, error, now, invitation_id)
+                     for invitation_id, status, attempts, error in outcomes]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def batch(self, batch_id: str, max_failures: int = 50) -> Optional[Dict[str, Any]]:
+        """Per-status counts for a batch, with the first failures; None for an unknown batch"""
+        with self._connect() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM invitations WHERE batch_id = ? GROUP BY status", (batch_id,)
+            ).fetchall())
+            if not counts:
+                return None
+            failures = conn.execute(
+                "SELECT member_id, error FROM invitations WHERE batch_id = ? AND status = 'failed' LIMIT ?",
+                (batch_id, max_failures)
+            ).fetchall()
+        return {
+            "batch_id": batch_id,
+            "total": sum(counts.values()),
+            **{status: counts.get(status, 0) for status in ("pending", "sending", "sent", "failed")},
+            "done": counts.get("pending", 0) + counts.get("sending", 0) == 0,
+            "failures": [{"linkedin_member_id": row["member_id"], "error": row["error"]} for row in failures]
+        }
+
+class AsyncTokenBucket:
+    """
+    Token bucket for one event loop: rate tokens per second, up to burst
+
+    A provider 429 pauses the whole bucket until its Retry-After, so every
+    sender backs off together instead of each discovering the limit alone.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+class InvitationDispatcher:
+    """
+    Drains the invitation outbox through one pooled, keep-alive HTTP client
+
+    Up to `concurrency` invitations are in flight at once, all drawing from a
+    shared token bucket sized to the provider quota. Transient failures
+    (timeouts, 429, 5xx) are retried with jittered exponential backoff,
+    honouring Retry-After; other 4xx responses fail the invitation at once.
+    Tokens are fetched off the event loop, a failed token refresh counts as
+    a failed attempt, and a 401 refreshes the token and retries once.
+
+    Every uvicorn worker starts a dispatcher, but only the one holding the
+    outbox's leader lock (an flock, released by the OS if it dies) sends,
+    so the bucket really is the provider quota rather than a multiple of
+    it. Leases of claimed invitations are renewed while they are held, so
+    long Retry-After pauses never hand them to a second sender.
+    """
+
+    def __init__(self, outbox: InvitationOutbox, token_provider: Callable[[], str],
+                 token_refresher: Optional[Callable[[str], str]] = None, api_base: str = LINKEDIN_API_BASE, concurrency: int = CONCURRENCY,
+                 rate_per_second: float = RATE_PER_SECOND, burst: int = BURST,
+                 max_attempts: int = MAX_ATTEMPTS, timeout: float = 10.0, poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.token_provider = token_provider
+        self.token_refresher = token_refresher
+        self.api_base = api_base.rstrip("/")
+        self.concurrency = concurrency
+        self.bucket = AsyncTokenBucket(rate_per_second, burst)
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._outcomes: List[Tuple[str, str, int, Optional[str]]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Queue] = None
+        self._held: set = set()
+        self._leader_fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                timeout=httpx.Timeout(self.timeout)
+            )
+        return self._client
+
+    async def _post(self, invitation: Dict[str, Any]) -> httpx.Response:
+        # The token manager may block on the token endpoint; keep that off the loop
+        token = await asyncio.to_thread(self.token_provider)
+        response = await self._post_with(invitation, token)
+        if response.status_code == 401 and self.token_refresher is not None:
+            token = await asyncio.to_thread(self.token_refresher, token)
+            await self.bucket.acquire()
+            response = await self._post_with(invitation, token)
+        return response
+
+    async def _post_with(self, invitation: Dict[str, Any], token: str) -> httpx.Response:
+        return await self._get_client().post(
+            f"{self.api_base}{INVITATIONS_PATH}",
+            json={"invitee": invitation["member_id"], "message": invitation["message"]},
+            headers={
+                "Authorization": f"Bearer {token}",
+                "X-Idempotency-Key": invitation["id"]
+            }
+        )
+
+    async def _send(self, invitation: Dict[str, Any]) -> Tuple[str, str, int, Optional[str]]:
+        """Send one claimed invitation, retrying transient failures; returns its outcome"""
+        attempts = invitation.get("attempts", 0)
+        error = None
+        if not self.api_base:
+            logger.info(f"LinkedIn invitation to {invitation['member_id']} (no LINKEDIN_API_BASE; not sent)")
+            return invitation["id"], "sent", attempts, None
+        while attempts < self.max_attempts:
+            await self.bucket.acquire()
+            attempts += 1
+            retry_after = None
+            try:
+                response = await self._post(invitation)
+                if response.status_code < 300:
+                    return invitation["id"], "sent", attempts, None
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+                if response.headers.get("retry-after", "").isdigit():
+                    retry_after = float(response.headers["retry-after"])
+                    if response.status_code == 429:
+                        self.bucket.pause(retry_after)
+            except (httpx.HTTPError, TokenRefreshError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempts < self.max_attempts:
+                delay = retry_after or min(30.0, 0.5 * 2 ** (attempts - 1)) * (0.5 + random.random())
+                await asyncio.sleep(delay)
+        logger.warning(f"LinkedIn invitation to {invitation['member_id']} failed after {attempts} attempts: {error}")
+        return invitation["id"], "failed", attempts, error
+
+    async def _worker(self) -> None:
+        while True:
+            invitation = await self._ready.get()
+            try:
+                outcome = await self._send(invitation)
+                # Appended after the await: _run swaps in a fresh list while sends are in flight
+                self._outcomes.append(outcome)
+            except Exception:
+                # Left 'sending'; once its lease lapses it is handed out again
+                logger.exception(f"Invitation {invitation['id']} delivery crashed")
+            finally:
+                self._held.discard(invitation["id"])
+                self._wakeup.set()
+
+    def _lead(self) -> bool:
+        """Hold (or try to take) the outbox leader lock; only the leader sends"""
+        if self._leader_fd is not None:
+            return True
+        fd = os.open(self.outbox.db_path + ".leader", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        logger.info(f"Delivering LinkedIn invitations from this process (pid {os.getpid()})")
+        return True
+
+    async def _run(self) -> None:
+        """
+        Keep the workers fed from the outbox and write their outcomes back
+
+        Invitations are claimed in bulk into a local queue before it runs dry,
+        and the outcomes gathered since the last pass are recorded in one
+        transaction, so the database costs a few writes per batch rather than
+        several per invitation.
+        """
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Queue()
+        for _ in range(self.concurrency):
+            asyncio.ensure_future(self._worker())
+        renewed_at = time.monotonic()
+        while not self._lead():
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+        while True:
+            try:
+                if self._outcomes:
+                    outcomes, self._outcomes = self._outcomes, []
+                    await asyncio.to_thread(self.outbox.finish, outcomes)
+                if time.monotonic() - renewed_at >= LEASE_RENEW_SECONDS:
+                    renewed_at = time.monotonic()
+                    await asyncio.to_thread(self.outbox.renew, list(self._held))
+                if self._ready.qsize() < self.concurrency:
+                    for invitation in await asyncio.to_thread(self.outbox.claim, 2 * self.concurrency - self._ready.qsize()):
+                        self._held.add(invitation["id"])
+                        self._ready.put_nowait(invitation)
+            except Exception:
+                logger.exception("Invitation outbox error")
+            if not self._outcomes:
+                # Woken when a send finishes or a batch is queued; polling covers other processes
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop draining the outbox (idempotent)"""
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="linkedin-invitations", daemon=True).start()
+                    asyncio.run_coroutine_threadsafe(self._run(), loop)
+                    self._loop = loop
+        return self._loop
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop sending, record finished outcomes and give up the leader lock"""
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._outcomes:
+                outcomes, self._outcomes = self._outcomes, []
+                await asyncio.to_thread(self.outbox.finish, outcomes)
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)
+            self._leader_fd = None
+        self._held.clear()
+        self._loop = None
+
+    def wake(self) -> None:
+        loop = self.start()
+        loop.call_soon_threadsafe(lambda: self._wakeup and self._wakeup.set())
+
+    def send_now(self, member_id: str, message: str, timeout: float = SEND_NOW_TIMEOUT) -> Dict[str, Any]:
+        """
+        Queue one invitation ahead of any batches and wait up to timeout for its outcome
+
+        Whichever process leads the outbox sends it. Returns the invitation
+        row; a status of 'pending' or 'sending' means it is still on its way.
+        """
+        invitation = self.outbox.add(f"single_{uuid.uuid4().hex[:12]}",
+                                     [{"member_id": member_id, "message": message}], priority=1)[0]
+        self.wake()
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self.outbox.get(invitation["id"])
+            if row["status"] in ("sent", "failed") or time.monotonic() >= deadline:
+                return row
+            time.sleep(0.05)
+
+_dispatcher: Optional[InvitationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_invitation_dispatcher() -> InvitationDispatcher:
+    """Process-wide invitation dispatcher over the shared outbox"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                # Imported here: linkedin_agent sends its invitations through this module
+                from backend.app.services.linkedin_agent import (
+                    get_linkedin_access_token, refresh_linkedin_access_token
+                )
+                _dispatcher = InvitationDispatcher(InvitationOutbox(), get_linkedin_access_token,
+                                                   refresh_linkedin_access_token)
+    return _dispatcher
+
+def queue_invitations(invitations: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Queue a batch of {"member_id", "message"} invitations for background delivery
+
+    Repeated member ids are sent once. Returns the batch id and the number queued.
+    """
+    unique: Dict[str, Dict[str, str]] = {}
+    for invitation in invitations:
+        unique.setdefault(invitation["member_id"], invitation)
+    if not unique:
+        raise ValueError("No invitations to send")
+    if len(unique) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} invitations per batch")
+    dispatcher = get_invitation_dispatcher()
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    dispatcher.outbox.add(batch_id, list(unique.values()))
+    dispatcher.wake()
+    return {"batch_id": batch_id, "queued": len(unique)}
+
+def get_invitation_batch(batch_id: str) -> Optional[Dict[str, Any]]:
+    return get_invitation_dispatcher().outbox.batch(batch_id)
@@ -0,0 +1,116 @@
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from backend.app.models import MediaUpload
+from backend.app.services.job_queue import get_job_queue, register_job_handler
+from backend.app.services.downloader import DownloadError
+from backend.app.services.media_processor import process_media_upload, extract_voice_tag, local_media_path
+from backend.app.services.notifier import get_notifier
+from backend.app.services.perceptual_hash import clip_fingerprint, get_near_duplicate_index
+from backend.app.services.swing_analysis import analyze_swing_cached
+from backend.app.services.swing_history import get_swing_history_store
+from backend.app.services.swing_workers import analyze_clip
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_MEDIA_JOB = "whatsapp_media"
+# Re-encoded or re-sent copies of an analysed swing reuse its analysis
+NEAR_DUPLICATE_DETECTION = os.getenv("NEAR_DUPLICATE_DETECTION", "true").lower() in ("1", "true", "yes")
+
+def parse_whatsapp_payload(payload: Dict[str, Any]) -> MediaUpload:
+    """
+    Validate a webhook payload and turn it into a MediaUpload
+
+    Accepts the simplified format ("from", "media_url") as well as Twilio's
+    field names ("From", "MediaUrl0", "Body").
+    """
+    sender = payload.get("from") or payload.get("From")
+    media_url = payload.get("media_url") or payload.get("MediaUrl0")
+    if not sender or not media_url:
+        raise ValueError("Invalid WhatsApp payload format")
+
+    upload = MediaUpload(
+        player_id=sender,
+        video_url=media_url,
+        timestamp=payload.get("timestamp"),
+        voice_tag=payload.get("caption") or payload.get("voice_tag") or payload.get("Body") or None,
+        message_id=payload.get("message_id") or payload.get("MessageSid")
+    )
+    # Reject bad URLs now, while the sender can still get an error back
+    return process_media_upload(upload)
+
+def _fingerprint_upload(video_url: str) -> Optional[Dict[str, Any]]:
+    try:
+        path = local_media_path(video_url)
+        return clip_fingerprint(path) if path else None
+    except (DownloadError, ValueError) as e:
+        logger.info(f"No perceptual fingerprint for {video_url[:50]}: {e}")
+        return None
+
+def analyze_upload_video(video_url: str, player_id: str) -> Dict[str, Any]:
+    """
+    Analyse a player's uploaded clip, reusing the analysis of a perceptual
+    near-duplicate of one of their earlier clips
+
+    Byte hashes miss the same swing re-sent from another device or re-encoded;
+    keyframe dHashes catch it, and the original's content hash replays its
+    (deterministic, cached) analysis.
+    """
+    fingerprint = _fingerprint_upload(video_url) if NEAR_DUPLICATE_DETECTION else None
+    if fingerprint is not None:
+        match = get_near_duplicate_index().find(fingerprint, player_id)
+        if match is not None:
+            logger.info(f"{video_url[:50]} is a near-duplicate of {match['content_hash'][:12]} "
+                        f"(distance {match['distance']})")
+            analysis = analyze_swing_cached(video_url, content_hash=match["content_hash"])
+            analysis["swing_features"] = match["swing_features"]
+            analysis["near_duplicate_of"] = match["content_hash"]
+            return analysis
+
+    analysis = analyze_clip(video_url)
+    if fingerprint is not None:
+        get_near_duplicate_index().add(fingerprint, analysis["content_hash"], player_id,
+                                       analysis.get("swing_features"))
+    return analysis
+
+def analyze_media_upload(upload: MediaUpload) -> Dict[str, Any]:
+    """Full media pipeline: validate, tag, analyse the swing and record it in the player's history"""
+    processed_upload = process_media_upload(upload)
+
+    # Extract voice tag if audio is present (stubbed for now)
+    if not upload.voice_tag and upload.video_url:
+        processed_upload.voice_tag = extract_voice_tag(upload.video_url)
+
+    # Analyze the swing; long glasses clips are cut down to the active swing window first
+    analysis_result = analyze_upload_video(processed_upload.video_url, processed_upload.player_id)
+    get_swing_history_store().record(processed_upload.player_id, analysis_result)
+
+    # Enhance analysis with metadata from upload
+    return {
+        **analysis_result,
+        "video_url": processed_upload.video_url,
+        "summary": f"Analysis for player {processed_upload.player_id}: {analysis_result['summary']}",
+        "advice": f"{analysis_result['advice']} (Analyzed from WhatsApp upload at {processed_upload.timestamp or 'unknown time'})"
+    }
+
+def run_whatsapp_media_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: analyse a queued WhatsApp upload and push the result to the player"""
+    upload = MediaUpload(**payload["upload"])
+    analysis = analyze_media_upload(upload)
+    try:
+        get_notifier().send(
+            upload.player_id,
+            f"{analysis['summary']} {analysis['advice']}",
+            {"overall_rating": analysis.get("overall_rating"), "video_url": analysis.get("video_url")}
+        )
+    except Exception:
+        # The analysis is stored either way; a failed push shouldn't redo it
+        logger.exception(f"Could not deliver swing analysis to {upload.player_id}")
+    return analysis
+
+register_job_handler(WHATSAPP_MEDIA_JOB, run_whatsapp_media_job)
+
+def enqueue_media_upload(upload: MediaUpload, priority: int = 0) -> str:
+    """Persist an upload for background analysis and return its job id"""
+    return get_job_queue().submit(WHATSAPP_MEDIA_JOB, {"upload": upload.model_dump()}, priority=priority)
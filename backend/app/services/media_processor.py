@@ -1,7 +1,15 @@
 
 from backend.app.models import MediaUpload
+from backend.app.services.downloader import DownloadError, download_video
+from backend.app.services.swing_frames import resolve_local_video
+from backend.app.services.voice_pipeline import AudioUnavailable, get_transcriber, transcribe_clip
 from datetime import datetime
+from typing import Any, Dict, Optional
 import logging
+import os
+import wave
+
+import httpx
 
 # Set up logging for media processing
 logging.basicConfig(level=logging.INFO)
@@ -26,17 +34,36 @@ def process_media_upload(upload: MediaUpload) -> MediaUpload:
     
     return upload
 
-def extract_voice_tag(video_url: str) -> str:
+# Remote clips are fetched through the shared downloader so their audio can be transcribed
+VOICE_TRANSCRIPTION_ENABLED = os.getenv("VOICE_TRANSCRIPTION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def local_media_path(video_url: str) -> Optional[str]:
+    """Local file for a clip, downloading remote ones (raises DownloadError)"""
+    path = resolve_local_video(video_url)
+    if path is None and video_url.startswith(("http://", "https://")):
+        path = download_video(video_url)["path"]
+    return path
+
+def transcribe_media(video_url: str) -> Optional[Dict[str, Any]]:
     """
-    Extract voice tag from video using OpenAI Whisper (stubbed for MVP)
-    In production, this would transcribe audio from the video
+    Transcribe the speech in a clip's audio track (see voice_pipeline)
+
+    Returns None when no transcription backend is configured, the audio
+    can't be fetched or decoded, or the transcription service fails.
     """
-    # TODO: Implement actual Whisper transcription
-    # For now, return a simulated voice tag
-    
-    logger.info(f"Extracting voice tag from video: {video_url[:50]}...")
-    
-    # Simulate different voice tags based on video URL patterns
+    if get_transcriber() is None:
+        return None
+    try:
+        path = local_media_path(video_url)
+        if path is None:
+            return None
+        return transcribe_clip(path)
+    except (AudioUnavailable, DownloadError, OSError, EOFError, wave.Error, httpx.HTTPError) as e:
+        logger.info(f"No transcript for {video_url[:50]}: {e}")
+        return None
+
+def _keyword_voice_tag(video_url: str) -> str:
+    # Fallback when there is no usable speech: guess from the URL
     if "morning" in video_url.lower():
         return "Morning practice session on driving range"
     elif "hole" in video_url.lower():
@@ -46,19 +73,26 @@ def extract_voice_tag(video_url: str) -> str:
     else:
         return "Swing analysis requested via Smart Glasses"
 
+def extract_voice_tag(video_url: str) -> str:
+    """
+    Extract voice tag from the clip's speech; falls back to URL keywords
+    when there is no audio or nothing was said
+    """
+    logger.info(f"Extracting voice tag from video: {video_url[:50]}...")
+
+    if VOICE_TRANSCRIPTION_ENABLED:
+        transcript = transcribe_media(video_url)
+        if transcript and transcript["text"]:
+            return transcript["text"]
+    return _keyword_voice_tag(video_url)
+
 def simulate_whisper_transcription(video_url: str) -> str:
     """
-    Placeholder for OpenAI Whisper integration
-    In production, this would:
-    1. Download video from URL
-    2. Extract audio track
-    3. Send to Whisper API for transcription
-    4. Return transcribed text
+    Transcribe a clip through the VAD-gated pipeline
+    (the Whisper backend is selected with VOICE_TRANSCRIBER=whisper; with no
+    backend configured this returns the placeholder)
     """
-    # Real implementation would look like:
-    # import openai
-    # audio_file = extract_audio_from_video(video_url)
-    # transcript = openai.Audio.transcribe("whisper-1", audio_file)
-    # return transcript["text"]
-    
-    return "Smart Glasses voice command placeholder"
+    transcript = transcribe_media(video_url)
+    if not transcript or not transcript["text"]:
+        return "Smart Glasses voice command placeholder"
+    return transcript["text"]
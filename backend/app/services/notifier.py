@@ -0,0 +1,94 @@
+import abc
+import base64
+import json
+import logging
+import os
+import threading
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Notifier(abc.ABC):
+    """Delivers analysis results back to a player (WhatsApp, SMS, ...)"""
+
+    @abc.abstractmethod
+    def send(self, recipient: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        ...
+
+class LoggingNotifier(Notifier):
+    """Default notifier: logs the outbound message only"""
+
+    def send(self, recipient: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        logger.info(f"Notify {recipient}: {message}")
+
+class LocalNotifier(Notifier):
+    """Local stand-in that records deliveries in memory and optionally in a JSONL file"""
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path
+        self.sent: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def send(self, recipient: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        delivery = {"to": recipient, "message": message, "data": data}
+        with self._lock:
+            self.sent.append(delivery)
+            if self.log_path:
+                if os.path.dirname(self.log_path):
+                    os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(delivery) + "\n")
+
+class TwilioWhatsAppNotifier(Notifier):
+    """Sends WhatsApp messages through the Twilio Messages API"""
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str,
+                 api_base: str = "https://api.twilio.com", timeout: float = 10.0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+
+    def send(self, recipient: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        to = recipient if recipient.startswith("whatsapp:") else f"whatsapp:{recipient}"
+        body = urllib.parse.urlencode({"From": self.from_number, "To": to, "Body": message}).encode()
+        request = urllib.request.Request(
+            f"{self.api_base}/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+            data=body,
+            method="POST"
+        )
+        credentials = base64.b64encode(f"{self.account_sid}:{self.auth_token}".encode()).decode()
+        request.add_header("Authorization", f"Basic {credentials}")
+        request.add_header("Content-Type", "application/x-www-form-urlencoded")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+_notifier: Optional[Notifier] = None
+
+def create_notifier_from_env() -> Notifier:
+    """Pick the notifier named by MEDIA_NOTIFIER: log (default), local or twilio"""
+    kind = os.getenv("MEDIA_NOTIFIER", "log").lower()
+    if kind == "local":
+        return LocalNotifier(os.getenv("MEDIA_NOTIFIER_LOG", os.path.join(".data", "notifications.jsonl")))
+    if kind == "twilio":
+        return TwilioWhatsAppNotifier(
+            account_sid=os.getenv("TWILIO_ACCOUNT_SID", ""),
+            auth_token=os.getenv("TWILIO_AUTH_TOKEN", ""),
+            from_number=os.getenv("TWILIO_WHATSAPP_FROM", ""),
+            api_base=os.getenv("TWILIO_API_BASE", "https://api.twilio.com")
+        )
+    return LoggingNotifier()
+
+def get_notifier() -> Notifier:
+    global _notifier
+    if _notifier is None:
+        _notifier = create_notifier_from_env()
+    return _notifier
+
+def set_notifier(notifier: Notifier) -> None:
+    """Swap the outbound notifier (e.g. a LocalNotifier in tests)"""
+    global _notifier
+    _notifier = notifier
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backend.app.services.swing_frames import sample_keyframes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.getenv("NEAR_DUPLICATE_INDEX_PATH", os.path.join(".data", "near_duplicates.jsonl"))
+KEYFRAME_COUNT = 8
+# Largest clip-hash Hamming distance (of 64 bits) still treated as the same swing.
+# Re-encoded, rescaled and brightened copies of a clip land within 3-4 bits;
+# a different swing filmed from the same fixed camera by the same player can
+# come within 6, so the limit sits below that.
+MAX_CLIP_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "4"))
+# Mean per-keyframe distance allowed when confirming a candidate. Keyframe
+# hashes are noisier than the clip hash (re-encodes reach about 8), so this
+# only rejects candidates whose average frame matches but whose motion doesn't.
+MAX_FRAME_DISTANCE = float(os.getenv("NEAR_DUPLICATE_MAX_FRAME_DISTANCE", "10"))
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash: whether each pixel of a 9x8 thumbnail is brighter than its left neighbour"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def clip_fingerprint(path: str) -> Dict[str, Any]:
+    """
+    Perceptual fingerprint of a clip
+
+    A dHash for each of 8 evenly spaced keyframes plus one for their average,
+    which survives re-encoding, rescaling and small brightness changes.
+    """
+    keyframes = sample_keyframes(path, KEYFRAME_COUNT)
+    return {
+        "clip_hash": dhash(keyframes.mean(axis=0)),
+        "frame_hashes": [dhash(frame) for frame in keyframes]
+    }
+
+class MultiIndexHashTable:
+    """
+    Hamming-radius search over 64-bit codes
+
+    Each code is split into 4 16-bit substrings with a hash table apiece. Two
+    codes within distance r agree to within r // 4 bits on at least one
+    substring, so a query only probes the few buckets near its own substrings
+    instead of scanning every code.
+    """
+
+    def __init__(self, bits: int = 64, substrings: int = 4):
+        self.substrings = substrings
+        self.sub_bits = bits // substrings
+        self.sub_mask = (1 << self.sub_bits) - 1
+        self.codes: List[int] = []
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(substrings)]
+        self._flip_masks: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _parts(self, code: int) -> List[int]:
+        return [(code >> (i * self.sub_bits)) & self.sub_mask for i in range(self.substrings)]
+
+    def _masks(self, radius: int) -> List[int]:
+        # All sub_bits-wide masks with at most `radius` bits set
+        if radius not in self._flip_masks:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for positions in combinations(range(self.sub_bits), r):
+                    masks.append(sum(1 << p for p in positions))
+            self._flip_masks[radius] = masks
+        return self._flip_masks[radius]
+
+    def add(self, code: int) -> int:
+        """Index a code; returns its position"""
+        position = len(self.codes)
+        self.codes.append(code)
+        for table, part in zip(self.tables, self._parts(code)):
+            table.setdefault(part, []).append(position)
+        return position
+
+    def search(self, code: int, radius: int) -> List[Tuple[int, int]]:
+        """(position, distance) of every indexed code within radius, nearest first"""
+        masks = self._masks(radius // self.substrings)
+        candidates = set()
+        for table, part in zip(self.tables, self._parts(code)):
+            for mask in masks:
+                bucket = table.get(part ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+        matches = []
+        for position in candidates:
+            distance = hamming(code, self.codes[position])
+            if distance <= radius:
+                matches.append((position, distance))
+        matches.sort(key=lambda m: m[1])
+        return matches
+
+class NearDuplicateIndex:
+    """
+    Perceptual fingerprints of analysed clips, persisted as an append-only JSONL log
+
+    Clips are indexed per player and only ever match the same player's clips:
+    with a fixed range camera another player's swing can look close enough to
+    pass the distance limits, and must not be handed their analysis. Entries
+    logged without a player_id are kept but never matched.
+    """
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_INDEX_PATH):
+        self.log_path = log_path
+        self.tables: Dict[Optional[str], MultiIndexHashTable] = {}
+        self.entries: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        self.content_hashes = set()
+        self._lock = threading.Lock()
+        if log_path:
+            self._replay()
+
+    def _replay(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping corrupt near-duplicate index entry")
+                    continue
+                self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry["clip_hash"] = int(entry["clip_hash"], 16)
+        entry["frame_hashes"] = [int(h, 16) for h in entry["frame_hashes"]]
+        player_id = entry.get("player_id")
+        self.tables.setdefault(player_id, MultiIndexHashTable()).add(entry["clip_hash"])
+        self.entries.setdefault(player_id, []).append(entry)
+        self.content_hashes.add((player_id, entry["content_hash"]))
+
+    def find(self, fingerprint: Dict[str, Any], player_id: str,
+             max_distance: int = MAX_CLIP_DISTANCE) -> Optional[Dict[str, Any]]:
+        """Closest of the player's indexed clips that is a near-duplicate of the fingerprint, with its distances"""
+        with self._lock:
+            table = self.tables.get(player_id) if player_id is not None else None
+            if table is None:
+                return None
+            for position, distance in table.search(fingerprint["clip_hash"], max_distance):
+                entry = self.entries[player_id][position]
+                frame_distance = float(np.mean([
+                    hamming(a, b) for a, b in zip(fingerprint["frame_hashes"], entry["frame_hashes"])
+                ]))
+                if frame_distance <= MAX_FRAME_DISTANCE:
+                    return {**entry, "distance": distance, "frame_distance": round(frame_distance, 2)}
+        return None
+
+    def add(self, fingerprint: Dict[str, Any], content_hash: str, player_id: str,
+            swing_features: Optional[Dict[str, Any]] = None) -> bool:
+        """Index a player's analysed clip; returns False if the player already has it indexed"""
+        entry = {
+            "player_id": player_id,
+            "content_hash": content_hash,
+            "clip_hash": f"{fingerprint['clip_hash']:016x}",
+            "frame_hashes": [f"{h:016x}" for h in fingerprint["frame_hashes"]],
+            "swing_features": swing_features
+        }
+        with self._lock:
+            if (player_id, content_hash) in self.content_hashes:
+                return False
+            line = json.dumps(entry)
+            self._append(entry)
+            if self.log_path:
+                try:
+                    if os.path.dirname(self.log_path):
+                        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not persist near-duplicate index entry: {e}")
+        return True
+
+_near_duplicate_index: Optional[NearDuplicateIndex] = None
+_near_duplicate_index_lock = threading.Lock()
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Process-wide near-duplicate clip index"""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        with _near_duplicate_index_lock:
+            if _near_duplicate_index is None:
+                _near_duplicate_index = NearDuplicateIndex()
+    return _near_duplicate_index
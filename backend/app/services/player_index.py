@@ -0,0 +1,271 @@
+import base64
+import json
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAYERS_PATH = os.getenv("PLAYER_INDEX_PATH", os.path.join(".data", "players.jsonl"))
+# Grid cell size; ~55 km at the equator, a good fit for the default 50 km radius
+GRID_DEGREES = float(os.getenv("PLAYER_GRID_DEGREES", "0.5"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_PAGE_SIZE = 100
+DEFAULT_RADIUS_KM = 50.0
+
+SKILL_LEVELS = ("Beginner", "Amateur", "Intermediate", "Advanced", "Pro")
+_SKILL_CODES = {level.lower(): code for code, level in enumerate(SKILL_LEVELS)}
+_UNKNOWN_SKILL = 255
+
+# Used when no player file exists yet, so discovery works out of the box
+DEMO_PLAYERS = [
+    {
+        "id": "1234",
+        "name": "Jordan Smith",
+        "headline": "Weekend Golfer & Software Engineer",
+        "location": "San Diego, CA",
+        "linkedin_url": "https://linkedin.com/in/jordansmith",
+        "skill_level": "Amateur",
+        "interests": ["Networking", "Charity Events"],
+        "latitude": 32.7157,
+        "longitude": -117.1611
+    },
+    {
+        "id": "5678",
+        "name": "Taylor Kim",
+        "headline": "USC Golf Alum | PGA Hopeful",
+        "location": "San Diego, CA",
+        "linkedin_url": "https://linkedin.com/in/taylorkim",
+        "skill_level": "Pro",
+        "interests": ["Sponsorship", "Clinics"],
+        "latitude": 32.8328,
+        "longitude": -117.2713
+    },
+]
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to many (all in degrees)"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def encode_cursor(distance_km: float, position: int) -> str:
+    raw = json.dumps([round(distance_km, 6), position]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        distance_km, position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(distance_km), int(position)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+class PlayerIndex:
+    """
+    Grid index of player profiles for radius and nearest-neighbour search
+
+    Players are sorted by grid cell (GRID_DEGREES square) into flat numpy
+    columns. Each latitude row of a query's bounding box is one contiguous
+    slice of those columns, so a search gathers a few slices, filters them
+    and computes exact haversine distances for the survivors only.
+    """
+
+    def __init__(self, profiles: List[Dict[str, Any]], grid_degrees: float = GRID_DEGREES):
+        self.grid_degrees = grid_degrees
+        self.lon_cells = int(math.ceil(360 / grid_degrees))
+        located = [p for p in profiles if p.get("latitude") is not None and p.get("longitude") is not None]
+
+        lats = np.array([p["latitude"] for p in located], dtype=np.float64)
+        lons = np.array([p["longitude"] for p in located], dtype=np.float64)
+        keys = self._cell_keys(lats, lons)
+        order = np.argsort(keys, kind="stable")
+
+        self.profiles = [located[i] for i in order]
+        self.positions = {str(p["id"]): i for i, p in enumerate(self.profiles)}
+        self.keys = keys[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.skill = np.array([
+            _SKILL_CODES.get(str(p.get("skill_level") or "").lower(), _UNKNOWN_SKILL) for p in self.profiles
+        ], dtype=np.uint8)
+        self.handicap = np.array([
+            p["handicap"] if p.get("handicap") is not None else np.nan for p in self.profiles
+        ], dtype=np.float32)
+
+        # Coordinates of each free-text location, so "San Diego, CA" can be searched by name
+        centroids: Dict[str, List[float]] = {}
+        for profile in self.profiles:
+            if profile.get("location"):
+                entry = centroids.setdefault(profile["location"].strip().lower(), [0.0, 0.0, 0])
+                entry[0] += profile["latitude"]
+                entry[1] += profile["longitude"]
+                entry[2] += 1
+        self.locations = {name: (lat / n, lon / n) for name, (lat, lon, n) in centroids.items()}
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def _cell_keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        rows = np.floor((np.clip(lats, -90, 89.999999) + 90) / self.grid_degrees).astype(np.int64)
+        cols = np.floor(((lons + 180) % 360) / self.grid_degrees).astype(np.int64)
+        return rows * self.lon_cells + cols
+
+    def locate(self, location: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a location name seen on indexed profiles"""
+        return self.locations.get(location.strip().lower())
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions of players in the grid cells covering the radius (a superset of the answer)"""
+        lat_span = radius_km / KM_PER_DEGREE
+        lat_lo, lat_hi = max(-90.0, lat - lat_span), min(90.0, lat + lat_span)
+        cos_lat = math.cos(math.radians(max(abs(lat_lo), abs(lat_hi))))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(180.0, lat_span / cos_lat)
+
+        row_lo = int((lat_lo + 90) // self.grid_degrees)
+        row_hi = int((min(lat_hi, 89.999999) + 90) // self.grid_degrees)
+        if lon_span >= 180.0:
+            col_ranges = [(0, self.lon_cells - 1)]
+        else:
+            col_lo = int(((lon - lon_span + 180) % 360) // self.grid_degrees)
+            col_hi = int(((lon + lon_span + 180) % 360) // self.grid_degrees)
+            # A box across the antimeridian becomes two column ranges
+            col_ranges = [(col_lo, col_hi)] if col_lo <= col_hi else [(col_lo, self.lon_cells - 1), (0, col_hi)]
+
+        slices = []
+        for row in range(row_lo, row_hi + 1):
+            for col_lo, col_hi in col_ranges:
+                start = np.searchsorted(self.keys, row * self.lon_cells + col_lo, side="left")
+                end = np.searchsorted(self.keys, row * self.lon_cells + col_hi, side="right")
+                if end > start:
+                    slices.append(np.arange(start, end))
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+    def _filter(self, positions: np.ndarray, skill_level: Optional[str],
+                min_handicap: Optional[float], max_handicap: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(positions), dtype=bool)
+        if skill_level:
+            code = _SKILL_CODES.get(skill_level.lower())
+            if code is None:
+                raise ValueError(f"Unknown skill level: {skill_level}")
+            mask &= self.skill[positions] == code
+        if min_handicap is not None:
+            mask &= self.handicap[positions] >= min_handicap
+        if max_handicap is not None:
+            mask &= self.handicap[positions] <= max_handicap
+        return positions[mask]
+
+    def search(self, lat: float, lon: float, radius_km: Optional[float] = None, k: Optional[int] = None,
+               skill_level: Optional[str] = None, min_handicap: Optional[float] = None,
+               max_handicap: Optional[float] = None, limit: int = 20,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Players nearest first, within radius_km (default 50 km) or the k nearest
+        (optionally capped at radius_km)
+
+        Returns one page of profiles (with distance_km) and the cursor for the
+        next page, or None on the last page.
+        """
+        if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+            raise ValueError("Coordinates out of range")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+
+        if k is None:
+            radius_km = DEFAULT_RADIUS_KM if radius_km is None else radius_km
+            positions, distances = self._within(lat, lon, radius_km, skill_level, min_handicap, max_handicap)
+        else:
+            positions, distances = self._nearest(lat, lon, k, radius_km, skill_level, min_handicap, max_handicap)
+
+        # Nearest first; position breaks ties so pages never overlap or skip
+        order = np.lexsort((positions, distances))
+        return self._page(positions[order], distances[order], limit, after)
+
+    def browse(self, skill_level: Optional[str] = None, min_handicap: Optional[float] = None,
+               max_handicap: Optional[float] = None, limit: int = 20,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Players in index order with no distance, for searches that cannot be
+        placed on the map; paged like search
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        positions = self._filter(np.arange(len(self.profiles)), skill_level, min_handicap, max_handicap)
+        page, next_cursor = self._page(positions, np.zeros(len(positions)), limit, after)
+        return [{**profile, "distance_km": None} for profile in page], next_cursor
+
+    def _page(self, positions: np.ndarray, distances: np.ndarray, limit: int,
+              after: Optional[Tuple[float, int]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """The page after the cursor position of results sorted by (distance, position)"""
+        if after is not None:
+            # Within a run of equal distances positions ascend, so both steps are binary searches
+            start = int(np.searchsorted(distances, after[0], side="left"))
+            end = int(np.searchsorted(distances, after[0], side="right"))
+            start += int(np.searchsorted(positions[start:end], after[1], side="right"))
+            positions, distances = positions[start:], distances[start:]
+
+        page = [
+            {**self.profiles[p], "distance_km": round(float(d), 3)}
+            for p, d in zip(positions[:limit], distances[:limit])
+        ]
+        next_cursor = None
+        if len(positions) > limit:
+            next_cursor = encode_cursor(float(distances[limit - 1]), int(positions[limit - 1]))
+        return page, next_cursor
+
+    def positions_within(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Index positions of every player within radius_km, unordered"""
+        return self._within(lat, lon, radius_km, None, None, None)[0]
+
+    def _within(self, lat, lon, radius_km, skill_level, min_handicap, max_handicap):
+        positions = self._filter(self._candidates(lat, lon, radius_km), skill_level, min_handicap, max_handicap)
+        distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+        keep = distances <= radius_km
+        # Round like the cursor does, so cursor comparisons are exact
+        return positions[keep], np.round(distances[keep], 6)
+
+    def _nearest(self, lat, lon, k, radius_km, skill_level, min_handicap, max_handicap):
+        # Grow the search circle until it holds k matches (or covers the cap / the globe)
+        limit_km = radius_km if radius_km is not None else math.pi * EARTH_RADIUS_KM
+        search_km = min(limit_km, self.grid_degrees * KM_PER_DEGREE)
+        while True:
+            positions, distances = self._within(lat, lon, search_km, skill_level, min_handicap, max_handicap)
+            if len(positions) >= k or search_km >= limit_km:
+                break
+            search_km = min(limit_km, search_km * 2)
+        if len(positions) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            positions, distances = positions[nearest], distances[nearest]
+        return positions, distances
+
+def load_player_profiles(path: str = DEFAULT_PLAYERS_PATH) -> List[Dict[str, Any]]:
+    """Profiles from a JSONL file (one PlayerProfile dict with latitude/longitude per line)"""
+    if not os.path.exists(path):
+        return list(DEMO_PLAYERS)
+    profiles = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    profiles.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping corrupt player profile line")
+    return profiles
+
+_player_index: Optional[PlayerIndex] = None
+_player_index_lock = threading.Lock()
+
+def get_player_index() -> PlayerIndex:
+    """Process-wide player discovery index"""
+    global _player_index
+    if _player_index is None:
+        with _player_index_lock:
+            if _player_index is None:
+                _player_index = PlayerIndex(load_player_profiles())
+                logger.info(f"Indexed {len(_player_index)} player profiles")
+    return _player_index
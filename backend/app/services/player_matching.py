@@ -0,0 +1,167 @@
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.app.services.player_index import SKILL_LEVELS, get_player_index
+
+# Fixed-width hashed bitsets: wide enough that collisions between the handful
+# of interests/courses one player lists are rare
+INTEREST_BITS = 128
+COURSE_BITS = 256
+
+WEIGHTS = {"handicap": 0.35, "skill": 0.25, "interests": 0.25, "courses": 0.15}
+# Handicap gap at which similarity has dropped to 1/e
+HANDICAP_SCALE = 8.0
+# Sharing this many favourite courses earns the full course score
+COURSES_FOR_FULL_SCORE = 2
+
+_SKILL_CODES = {level.lower(): code for code, level in enumerate(SKILL_LEVELS)}
+_M1, _M2, _M4 = np.uint64(0x5555555555555555), np.uint64(0x3333333333333333), np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits in each element of a uint64 array"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).astype(np.int32)
+    # SWAR popcount for numpy < 2.0
+    x = words - ((words >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.int32)
+
+def _bitset(values: Optional[Iterable[str]], bits: int) -> np.ndarray:
+    words = np.zeros(bits // 64, dtype=np.uint64)
+    for value in values or ():
+        bit = zlib.crc32(str(value).strip().lower().encode("utf-8")) % bits
+        words[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    return words
+
+class CompatibilityIndex:
+    """
+    Playing-partner compatibility over a fixed set of profiles
+
+    Each profile becomes one column of contiguous arrays: handicap, skill
+    code and hashed interest/course bitsets stored word by word (so a query
+    only ANDs and popcounts the few words its own bits fall in), with
+    interest popcounts precomputed. Scoring one player against every
+    candidate is a handful of vectorised operations, and the top k come
+    from a partial selection, not a sort.
+    """
+
+    def __init__(self, profiles: List[Dict[str, Any]]):
+        self.profiles = profiles
+        count = len(profiles)
+        self.handicap = np.array([
+            p["handicap"] if p.get("handicap") is not None else np.nan for p in profiles
+        ], dtype=np.float32)
+        self.skill = np.array([
+            _SKILL_CODES.get(str(p.get("skill_level") or "").lower(), -1) for p in profiles
+        ], dtype=np.int8)
+        # (words, profiles): each bitset word is one contiguous column
+        self.interests = np.zeros((INTEREST_BITS // 64, count), dtype=np.uint64)
+        self.courses = np.zeros((COURSE_BITS // 64, count), dtype=np.uint64)
+        for row, profile in enumerate(profiles):
+            if profile.get("interests"):
+                self.interests[:, row] = _bitset(profile["interests"], INTEREST_BITS)
+            if profile.get("favorite_courses"):
+                self.courses[:, row] = _bitset(profile["favorite_courses"], COURSE_BITS)
+        self.interest_counts = _popcount(self.interests).sum(axis=0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def score(self, player: Dict[str, Any], candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Compatibility (0-100) of a player with every candidate row (all rows by default)"""
+        rows = slice(None) if candidates is None else candidates
+        handicap = self.handicap[rows]
+        total = np.zeros(len(handicap), dtype=np.float32)
+
+        if player.get("handicap") is not None:
+            similarity = np.exp(-np.abs(handicap - np.float32(player["handicap"])) / HANDICAP_SCALE)
+            total += WEIGHTS["handicap"] * np.where(np.isnan(similarity), 0.5, similarity)
+        else:
+            total += WEIGHTS["handicap"] * 0.5
+
+        code = _SKILL_CODES.get(str(player.get("skill_level") or "").lower(), -1)
+        skill = self.skill[rows]
+        if code >= 0:
+            closeness = 1 - np.abs(skill.astype(np.float32) - code) / (len(SKILL_LEVELS) - 1)
+            total += WEIGHTS["skill"] * np.where(skill < 0, 0.5, closeness)
+        else:
+            total += WEIGHTS["skill"] * 0.5
+
+        interests = _bitset(player.get("interests"), INTEREST_BITS)
+        if interests.any():
+            shared = self._shared_bits(self.interests, interests, rows)
+            union = self.interest_counts[rows] + int(_popcount(interests).sum()) - shared
+            total += WEIGHTS["interests"] * (shared / np.maximum(union, 1).astype(np.float32))
+
+        courses = _bitset(player.get("favorite_courses"), COURSE_BITS)
+        if courses.any():
+            shared = self._shared_bits(self.courses, courses, rows)
+            total += WEIGHTS["courses"] / COURSES_FOR_FULL_SCORE * np.minimum(shared, COURSES_FOR_FULL_SCORE)
+
+        return total * 100
+
+    @staticmethod
+    def _shared_bits(bitsets: np.ndarray, query: np.ndarray, rows) -> np.ndarray:
+        """Bits each candidate shares with the query, visiting only the query's non-zero words"""
+        shared = None
+        for word in np.flatnonzero(query):
+            counts = _popcount(bitsets[word, rows] & query[word])
+            shared = counts if shared is None else shared + counts
+        return shared
+
+    def top_k(self, player: Dict[str, Any], k: int = 10, candidates: Optional[np.ndarray] = None,
+              exclude: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The k most compatible candidates, best first, with compatibility_score"""
+        if candidates is None:
+            # Score every row through slices (no gathered copies), then drop the player
+            positions = None
+            scores = self.score(player)
+            if exclude is not None:
+                scores[exclude] = -np.inf
+        else:
+            positions = np.asarray(candidates)
+            if exclude is not None:
+                positions = positions[positions != exclude]
+            scores = self.score(player, positions)
+        k = min(k, len(scores) - (1 if candidates is None and exclude is not None else 0))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        if positions is not None:
+            best_rows = positions[best]
+        else:
+            best_rows = best
+        return [
+            {**self.profiles[row], "compatibility_score": round(float(scores[i]), 1)}
+            for row, i in zip(best_rows, best)
+        ]
+
+_compatibility_index: Optional[CompatibilityIndex] = None
+_compatibility_index_lock = threading.Lock()
+
+def get_compatibility_index() -> CompatibilityIndex:
+    """Compatibility index over the player discovery index (rows share its positions)"""
+    global _compatibility_index
+    if _compatibility_index is None:
+        with _compatibility_index_lock:
+            if _compatibility_index is None:
+                _compatibility_index = CompatibilityIndex(get_player_index().profiles)
+    return _compatibility_index
+
+def match_players(player_id: str, k: int = 10, radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Best playing partners for an indexed player, optionally only among those within radius_km"""
+    players = get_player_index()
+    position = players.positions.get(str(player_id))
+    if position is None:
+        raise KeyError(player_id)
+    player = players.profiles[position]
+    candidates = None
+    if radius_km is not None:
+        candidates = players.positions_within(player["latitude"], player["longitude"], radius_km)
+    return get_compatibility_index().top_k(player, k, candidates=candidates, exclude=position)
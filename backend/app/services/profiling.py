@@ -0,0 +1,173 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(".data", "profiles"))
+# Fraction of requests profiled without being asked (0 = only on request)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Older profiles are deleted beyond this many
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# Unlocks the X-Profile header and the admin endpoints; both are off while it is empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+TOP_FUNCTIONS = 25
+
+_PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+class RequestProfile:
+    """
+    The profilers of one request: the event loop thread's, plus one per
+    threadpool thread a sync handler ran in
+    """
+
+    def __init__(self, method: str, path: str):
+        self.started_at = time.time()
+        # Millisecond timestamp first, so ids sort by age
+        self.id = f"{int(self.started_at * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.profilers = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def run_profiled(self, func: Callable, *args, **kwargs):
+        """Call func under a profiler of its own (for the thread it runs in)"""
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.profilers.append(profiler)
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats()
+        for profiler in self.profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                pass  # pstats refuses a profiler that recorded nothing
+        return stats
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def current_profile() -> Optional[RequestProfile]:
+    """The profile of the request being handled, if it is being profiled"""
+    return _current_profile.get()
+
+def set_current_profile(profile: Optional[RequestProfile]) -> Token:
+    return _current_profile.set(profile)
+
+def reset_current_profile(token: Token) -> None:
+    _current_profile.reset(token)
+
+def _top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+class ProfileStore:
+    """
+    Request profiles on local disk
+
+    Each profile is <id>.prof (pstats format: python -m pstats, snakeviz)
+    plus <id>.json with the route, status, timing and the slowest functions
+    by cumulative time, so the list answers most questions without the
+    profile itself. Only the newest `keep` profiles are retained.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not _PROFILE_ID.match(profile_id):
+            raise ValueError("Invalid profile id")
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def save(self, profile: RequestProfile, route: Optional[str], status: Optional[int],
+             duration: float) -> Dict[str, Any]:
+        stats = profile.stats()
+        prof_path = self._path(profile.id, ".prof")
+        stats.dump_stats(prof_path + ".tmp")
+        os.replace(prof_path + ".tmp", prof_path)
+
+        meta = {
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 1),
+            "started_at": profile.started_at,
+            "threads": len(profile.profilers),
+            "top_functions": _top_functions(stats)
+        }
+        meta_path = self._path(profile.id, ".json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._prune()
+        return meta
+
+    def _ids(self) -> List[str]:
+        return sorted((name[:-5] for name in os.listdir(self.directory)
+                       if name.endswith(".json") and _PROFILE_ID.match(name[:-5])), reverse=True)
+
+    def _prune(self) -> None:
+        for profile_id in self._ids()[self.keep:]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except OSError:
+                    pass
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest profiles first, without their function breakdown"""
+        profiles = []
+        for profile_id in self._ids()[:limit]:
+            meta = self.get(profile_id)
+            if meta is not None:
+                meta.pop("top_functions", None)
+                profiles.append(meta)
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(profile_id, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        try:
+            path = self._path(profile_id, ".prof")
+        except ValueError:
+            return None
+        return path if os.path.exists(path) else None
+
+_profile_store: Optional[ProfileStore] = None
+_profile_store_lock = threading.Lock()
+
+def get_profile_store() -> ProfileStore:
+    """Process-wide request profile store"""
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                _profile_store = ProfileStore()
+    return _profile_store
@@ -0,0 +1,86 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Optional, Tuple
+
+DEFAULT_BUCKET_FILE = os.getenv("ADMISSION_BUCKET_FILE", os.path.join(".data", "admission.buckets"))
+DEFAULT_BUCKET_SLOTS = int(os.getenv("ADMISSION_BUCKET_SLOTS", "65536"))
+
+# Slot layout: key tag, tokens, last refill (wall-clock epoch seconds). The file
+# outlives the process, so refill times must not be monotonic-clock readings,
+# which restart from a lower value after a reboot or on another host
+_SLOT = struct.Struct("<Qdd")
+# A slot left idle this long can be taken over by another key
+IDLE_SECONDS = 600.0
+PROBES = 4
+
+class SharedTokenBuckets:
+    """
+    Token buckets kept in a memory-mapped file shared by every worker process
+
+    Each key hashes (crc32, stable across processes) to a fixed slot, probing
+    a few neighbours on collision, so a check is one unpack and one pack on
+    the mapped page with no locks or syscalls. Updates from different
+    processes can race; the worst case is briefly admitting a request or two
+    over the limit, which is acceptable for admission control. A refill time
+    far in the future (a file written under a different clock) resets the
+    bucket instead of stalling it.
+    """
+
+    def __init__(self, path: str = DEFAULT_BUCKET_FILE, slots: int = DEFAULT_BUCKET_SLOTS):
+        self.slots = slots
+        size = slots * _SLOT.size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _slot(self, key: str, now: float) -> int:
+        tag = zlib.crc32(key.encode("utf-8")) + 1  # 0 marks an empty slot
+        base = tag % self.slots
+        for probe in range(PROBES):
+            offset = ((base + probe) % self.slots) * _SLOT.size
+            slot_tag, _, last = _SLOT.unpack_from(self._map, offset)
+            if slot_tag == tag:
+                return offset
+            if slot_tag == 0 or abs(now - last) > IDLE_SECONDS:
+                # Claim it as a full bucket (tokens < 0 is the "new" marker)
+                _SLOT.pack_into(self._map, offset, tag, -1.0, now)
+                return offset
+        # Table crowded around this key: share the home slot
+        return (base % self.slots) * _SLOT.size
+
+    def acquire(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.time() if now is None else now
+        offset = self._slot(key, now)
+        tag, tokens, last = _SLOT.unpack_from(self._map, offset)
+        if tokens < 0 or last - now > IDLE_SECONDS:
+            tokens = burst
+        elif now > last:
+            tokens = min(burst, tokens + (now - last) * rate)
+        if tokens >= 1.0:
+            _SLOT.pack_into(self._map, offset, tag, tokens - 1.0, now)
+            return True, 0.0
+        _SLOT.pack_into(self._map, offset, tag, tokens, now)
+        return False, (1.0 - tokens) / rate if rate > 0 else 60.0
+
+_buckets: Optional[SharedTokenBuckets] = None
+_buckets_lock = threading.Lock()
+
+def get_shared_buckets() -> SharedTokenBuckets:
+    """Process-wide handle on the shared bucket table"""
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = SharedTokenBuckets()
+    return _buckets
@@ -0,0 +1,167 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app.services.job_queue import get_job_queue, register_job_handler
+from backend.app.services.player_index import load_player_profiles
+from backend.app.services.sponsor_match import (
+    MAX_OFFERS, CampaignIndex, _key, _region_keys, get_campaign_registry, matching_profile, profile_fingerprint
+)
+from backend.app.services.sponsor_offers import get_offer_store
+
+logger = logging.getLogger(__name__)
+
+SPONSOR_MATCH_JOB = "sponsor_rematch"
+MATCH_WORKERS = int(os.getenv("SPONSOR_MATCH_WORKERS", str(os.cpu_count() or 2)))
+# Eligibility cells (players x campaigns) per chunk, which bounds each worker's memory
+CHUNK_CELLS = 8_000_000
+MIN_CHUNK_PLAYERS = 256
+
+def encode_campaigns(index: CampaignIndex, today: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Campaign criteria as dense matrices, columns in priority order
+
+    Each list criterion gets a vocabulary of the values campaigns use and a
+    (values + 1, campaigns) 0/1 matrix; the extra last row stands for values
+    no campaign names. Open criteria are separate boolean columns.
+    """
+    campaigns = index.campaigns
+    active = {id(c) for c in index.active(campaigns, today)}
+    encoded: Dict[str, Any] = {
+        "ids": [str(c.get("id")) for c in campaigns],
+        "active": np.array([id(c) in active for c in campaigns], dtype=bool)
+    }
+    for name in CampaignIndex.LIST_CRITERIA:
+        vocabulary: Dict[str, int] = {}
+        for campaign in campaigns:
+            for value in (campaign.get("criteria") or {}).get(name) or ():
+                vocabulary.setdefault(_key(value), len(vocabulary))
+        matrix = np.zeros((len(vocabulary) + 1, len(campaigns)), dtype=np.float32)
+        is_open = np.zeros(len(campaigns), dtype=bool)
+        for column, campaign in enumerate(campaigns):
+            values = (campaign.get("criteria") or {}).get(name)
+            if not values:
+                is_open[column] = True
+            for value in values or ():
+                matrix[vocabulary[_key(value)], column] = 1
+        encoded[name] = (vocabulary, matrix, is_open)
+    criteria = [c.get("criteria") or {} for c in campaigns]
+    encoded["min_handicap"] = np.array([
+        -np.inf if c.get("min_handicap") is None else c["min_handicap"] for c in criteria], dtype=np.float32)
+    encoded["max_handicap"] = np.array([
+        np.inf if c.get("max_handicap") is None else c["max_handicap"] for c in criteria], dtype=np.float32)
+    encoded["handicap_open"] = np.array([
+        c.get("min_handicap") is None and c.get("max_handicap") is None for c in criteria], dtype=bool)
+    return encoded
+
+def _player_values(player: Dict[str, Any], name: str) -> List[str]:
+    if name == "skill_levels":
+        return [player["skill_level"]] if player.get("skill_level") else []
+    if name == "interests":
+        return player.get("interests") or []
+    return _region_keys(player.get("location"))
+
+def match_chunk(encoded: Dict[str, Any], players: List[Dict[str, Any]],
+                limit: int = MAX_OFFERS) -> List[Tuple[str, int, str]]:
+    """
+    Eligibility of a chunk of players for every campaign, as matrix operations
+
+    Per criterion, the players' 0/1 value matrix times the campaign matrix
+    counts matching values per (player, campaign); OR-ed with the open
+    columns and AND-ed across criteria, then with the handicap ranges. The
+    first `limit` eligible columns of each row are its best offers.
+    """
+    count = len(players)
+    fields = [matching_profile(player) for player in players]
+    eligible = np.broadcast_to(encoded["active"], (count, len(encoded["ids"]))).copy()
+    for name in CampaignIndex.LIST_CRITERIA:
+        vocabulary, matrix, is_open = encoded[name]
+        values = np.zeros((count, matrix.shape[0]), dtype=np.float32)
+        for row, player in enumerate(fields):
+            for value in _player_values(player, name):
+                values[row, vocabulary.get(_key(value), len(vocabulary))] = 1
+        eligible &= (values @ matrix > 0) | is_open
+
+    handicap = np.array([
+        np.nan if p["handicap"] is None else p["handicap"] for p in fields], dtype=np.float32)[:, None]
+    with np.errstate(invalid="ignore"):
+        in_range = (handicap >= encoded["min_handicap"]) & (handicap <= encoded["max_handicap"])
+    eligible &= in_range | encoded["handicap_open"]
+
+    # Columns are in priority order, so a row's first `limit` eligible columns are its best offers
+    eligible &= np.cumsum(eligible, axis=1, dtype=np.int32) <= limit
+    rows, columns = np.nonzero(eligible)
+    bounds = np.searchsorted(rows, np.arange(count + 1))
+    ids = encoded["ids"]
+    return [
+        (str(player["id"]), profile_fingerprint(player),
+         "\n".join(ids[c] for c in columns[bounds[row]:bounds[row + 1]]))
+        for row, player in enumerate(players)
+    ]
+
+_worker_campaigns: Optional[Dict[str, Any]] = None
+
+def _init_match_worker(encoded: Dict[str, Any]) -> None:
+    global _worker_campaigns
+    _worker_campaigns = encoded
+
+def _match_worker_chunk(players: List[Dict[str, Any]]) -> List[Tuple[str, int, str]]:
+    return match_chunk(_worker_campaigns, players)
+
+def run_sponsor_matching(profiles: Optional[List[Dict[str, Any]]] = None,
+                         workers: int = MATCH_WORKERS) -> Dict[str, Any]:
+    """
+    Re-match every player against the current campaigns into the offers table
+
+    Players are split into chunks sized to the campaign count and scored
+    across a process pool (inline for a single chunk); chunk results are
+    written as they finish and published in one swap at the end.
+    """
+    started = time.time()
+    index = get_campaign_registry().index()
+    profiles = load_player_profiles() if profiles is None else profiles
+    profiles = [p for p in profiles if p.get("id") is not None]
+    encoded = encode_campaigns(index)
+    chunk_size = max(MIN_CHUNK_PLAYERS, CHUNK_CELLS // max(1, len(index)))
+    chunks = [profiles[i:i + chunk_size] for i in range(0, len(profiles), chunk_size)]
+    store = get_offer_store()
+
+    if workers <= 1 or len(chunks) <= 1:
+        players = store.build((match_chunk(encoded, chunk) for chunk in chunks), index.version)
+    else:
+        # spawn, not fork: the API process runs threads (job workers, threadpool)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_match_worker, initargs=(encoded,)) as pool:
+            players = store.build(pool.map(_match_worker_chunk, chunks), index.version)
+
+    result = {
+        "players": players,
+        "campaigns": len(index),
+        "campaigns_version": index.version,
+        "chunks": len(chunks),
+        "seconds": round(time.time() - started, 1)
+    }
+    logger.info(f"Sponsor matching: {result}")
+    return result
+
+def run_sponsor_matching_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: bulk re-match of the whole player base"""
+    return run_sponsor_matching(workers=payload.get("workers") or MATCH_WORKERS)
+
+register_job_handler(SPONSOR_MATCH_JOB, run_sponsor_matching_job)
+
+def submit_sponsor_matching() -> str:
+    """Queue a bulk re-match and return its job id"""
+    return get_job_queue().submit(SPONSOR_MATCH_JOB, {})
+
+if __name__ == "__main__":
+    # Nightly: python -m backend.app.services.sponsor_batch [workers]
+    logging.basicConfig(level=logging.INFO)
+    print(run_sponsor_matching(workers=int(sys.argv[1]) if len(sys.argv) > 1 else MATCH_WORKERS))
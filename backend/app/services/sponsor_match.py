@@ -1,18 +1,305 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
 
-def match_sponsors(player_profile):
-    # Real version would query brands/algorithms
-    offers = []
-    if "Pro" in (player_profile.skill_level or ""):
-        offers.append({
-            "sponsor_name": "Nike Golf",
-            "offer_text": "Exclusive gear deal for rising pros!",
-            "url": "https://nike.com/golf",
-            "amount": "$500 gift card"
-        })
-    if "Charity Events" in (player_profile.interests or []):
-        offers.append({
-            "sponsor_name": "Golf4Good",
-            "offer_text": "Become an ambassador for our next charity scramble.",
-            "url": "https://golf4good.org"
-        })
-    return offers
+from backend.app.models import PlayerProfile
+from backend.app.services.sponsor_offers import get_offer_store
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGNS_PATH = os.getenv("SPONSOR_CAMPAIGNS_PATH", os.path.join(".data", "sponsor_campaigns.json"))
+# How often the campaign file's mtime is checked for edits
+RELOAD_CHECK_SECONDS = float(os.getenv("SPONSOR_CAMPAIGNS_RELOAD_SECONDS", "2"))
+MAX_OFFERS = int(os.getenv("SPONSOR_MAX_OFFERS", "20"))
+OFFER_FIELDS = ("sponsor_name", "offer_text", "url", "amount", "offer_type", "expiry_date", "terms")
+# What a profile without a skill level is matched as, as on the API model
+_DEFAULT_SKILL_LEVEL = PlayerProfile.model_fields["skill_level"].default
+
+# Used when no campaign file exists yet
+DEFAULT_CAMPAIGNS = [
+    {
+        "id": "nike-rising-pros",
+        "sponsor_name": "Nike Golf",
+        "offer_text": "Exclusive gear deal for rising pros!",
+        "url": "https://nike.com/golf",
+        "amount": "$500 gift card",
+        "priority": 10,
+        "criteria": {"skill_levels": ["Pro"]}
+    },
+    {
+        "id": "golf4good-ambassadors",
+        "sponsor_name": "Golf4Good",
+        "offer_text": "Become an ambassador for our next charity scramble.",
+        "url": "https://golf4good.org",
+        "priority": 5,
+        "criteria": {"interests": ["Charity Events"]}
+    },
+]
+
+def _key(value: Any) -> str:
+    return str(value).strip().lower()
+
+def _region_keys(location: Optional[str]) -> List[str]:
+    """Region keys of a location: "San Diego, CA" gives "san diego, ca", "san diego" and "ca" """
+    if not location:
+        return []
+    parts = [_key(part) for part in location.split(",") if part.strip()]
+    return [_key(location)] + parts
+
+def _handicap_value(value: Any) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+def matching_profile(player: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The fields campaigns match on, as a PlayerProfile would hold them
+
+    Raw JSONL records and API models then match (and fingerprint) alike:
+    a missing skill level takes the model default and a handicap of 2 is 2.0.
+    """
+    return {
+        "skill_level": player.get("skill_level", _DEFAULT_SKILL_LEVEL),
+        "interests": player.get("interests") or [],
+        "location": player.get("location"),
+        "handicap": _handicap_value(player.get("handicap"))
+    }
+
+def profile_fingerprint(player: Dict[str, Any]) -> int:
+    """Hash of the profile fields campaigns match on; a stored match is valid while it is unchanged"""
+    player = matching_profile(player)
+    fields = [
+        _key(player["skill_level"] or ""),
+        sorted(_key(value) for value in player["interests"]),
+        _key(player["location"] or ""),
+        player["handicap"]
+    ]
+    return zlib.crc32(json.dumps(fields).encode("utf-8"))
+
+def _bits(bitset: int) -> Iterable[int]:
+    """Set bit positions, lowest first (scanning the binary string beats peeling bits off a big int)"""
+    digits = bin(bitset)[:1:-1]
+    position = digits.find("1")
+    while position >= 0:
+        yield position
+        position = digits.find("1", position + 1)
+
+class CampaignIndex:
+    """
+    Sponsor campaigns compiled into bitset posting lists
+
+    Campaigns are numbered in priority order and each becomes one bit. For
+    every criterion (skill level, interests, region) there is a posting
+    bitset per value plus a bitset of the campaigns that leave it open;
+    handicap ranges become prefix/suffix unions over the sorted range ends.
+    Matching a player ORs the few postings its own values select and ANDs
+    the criteria together, so the cost follows the player's values, not the
+    number of campaigns, and set bits come out already ranked.
+
+    Campaign criteria (all optional; omitted means "anyone"):
+    skill_levels, interests (any of), regions (location or part of it,
+    e.g. "CA"), min_handicap, max_handicap.
+    """
+
+    LIST_CRITERIA = ("skill_levels", "interests", "regions")
+
+    def __init__(self, campaigns: List[Dict[str, Any]]):
+        if not isinstance(campaigns, list):
+            raise ValueError("Campaigns must be a list")
+        for position, campaign in enumerate(campaigns):
+            self._validate(campaign, position)
+        order = sorted(range(len(campaigns)), key=lambda i: -campaigns[i].get("priority", 0))
+        self.campaigns = [campaigns[i] for i in order]
+        self.by_id = {campaign.get("id"): campaign for campaign in self.campaigns}
+        self.version = hashlib.sha1(json.dumps(self.campaigns, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.all = (1 << len(self.campaigns)) - 1
+        self.postings: Dict[str, Dict[str, int]] = {name: {} for name in self.LIST_CRITERIA}
+        self.open: Dict[str, int] = {name: 0 for name in self.LIST_CRITERIA + ("handicap",)}
+
+        mins, maxes = [], []
+        for bit, campaign in enumerate(self.campaigns):
+            if not campaign.get("sponsor_name") or not campaign.get("offer_text"):
+                raise ValueError(f"Campaign {campaign.get('id', bit)} needs sponsor_name and offer_text")
+            criteria = campaign.get("criteria") or {}
+            for name in self.LIST_CRITERIA:
+                values = criteria.get(name)
+                if not values:
+                    self.open[name] |= 1 << bit
+                    continue
+                for value in values:
+                    postings = self.postings[name]
+                    postings[_key(value)] = postings.get(_key(value), 0) | 1 << bit
+            low, high = criteria.get("min_handicap"), criteria.get("max_handicap")
+            if low is None and high is None:
+                self.open["handicap"] |= 1 << bit
+                continue
+            mins.append((float("-inf") if low is None else float(low), bit))
+            maxes.append((float("inf") if high is None else float(high), bit))
+
+        # min_prefix[i]: campaigns holding one of the i smallest minimums;
+        # max_suffix[i]: campaigns whose maximum sorts at position i or later
+        mins.sort()
+        maxes.sort()
+        self.min_values = [value for value, _ in mins]
+        self.max_values = [value for value, _ in maxes]
+        self.min_prefix = [0]
+        for _, bit in mins:
+            self.min_prefix.append(self.min_prefix[-1] | 1 << bit)
+        self.max_suffix = [0]
+        for _, bit in reversed(maxes):
+            self.max_suffix.append(self.max_suffix[-1] | 1 << bit)
+        self.max_suffix.reverse()
+
+    @classmethod
+    def _validate(cls, campaign: Any, position: int) -> None:
+        if not isinstance(campaign, dict):
+            raise ValueError(f"Campaign {position} is not an object")
+        name = campaign.get("id", position)
+        if not isinstance(campaign.get("priority", 0), (int, float)):
+            raise ValueError(f"Campaign {name} priority must be a number")
+        criteria = campaign.get("criteria") or {}
+        if not isinstance(criteria, dict):
+            raise ValueError(f"Campaign {name} criteria must be an object")
+        for criterion in cls.LIST_CRITERIA:
+            # A bare string would be matched letter by letter
+            if not isinstance(criteria.get(criterion) or [], list):
+                raise ValueError(f"Campaign {name} {criterion} must be a list")
+        for criterion in ("min_handicap", "max_handicap"):
+            value = criteria.get(criterion)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"Campaign {name} {criterion} must be a number")
+
+    def __len__(self) -> int:
+        return len(self.campaigns)
+
+    def _any_of(self, name: str, values: Iterable[str]) -> int:
+        postings = self.postings[name]
+        matched = self.open[name]
+        for value in values:
+            matched |= postings.get(_key(value), 0)
+        return matched
+
+    def _handicap(self, handicap: Optional[float]) -> int:
+        if handicap is None:
+            return self.open["handicap"]
+        low_ok = self.min_prefix[bisect_right(self.min_values, handicap)]
+        high_ok = self.max_suffix[bisect_left(self.max_values, handicap)]
+        return self.open["handicap"] | (low_ok & high_ok)
+
+    def match(self, player: Dict[str, Any], today: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Campaigns a player qualifies for, highest priority first (the top `limit` when given)"""
+        player = matching_profile(player)
+        matched = self.all
+        matched &= self._any_of("skill_levels", [player["skill_level"]] if player.get("skill_level") else [])
+        if matched:
+            matched &= self._any_of("interests", player.get("interests") or [])
+        if matched:
+            matched &= self._any_of("regions", _region_keys(player.get("location")))
+        if matched:
+            matched &= self._handicap(player.get("handicap"))
+        return self.active((self.campaigns[bit] for bit in _bits(matched)), today, limit)
+
+    @staticmethod
+    def active(campaigns: Iterable[Dict[str, Any]], today: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The unexpired campaigns, in order, up to limit"""
+        today = today or date.today().isoformat()
+        kept = []
+        for campaign in campaigns:
+            if campaign.get("expiry_date") and campaign["expiry_date"] < today:
+                continue
+            kept.append(campaign)
+            if len(kept) == limit:
+                break
+        return kept
+
+def load_campaigns(path: str = CAMPAIGNS_PATH) -> List[Dict[str, Any]]:
+    """Campaign definitions from a JSON file (a list, or {"campaigns": [...]})"""
+    if not os.path.exists(path):
+        return list(DEFAULT_CAMPAIGNS)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["campaigns"] if isinstance(data, dict) else data
+
+class CampaignRegistry:
+    """The compiled campaign index, recompiled when the campaign file changes"""
+
+    def __init__(self, path: str = CAMPAIGNS_PATH, check_interval: float = RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._index: Optional[CampaignIndex] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"reloads": 0, "reload_errors": 0}
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def index(self) -> CampaignIndex:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is not None and now - self._checked_at < self.check_interval:
+                return self._index
+            self._checked_at = now
+            mtime = self._file_mtime()
+            if self._index is None or mtime != self._mtime:
+                try:
+                    self._index = CampaignIndex(load_campaigns(self.path))
+                    self.stats["reloads"] += 1
+                    logger.info(f"Compiled {len(self._index)} sponsor campaigns")
+                except Exception as e:
+                    # Keep serving the last good campaigns until the file is fixed (or readable again)
+                    self.stats["reload_errors"] += 1
+                    logger.error(f"Invalid sponsor campaign file {self.path}: {e}")
+                    if self._index is None:
+                        self._index = CampaignIndex(list(DEFAULT_CAMPAIGNS))
+                self._mtime = mtime
+            return self._index
+
+_campaign_registry: Optional[CampaignRegistry] = None
+_campaign_registry_lock = threading.Lock()
+
+def get_campaign_registry() -> CampaignRegistry:
+    """Process-wide sponsor campaign registry"""
+    global _campaign_registry
+    if _campaign_registry is None:
+        with _campaign_registry_lock:
+            if _campaign_registry is None:
+                _campaign_registry = CampaignRegistry()
+    return _campaign_registry
+
+def match_sponsors(player_profile, limit: int = MAX_OFFERS):
+    """
+    Sponsor offers a player qualifies for, highest campaign priority first
+
+    Served from the materialized offers table when the last bulk run saw
+    this profile and these campaigns; otherwise matched live.
+    """
+    player = player_profile.model_dump() if hasattr(player_profile, "model_dump") else player_profile
+    index = get_campaign_registry().index()
+    stored = None
+    if player.get("id") is not None:
+        stored = get_offer_store().lookup(player["id"], profile_fingerprint(player), index.version)
+    if stored is not None:
+        campaigns = index.active((index.by_id[c] for c in stored if c in index.by_id), limit=limit)
+    else:
+        campaigns = index.match(player, limit=limit)
+    return [
+        {"campaign_id": campaign.get("id"), **{field: campaign.get(field) for field in OFFER_FIELDS}}
+        for campaign in campaigns
+    ]
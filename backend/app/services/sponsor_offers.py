@@ -0,0 +1,119 @@
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_OFFERS_DB = os.getenv("SPONSOR_OFFERS_DB", os.path.join(".data", "sponsor_offers.db"))
+
+class OfferStore:
+    """
+    Materialized sponsor matches: each player's ranked campaign ids
+
+    A bulk run writes into a build table and swaps it in with one rename,
+    so readers see either the previous run or the new one, never a mix.
+    Runs hold a file lock for the whole build, so a second one (another
+    job worker or process) waits rather than dropping the first's table.
+    Rows carry the profile fingerprint and the run records the campaign
+    version they were computed against; a lookup only answers while both
+    still hold.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_OFFERS_DB):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS offers_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS player_offers (
+                    player_id TEXT PRIMARY KEY,
+                    fingerprint INTEGER NOT NULL,
+                    campaign_ids TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, player_id: str, fingerprint: int, version: str) -> Optional[List[str]]:
+        """Stored campaign ids, best first, or None when missing or stale"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT o.fingerprint, o.campaign_ids, m.value FROM player_offers o "
+                "LEFT JOIN offers_meta m ON m.key = 'campaigns_version' WHERE o.player_id = ?",
+                (str(player_id),)
+            ).fetchone()
+        if row is None or row[0] != fingerprint or row[2] != version:
+            return None
+        return row[1].split("\n") if row[1] else []
+
+    def build(self, chunks: Iterable[List[Tuple[str, int, str]]], version: str) -> int:
+        """Write (player_id, fingerprint, newline-joined campaign ids) rows, then publish them"""
+        with self._build_lock():
+            return self._build(chunks, version)
+
+    @contextmanager
+    def _build_lock(self):
+        fd = os.open(self.db_path + ".build.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _build(self, chunks: Iterable[List[Tuple[str, int, str]]], version: str) -> int:
+        started = time.time()
+        players = 0
+        with self._connect() as conn:
+            conn.execute("DROP TABLE IF EXISTS player_offers_build")
+            conn.execute("""
+                CREATE TABLE player_offers_build (
+                    player_id TEXT PRIMARY KEY,
+                    fingerprint INTEGER NOT NULL,
+                    campaign_ids TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            for rows in chunks:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO player_offers_build VALUES (?, ?, ?)", rows)
+                conn.execute("COMMIT")
+                players += len(rows)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DROP TABLE player_offers")
+                conn.execute("ALTER TABLE player_offers_build RENAME TO player_offers")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO offers_meta (key, value) VALUES (?, ?)",
+                    [("campaigns_version", version), ("players", str(players)),
+                     ("matched_at", str(started)), ("seconds", str(round(time.time() - started, 1)))]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return players
+
+    def status(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT key, value FROM offers_meta").fetchall())
+
+_offer_store: Optional[OfferStore] = None
+_offer_store_lock = threading.Lock()
+
+def get_offer_store() -> OfferStore:
+    """Process-wide materialized sponsor offers"""
+    global _offer_store
+    if _offer_store is None:
+        with _offer_store_lock:
+            if _offer_store is None:
+                _offer_store = OfferStore()
+    return _offer_store
@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from backend.app.services.swing_frames import attach_shared_frames
+from backend.app.services.swing_workers import clip_result, get_swing_pool, prepare_clip
+
+MAX_COMPARE_CLIPS = 50
+# Same threshold the two-way compare-swings endpoint uses
+MECHANICS_CHANGE_THRESHOLD = 5
+
+def _mechanics_changes(base: Dict[str, int], other: Dict[str, int]) -> Dict[str, List[str]]:
+    improved, declined = [], []
+    for category, score in base.items():
+        if category in other:
+            diff = other[category] - score
+            if diff > MECHANICS_CHANGE_THRESHOLD:
+                improved.append(category)
+            elif diff < -MECHANICS_CHANGE_THRESHOLD:
+                declined.append(category)
+    return {"improved_areas": improved, "declined_areas": declined}
+
+def _profile_similarity(a: List[float], b: List[float]) -> Optional[float]:
+    if not a or not b or len(a) != len(b):
+        return None
+    corr = np.corrcoef(a, b)[0, 1]
+    return None if np.isnan(corr) else round(float(corr), 3)
+
+def _impact_frame_similarity(frames_a: np.ndarray, impact_a: int,
+                             frames_b: np.ndarray, impact_b: int) -> float:
+    """Similarity of the two impact frames, read straight from the shared buffers"""
+    frame_a = frames_a[min(impact_a, len(frames_a) - 1)]
+    frame_b = frames_b[min(impact_b, len(frames_b) - 1)]
+    if frame_a.shape != frame_b.shape:
+        frame_b = cv2.resize(frame_b, (frame_a.shape[1], frame_a.shape[0]), interpolation=cv2.INTER_AREA)
+    diff = np.abs(frame_a.astype(np.int16) - frame_b.astype(np.int16)).mean()
+    return round(1.0 - float(diff) / 255.0, 3)
+
+def _release_frames(clips: List[Dict[str, Any]]) -> None:
+    for clip in clips:
+        if clip["frames"]:
+            shm, _ = attach_shared_frames(clip["frames"])
+            shm.close()
+            shm.unlink()
+
+def compare_swings_parallel(video_urls: List[str], baseline_index: int = 0,
+                            metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compare N swing clips pairwise and against a baseline clip
+
+    Clips are decoded and analysed in parallel on the process pool; clips that
+    are not available locally are compared on their analysis alone.
+    """
+    if len(video_urls) < 2:
+        raise ValueError("At least two clips are required for a comparison")
+    if len(video_urls) > MAX_COMPARE_CLIPS:
+        raise ValueError(f"At most {MAX_COMPARE_CLIPS} clips can be compared at once")
+    if not 0 <= baseline_index < len(video_urls):
+        raise ValueError("baseline_index is out of range")
+
+    pool = get_swing_pool()
+    futures = [pool.submit(prepare_clip, url, metadata) for url in video_urls]
+    clips, error = [], None
+    for future in futures:
+        try:
+            clips.append(clip_result(future))
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        _release_frames(clips)
+        raise error
+
+    attached = []
+    frames: List[Optional[np.ndarray]] = []
+    try:
+        for clip in clips:
+            if clip["frames"]:
+                shm, view = attach_shared_frames(clip["frames"])
+                attached.append(shm)
+                frames.append(view)
+            else:
+                frames.append(None)
+
+        n = len(clips)
+        ratings = [c["analysis"].get("overall_rating", 75) for c in clips]
+        mechanics = [c["analysis"].get("mechanics_breakdown") or {} for c in clips]
+        categories = sorted(mechanics[0].keys())
+        mech_matrix = np.array([[m.get(cat, 0) for cat in categories] for m in mechanics], dtype=np.float32)
+
+        rating_diff = [[round(ratings[j] - ratings[i], 1) for j in range(n)] for i in range(n)]
+        mech_dist = np.sqrt(((mech_matrix[:, None, :] - mech_matrix[None, :, :]) ** 2).sum(axis=2))
+
+        pairwise = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                pair = {
+                    "clips": [i, j],
+                    "rating_difference": rating_diff[i][j],
+                    "mechanics_distance": round(float(mech_dist[i, j]), 2),
+                    "motion_similarity": None,
+                    "impact_frame_similarity": None
+                }
+                if frames[i] is not None and frames[j] is not None:
+                    fa, fb = clips[i]["features"], clips[j]["features"]
+                    pair["motion_similarity"] = _profile_similarity(fa["motion_profile"], fb["motion_profile"])
+                    pair["impact_frame_similarity"] = _impact_frame_similarity(
+                        frames[i], fa["impact_frame"], frames[j], fb["impact_frame"]
+                    )
+                pairwise.append(pair)
+
+        against_baseline = []
+        for i in range(n):
+            if i == baseline_index:
+                continue
+            entry = {
+                "clip": i,
+                "rating_difference": rating_diff[baseline_index][i],
+                "mechanics_distance": round(float(mech_dist[baseline_index, i]), 2),
+                **_mechanics_changes(mechanics[baseline_index], mechanics[i])
+            }
+            against_baseline.append(entry)
+
+        swings = []
+        for i, clip in enumerate(clips):
+            analysis = clip["analysis"]
+            swings.append({
+                "index": i,
+                "video_url": clip["video_url"],
+                "content_hash": analysis.get("content_hash"),
+                "overall_rating": analysis.get("overall_rating"),
+                "mechanics_breakdown": analysis.get("mechanics_breakdown"),
+                "match_golfer": analysis.get("match_golfer"),
+                "features": clip["features"]
+            })
+
+        closest = min(pairwise, key=lambda p: p["mechanics_distance"])
+        return {
+            "clip_count": n,
+            "baseline_index": baseline_index,
+            "swings": swings,
+            "against_baseline": against_baseline,
+            "pairwise": pairwise,
+            "most_similar_pair": closest["clips"],
+            "best_clip": int(np.argmax(ratings))
+        }
+    finally:
+        for shm in attached:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,251 @@
+import cv2
+import numpy as np
+import os
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from backend.app.services.downloader import DOWNLOAD_DIR
+from backend.app.services.metrics import timed
+
+# Frames are analysed as downscaled grayscale; swing motion doesn't need full resolution
+ANALYSIS_WIDTH = int(os.getenv("SWING_ANALYSIS_WIDTH", "320"))
+MAX_DECODED_FRAMES = int(os.getenv("SWING_MAX_DECODED_FRAMES", "900"))
+MOTION_PROFILE_BINS = 32
+
+# Motion prefilter: a tiny grayscale pass that locates the swing inside long clips
+PREFILTER_WIDTH = 64
+PREFILTER_SAMPLES_PER_SECOND = 10
+SWING_WINDOW_SECONDS = float(os.getenv("SWING_WINDOW_SECONDS", "3.0"))
+WINDOW_PADDING_SECONDS = 0.5
+
+# Clip references may name local files only inside these directories (uploaded media and the download cache)
+LOCAL_MEDIA_DIRS = [d for d in os.getenv(
+    "MEDIA_LOCAL_DIRS", os.pathsep.join([os.path.join(".data", "media"), DOWNLOAD_DIR])
+).split(os.pathsep) if d]
+
+def _inside_media_dirs(path: str) -> bool:
+    real = os.path.realpath(path)
+    for directory in LOCAL_MEDIA_DIRS:
+        root = os.path.realpath(directory)
+        if os.path.commonpath([real, root]) == root:
+            return True
+    return False
+
+def resolve_local_video(video_url: str) -> Optional[str]:
+    """
+    Local file path for a video reference, or None if it must be fetched first
+
+    Clip URLs come from API clients, so a local path (or file:// URL) is only
+    honoured when it resolves, symlinks and all, inside LOCAL_MEDIA_DIRS;
+    anything else is treated as not local and never opened.
+    """
+    parsed = urlparse(video_url)
+    if parsed.scheme == "file":
+        path = parsed.path
+    elif parsed.scheme in ("http", "https"):
+        return None
+    else:
+        path = video_url
+    if not path or not _inside_media_dirs(path):
+        return None
+    return os.path.realpath(path) if os.path.isfile(path) else None
+
+def _open_video(path: str) -> cv2.VideoCapture:
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    return capture
+
+def _to_gray(frame: np.ndarray, width: int) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height = max(1, int(gray.shape[0] * width / gray.shape[1]))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+def decode_frames(path: str, width: int = ANALYSIS_WIDTH, max_frames: int = MAX_DECODED_FRAMES,
+                  start_frame: int = 0, end_frame: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    """Decode a video (or the [start_frame, end_frame) range of it) into a (frames, height, width) uint8 grayscale array plus its fps"""
+    capture = _open_video(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        if start_frame:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if end_frame is not None:
+            max_frames = min(max_frames, end_frame - start_frame)
+        frames = []
+        while len(frames) < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(_to_gray(frame, width))
+    finally:
+        capture.release()
+
+    if not frames:
+        raise ValueError(f"No frames decoded from video: {path}")
+    return np.stack(frames), fps
+
+def sample_keyframes(path: str, count: int = 8, width: int = PREFILTER_WIDTH) -> np.ndarray:
+    """Evenly spaced small grayscale frames across the whole clip (only those frames are converted)"""
+    capture = _open_video(path)
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if frame_count > 0:
+            targets = set(np.linspace(0, frame_count - 1, count).round().astype(int).tolist())
+        else:
+            targets = None
+        frames = []
+        index = 0
+        while capture.grab():
+            if targets is None or index in targets:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                frames.append(_to_gray(frame, width))
+            index += 1
+    finally:
+        capture.release()
+
+    if not frames:
+        raise ValueError(f"No frames decoded from video: {path}")
+    if targets is None:
+        # Unknown length: everything was kept, pick the evenly spaced ones now
+        frames = [frames[i] for i in np.linspace(0, len(frames) - 1, count).round().astype(int)]
+    return np.stack(frames)
+
+@timed("swing_segmentation")
+def find_active_window(path: str) -> Dict:
+    """
+    Locate the swing in a clip from cheap motion estimates
+
+    Samples ~10 frames a second at 64px wide, scores each sample by its mean
+    absolute difference to the previous one and grows a window around the
+    motion peak. Skipped frames are only grabbed, never converted or resized.
+    """
+    capture = _open_video(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        stride = max(1, int(round(fps / PREFILTER_SAMPLES_PER_SECOND)))
+        positions, energies = [], []
+        previous = None
+        index = 0
+        while capture.grab():
+            if index % stride == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                small = _to_gray(frame, PREFILTER_WIDTH).astype(np.int16)
+                if previous is not None:
+                    positions.append(index)
+                    energies.append(float(np.abs(small - previous).mean()))
+                previous = small
+            index += 1
+    finally:
+        capture.release()
+
+    total_frames = index
+    window_frames = int(SWING_WINDOW_SECONDS * fps)
+    if not energies or max(energies) <= 0:
+        return {"start_frame": 0, "end_frame": min(total_frames, window_frames),
+                "total_frames": total_frames, "fps": fps, "motion_detected": False}
+
+    energy = np.array(energies)
+    peak = int(np.argmax(energy))
+    threshold = max(float(np.median(energy)) * 3, float(energy[peak]) * 0.2)
+    left, right = peak, peak
+    while left > 0 and energy[left - 1] > threshold:
+        left -= 1
+    while right < len(energy) - 1 and energy[right + 1] > threshold:
+        right += 1
+
+    padding = int(WINDOW_PADDING_SECONDS * fps)
+    start = max(0, positions[left] - stride - padding)
+    end = min(total_frames, positions[right] + padding + 1)
+    if end - start > window_frames:
+        # Keep more of the (slow) backswing before impact than of the follow-through
+        impact = positions[peak]
+        start = max(start, impact - int(window_frames * 0.65))
+        end = min(end, start + window_frames)
+
+    return {"start_frame": start, "end_frame": end, "total_frames": total_frames,
+            "fps": fps, "motion_detected": True}
+
+@timed("image_decode")
+def decode_swing_window(path: str, width: int = ANALYSIS_WIDTH) -> Tuple[np.ndarray, float, Dict]:
+    """
+    Decode only the active swing window of a clip
+
+    Short clips are decoded whole; longer ones go through the motion
+    prefilter first so the per-frame analysis cost tracks the swing, not the
+    clip length.
+    """
+    capture = _open_video(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    capture.release()
+
+    if 0 < frame_count <= (SWING_WINDOW_SECONDS + 2 * WINDOW_PADDING_SECONDS) * fps:
+        window = {"start_frame": 0, "end_frame": frame_count, "total_frames": frame_count,
+                  "fps": fps, "motion_detected": None}
+    else:
+        window = find_active_window(path)
+
+    frames, fps = decode_frames(path, width, start_frame=window["start_frame"], end_frame=window["end_frame"])
+    window = {
+        "start_s": round(window["start_frame"] / fps, 3),
+        "end_s": round((window["start_frame"] + len(frames)) / fps, 3),
+        "frames_analyzed": int(len(frames)),
+        "total_frames": window["total_frames"],
+        "motion_detected": window["motion_detected"]
+    }
+    return frames, fps, window
+
+def motion_energy(frames: np.ndarray) -> np.ndarray:
+    """Mean absolute difference between consecutive frames (length n-1)"""
+    if len(frames) < 2:
+        return np.zeros(0, dtype=np.float32)
+    diffs = np.abs(frames[1:].astype(np.int16) - frames[:-1].astype(np.int16))
+    return diffs.reshape(len(diffs), -1).mean(axis=1).astype(np.float32)
+
+def extract_swing_features(frames: np.ndarray, fps: float) -> Dict:
+    """Timing features of the swing derived from the frame-to-frame motion curve"""
+    energy = motion_energy(frames)
+    if energy.size == 0:
+        return {"frame_count": int(len(frames)), "fps": fps, "motion_profile": [],
+                "impact_frame": 0, "tempo_ratio": None, "swing_duration_s": 0.0}
+
+    # Impact is the fastest motion; top of backswing is the slowest point before it
+    impact = int(np.argmax(energy))
+    active = np.flatnonzero(energy > energy.mean())
+    start = int(active[0]) if active.size else 0
+    top = start + int(np.argmin(energy[start:impact])) if impact > start else start
+    backswing = max(1, top - start)
+    downswing = max(1, impact - top)
+
+    bins = np.array_split(energy, min(MOTION_PROFILE_BINS, energy.size))
+    profile = np.array([b.mean() for b in bins])
+    peak = profile.max()
+    if peak > 0:
+        profile = profile / peak
+
+    return {
+        "frame_count": int(len(frames)),
+        "fps": float(fps),
+        "motion_profile": [round(float(v), 4) for v in profile],
+        "impact_frame": impact + 1,
+        "tempo_ratio": round(backswing / downswing, 2),
+        "swing_duration_s": round((impact - start + 1) / fps, 3)
+    }
+
+def frames_to_shared(frames: np.ndarray) -> Tuple[shared_memory.SharedMemory, Dict]:
+    """Copy decoded frames into a shared memory block other processes can map without copying"""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, frames.nbytes))
+    view = np.ndarray(frames.shape, dtype=frames.dtype, buffer=shm.buf)
+    view[:] = frames
+    return shm, {"name": shm.name, "shape": list(frames.shape), "dtype": str(frames.dtype)}
+
+def attach_shared_frames(descriptor: Dict) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Map frames published by frames_to_shared; the caller closes (and unlinks) the block"""
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    frames = np.ndarray(tuple(descriptor["shape"]), dtype=descriptor["dtype"], buffer=shm.buf)
+    return shm, frames
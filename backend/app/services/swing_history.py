@@ -0,0 +1,329 @@
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.getenv("SWING_HISTORY_PATH", os.path.join(".data", "swing_history.jsonl"))
+
+MECHANICS = ("setup", "backswing", "downswing", "follow_through", "tempo", "balance")
+ROLLUP_WINDOWS = {"7d": 7, "30d": 30, "90d": 90}
+DAY_SECONDS = 86400
+
+class RollingWindow:
+    """
+    Running sums over the trailing N days of a player's history
+
+    The history is time ordered, so the window is a [start, end) slice: new
+    rows are added at the end and expired rows are subtracted from the front,
+    each row entering and leaving exactly once.
+    """
+
+    def __init__(self, days: int):
+        self.seconds = days * DAY_SECONDS
+        self.start = 0
+        self.count = 0
+        self.rating_sum = 0.0
+        self.rating_sq_sum = 0.0
+        self.mechanics_sums = [0.0] * len(MECHANICS)
+
+    def add(self, history: "PlayerSwingHistory", row: int) -> None:
+        rating = history.overall[row]
+        self.count += 1
+        self.rating_sum += rating
+        self.rating_sq_sum += rating * rating
+        for i, name in enumerate(MECHANICS):
+            self.mechanics_sums[i] += history.mechanics[name][row]
+
+    def expire(self, history: "PlayerSwingHistory", now: float) -> None:
+        cutoff = now - self.seconds
+        timestamps = history.timestamps
+        while self.count and timestamps[self.start] < cutoff:
+            rating = history.overall[self.start]
+            self.rating_sum -= rating
+            self.rating_sq_sum -= rating * rating
+            for i, name in enumerate(MECHANICS):
+                self.mechanics_sums[i] -= history.mechanics[name][self.start]
+            self.count -= 1
+            self.start += 1
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"count": 0, "avg_rating": None, "rating_stddev": None, "avg_mechanics": {}}
+        mean = self.rating_sum / self.count
+        variance = max(0.0, self.rating_sq_sum / self.count - mean * mean)
+        return {
+            "count": self.count,
+            "avg_rating": round(mean, 1),
+            "rating_stddev": round(variance ** 0.5, 2),
+            "avg_mechanics": {
+                name: round(self.mechanics_sums[i] / self.count, 1) for i, name in enumerate(MECHANICS)
+            }
+        }
+
+class PlayerSwingHistory:
+    """
+    One player's analyses stored column-wise in typed arrays, oldest first
+
+    In-order analyses are appended; late ones wait in a side list and are
+    merged in with one pass the next time the history is read, so a burst
+    of out-of-order entries costs one rebuild rather than one array shift
+    each.
+    """
+
+    def __init__(self):
+        self._clear()
+        self._late: List[Tuple] = []
+        # Analysis id of each clip (by content hash) already in the history
+        self.clips: Dict[str, str] = {}
+
+    def _clear(self) -> None:
+        self.timestamps = array("d")
+        self.overall = array("f")
+        self.mechanics = {name: array("B") for name in MECHANICS}
+        # Display-only columns
+        self.analysis_ids: List[str] = []
+        self.video_urls: List[Optional[str]] = []
+        self.primary_focus: List[Optional[str]] = []
+        self.windows = {label: RollingWindow(days) for label, days in ROLLUP_WINDOWS.items()}
+
+    def __len__(self) -> int:
+        return len(self.timestamps) + len(self._late)
+
+    def append(self, timestamp: float, overall_rating: float, mechanics: Dict[str, int],
+               analysis_id: str, video_url: Optional[str], primary_focus: Optional[str]) -> None:
+        scores = tuple(max(0, min(255, int(mechanics.get(name, 0)))) for name in MECHANICS)
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            self._late.append((timestamp, overall_rating, scores, analysis_id, video_url, primary_focus))
+            return
+        self._append_row(timestamp, overall_rating, scores, analysis_id, video_url, primary_focus)
+        row = len(self.timestamps) - 1
+        for window in self.windows.values():
+            window.add(self, row)
+            window.expire(self, timestamp)
+
+    def _append_row(self, timestamp: float, overall_rating: float, scores: Tuple[int, ...],
+                    analysis_id: str, video_url: Optional[str], primary_focus: Optional[str]) -> None:
+        self.timestamps.append(timestamp)
+        self.overall.append(overall_rating)
+        for name, score in zip(MECHANICS, scores):
+            self.mechanics[name].append(score)
+        self.analysis_ids.append(analysis_id)
+        self.video_urls.append(video_url)
+        self.primary_focus.append(primary_focus)
+
+    def _rows(self) -> Iterator[Tuple]:
+        for row in range(len(self.timestamps)):
+            yield (self.timestamps[row], self.overall[row], tuple(self.mechanics[name][row] for name in MECHANICS),
+                   self.analysis_ids[row], self.video_urls[row], self.primary_focus[row])
+
+    def _merge_late(self) -> None:
+        if not self._late:
+            return
+        late, self._late = sorted(self._late, key=lambda row: row[0]), []
+        # Stable on equal timestamps: earlier rows first, as bisect_right inserts would
+        rows = list(heapq.merge(self._rows(), late, key=lambda row: row[0]))
+        self._clear()
+        for row in rows:
+            self._append_row(*row)
+        self._rebuild_windows(now=self.timestamps[-1])
+
+    def _rebuild_windows(self, now: float) -> None:
+        for label, days in ROLLUP_WINDOWS.items():
+            window = RollingWindow(days)
+            window.start = bisect.bisect_left(self.timestamps, now - window.seconds)
+            for row in range(window.start, len(self.timestamps)):
+                window.add(self, row)
+            self.windows[label] = window
+
+    def rollups(self, now: float) -> Dict[str, Dict]:
+        self._merge_late()
+        for window in self.windows.values():
+            window.expire(self, now)
+        return {label: window.summary() for label, window in self.windows.items()}
+
+    def recent(self, limit: int) -> List[Dict]:
+        self._merge_late()
+        rows = range(len(self) - 1, max(-1, len(self) - 1 - limit), -1)
+        return [
+            {
+                "analysis_id": self.analysis_ids[row],
+                "date": datetime.fromtimestamp(self.timestamps[row]).date().isoformat(),
+                "overall_rating": round(self.overall[row], 1),
+                "primary_focus": self.primary_focus[row],
+                "video_url": self.video_urls[row]
+            }
+            for row in rows
+        ]
+
+def _empty_rollups() -> Dict[str, Dict]:
+    return {label: RollingWindow(days).summary() for label, days in ROLLUP_WINDOWS.items()}
+
+class SwingHistoryStore:
+    """
+    Per-player swing analysis history, persisted as an append-only JSONL log
+
+    The log is the shared record between uvicorn workers: each process
+    appends its own analyses and, before every read, applies whatever the
+    others appended since (one stat when nothing changed), so a worker sees
+    every worker's analyses without a restart.
+    """
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_HISTORY_PATH):
+        self.log_path = log_path
+        self.players: Dict[str, PlayerSwingHistory] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        if log_path:
+            with self._lock:
+                self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Apply log entries appended (by any process) since the last read; call with the lock held"""
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return
+        if size < self._offset:
+            # Truncated or replaced: start over
+            self.players, self._offset = {}, 0
+        if size == self._offset:
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # A line still being written is left for the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping corrupt swing history entry")
+                continue
+            self._append(entry)
+
+    def _append(self, entry: Dict) -> None:
+        history = self.players.setdefault(entry["player_id"], PlayerSwingHistory())
+        history.append(
+            entry["timestamp"], entry["overall_rating"], entry["mechanics"],
+            entry["analysis_id"], entry.get("video_url"), entry.get("primary_focus")
+        )
+        if entry.get("content_hash"):
+            history.clips.setdefault(entry["content_hash"], entry["analysis_id"])
+
+    def record(self, player_id: str, analysis: Dict, timestamp: Optional[float] = None) -> str:
+        """Add a completed analysis to the player's history; returns its analysis id"""
+        entry = self._entry(player_id, analysis, timestamp)
+        with self._lock:
+            return self._write(entry)
+
+    def record_once(self, player_id: str, analysis: Dict, timestamp: Optional[float] = None) -> str:
+        """
+        Add an analysis unless the player's history already has the same clip
+        (by content hash); returns the new or the existing analysis id
+
+        Used where a resubmission must not count twice, e.g. a practice
+        session sent again. Two workers recording the same clip at the same
+        instant can still both write it.
+        """
+        entry = self._entry(player_id, analysis, timestamp)
+        with self._lock:
+            if self.log_path:
+                self._catch_up()
+            history = self.players.get(player_id)
+            existing = history.clips.get(entry["content_hash"]) if history and entry["content_hash"] else None
+            return existing or self._write(entry)
+
+    @staticmethod
+    def _entry(player_id: str, analysis: Dict, timestamp: Optional[float]) -> Dict:
+        plan = analysis.get("improvement_plan") or {}
+        focus = (plan.get("priorities") or plan.get("focus_areas") or [None])[0]
+        return {
+            "player_id": player_id,
+            "timestamp": timestamp if timestamp is not None else time.time(),
+            "overall_rating": float(analysis.get("overall_rating") or 0.0),
+            "mechanics": analysis.get("mechanics_breakdown") or {},
+            "analysis_id": f"ana_{uuid.uuid4().hex[:12]}",
+            "video_url": analysis.get("video_url"),
+            "content_hash": analysis.get("content_hash"),
+            "primary_focus": focus
+        }
+
+    def _write(self, entry: Dict) -> str:
+        """Persist an entry and apply it; call with the lock held"""
+        if not self.log_path:
+            self._append(entry)
+            return entry["analysis_id"]
+        try:
+            if os.path.dirname(self.log_path):
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            # One write on an O_APPEND file, so concurrent workers' lines never interleave
+            with open(self.log_path, "ab", buffering=0) as f:
+                f.write((json.dumps(entry) + "\n").encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Could not persist swing history entry: {e}")
+            self._append(entry)
+            return entry["analysis_id"]
+        # Picks up this entry along with anything other workers appended before it
+        self._catch_up()
+        return entry["analysis_id"]
+
+    def trends(self, player_id: str, now: Optional[float] = None) -> Dict[str, Dict]:
+        """Rolling 7/30/90-day aggregates for a player"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            if self.log_path:
+                self._catch_up()
+            history = self.players.get(player_id)
+            return history.rollups(now) if history else _empty_rollups()
+
+    def history(self, player_id: str, limit: int = 10, now: Optional[float] = None) -> Dict:
+        """Recent analyses plus rollups, in the shape of the analysis-history endpoint"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            if self.log_path:
+                self._catch_up()
+            history = self.players.get(player_id)
+            total = len(history) if history else 0
+            recent = history.recent(limit) if history else []
+            rollups = history.rollups(now) if history else _empty_rollups()
+
+        week, month = rollups["7d"]["avg_rating"], rollups["30d"]["avg_rating"]
+        if week is None or month is None or rollups["30d"]["count"] < 2:
+            trend = "insufficient_data"
+        elif week > month + 1:
+            trend = "positive"
+        elif week < month - 1:
+            trend = "negative"
+        else:
+            trend = "stable"
+
+        return {
+            "player_id": player_id,
+            "total_analyses": total,
+            "recent_analyses": recent,
+            "improvement_trend": trend,
+            "avg_rating_last_30_days": month,
+            "rollups": rollups
+        }
+
+_history_store: Optional[SwingHistoryStore] = None
+_history_store_lock = threading.Lock()
+
+def get_swing_history_store() -> SwingHistoryStore:
+    """Process-wide swing history store"""
+    global _history_store
+    if _history_store is None:
+        with _history_store_lock:
+            if _history_store is None:
+                _history_store = SwingHistoryStore()
+    return _history_store
@@ -0,0 +1,27 @@
+from typing import Any, Dict, Optional
+
+from backend.app.services.job_queue import get_job_queue, register_job_handler
+from backend.app.services.swing_analysis import analyze_swing_cached
+from backend.app.services.swing_history import get_swing_history_store
+
+SWING_ANALYSIS_JOB = "swing_analysis"
+
+def run_swing_analysis_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: analyse one swing video"""
+    result = analyze_swing_cached(
+        video_url=payload["video_url"],
+        metadata=payload.get("metadata"),
+        content_hash=payload.get("content_hash")
+    )
+    if payload.get("player_id"):
+        get_swing_history_store().record(payload["player_id"], result)
+        result["player_id"] = payload["player_id"]
+    return result
+
+register_job_handler(SWING_ANALYSIS_JOB, run_swing_analysis_job)
+
+def submit_swing_analysis(video_url: str, metadata: Optional[Dict[str, Any]] = None,
+                          player_id: Optional[str] = None, priority: int = 0) -> str:
+    """Queue a swing analysis and return its job id immediately"""
+    payload = {"video_url": video_url, "metadata": metadata, "player_id": player_id}
+    return get_job_queue().submit(SWING_ANALYSIS_JOB, payload, priority=priority)
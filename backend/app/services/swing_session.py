@@ -0,0 +1,87 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from backend.app.services.swing_history import get_swing_history_store
+from backend.app.services.swing_workers import clip_result, get_swing_pool, prepare_clip
+
+MAX_SESSION_CLIPS = 100
+
+def _slope(values: List[float]) -> Optional[float]:
+    """Least-squares change per clip across the session"""
+    if len(values) < 2:
+        return None
+    return round(float(np.polyfit(np.arange(len(values)), values, 1)[0]), 3)
+
+def session_consistency(analyses: List[Dict[str, Any]], features: List[Optional[Dict]]) -> Dict[str, Any]:
+    """Spread of each mechanic across the session plus tempo drift from first to last clip"""
+    ratings = np.array([a.get("overall_rating") or 0.0 for a in analyses], dtype=np.float64)
+    categories = list((analyses[0].get("mechanics_breakdown") or {}).keys())
+    scores = np.array(
+        [[(a.get("mechanics_breakdown") or {}).get(cat, 0) for cat in categories] for a in analyses],
+        dtype=np.float64
+    )
+
+    mechanics = {}
+    for i, cat in enumerate(categories):
+        column = scores[:, i]
+        mechanics[cat] = {
+            "mean": round(float(column.mean()), 1),
+            "variance": round(float(column.var()), 2),
+            "stddev": round(float(column.std()), 2),
+            "min": int(column.min()),
+            "max": int(column.max())
+        }
+
+    tempo_ratios = [f["tempo_ratio"] for f in features if f and f.get("tempo_ratio") is not None]
+    avg_stddev = float(np.mean([m["stddev"] for m in mechanics.values()])) if mechanics else 0.0
+    most_variable = max(mechanics, key=lambda c: mechanics[c]["variance"]) if mechanics else None
+
+    return {
+        "overall_rating": {
+            "mean": round(float(ratings.mean()), 1),
+            "stddev": round(float(ratings.std()), 2),
+            "drift_per_clip": _slope(list(ratings))
+        },
+        "mechanics": mechanics,
+        "tempo_drift": {
+            "score_drift_per_clip": _slope(list(scores[:, categories.index("tempo")])) if "tempo" in categories else None,
+            "ratio_drift_per_clip": _slope(tempo_ratios),
+            "clips_with_timing": len(tempo_ratios)
+        },
+        "most_variable_mechanic": most_variable,
+        "consistency_score": round(max(0.0, 100.0 - avg_stddev * 5), 1)
+    }
+
+def analyze_session(video_urls: List[str], metadata: Optional[Dict[str, Any]] = None,
+                    player_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyse every clip from one practice session in parallel and summarise consistency
+
+    Clips are spread over the swing worker pool, whose processes each load the
+    analyzer once and reuse it for every clip they handle.
+    """
+    if not video_urls:
+        raise ValueError("At least one clip is required")
+    if len(video_urls) > MAX_SESSION_CLIPS:
+        raise ValueError(f"At most {MAX_SESSION_CLIPS} clips can be analysed per session")
+
+    pool = get_swing_pool()
+    futures = [pool.submit(prepare_clip, url, metadata, False) for url in video_urls]
+    clips = [clip_result(future) for future in futures]
+
+    analyses = [clip["analysis"] for clip in clips]
+    if player_id:
+        # A session sent again (or a clip repeated in it) is only counted once
+        history = get_swing_history_store()
+        for analysis in analyses:
+            history.record_once(player_id, analysis)
+
+    return {
+        "player_id": player_id,
+        "clip_count": len(clips),
+        "clips": [
+            {"index": i, "analysis": clip["analysis"], "features": clip["features"]}
+            for i, clip in enumerate(clips)
+        ],
+        "session_stats": session_consistency(analyses, [clip["features"] for clip in clips])
+    }
@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from backend.app.services.analysis_cache import content_hash_for, content_hash_for_file
+from backend.app.services.downloader import DownloadError, download_video
+from backend.app.services.metrics import record_timings, recording_timings
+from backend.app.services.swing_analysis import analyze_swing_cached, get_shared_analyzer
+from backend.app.services.swing_frames import (
+    decode_swing_window, extract_swing_features, frames_to_shared, resolve_local_video
+)
+
+logger = logging.getLogger(__name__)
+
+SWING_WORKER_PROCESSES = int(os.getenv("SWING_WORKER_PROCESSES", str(os.cpu_count() or 2)))
+# Fetch remote clips so their frames can be analysed; off means URL-only analysis
+MEDIA_DOWNLOADS_ENABLED = os.getenv("MEDIA_DOWNLOADS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Set in pool processes, which run one clip at a time and can share one analyzer
+_in_worker_process = False
+
+def init_swing_worker() -> None:
+    """Per-process setup: load the analyzer reference library once, not per clip"""
+    global _in_worker_process
+    _in_worker_process = True
+    get_shared_analyzer()
+
+def get_swing_pool() -> ProcessPoolExecutor:
+    """Long-lived process pool for decoding and analysing swing clips"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the API process runs threads (job workers, threadpool)
+                _pool = ProcessPoolExecutor(
+                    max_workers=SWING_WORKER_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_swing_worker
+                )
+    return _pool
+
+def prepare_clip(video_url: str, metadata: Optional[Dict[str, Any]] = None,
+                 share_frames: bool = True) -> Dict[str, Any]:
+    """
+    Worker task: hash, decode and analyse one clip
+
+    With share_frames, decoded frames are published to shared memory and only
+    the small descriptor travels back to the parent process, which then owns
+    (and must unlink) the block. Named timings taken in a pool process ride
+    back in clip["timings"]; collect the result with clip_result().
+    """
+    if not _in_worker_process:
+        return _prepare_clip(video_url, metadata, share_frames)
+    with recording_timings() as timings:
+        clip = _prepare_clip(video_url, metadata, share_frames)
+    clip["timings"] = timings
+    return clip
+
+def clip_source(video_url: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (local path, content hash) of a clip, downloading remote clips when
+    downloads are enabled; (None, None) when its bytes can't be had
+
+    Every analysis path keys on this hash, so a clip scores and caches the
+    same whichever endpoint it arrives through.
+    """
+    path = resolve_local_video(video_url)
+    if path:
+        return path, content_hash_for_file(path)
+    if MEDIA_DOWNLOADS_ENABLED and video_url.startswith(("http://", "https://")):
+        try:
+            download = download_video(video_url)
+            return download["path"], download["content_hash"]
+        except DownloadError as e:
+            logger.warning(f"Analysing {video_url} without its video: {e}")
+    return None, None
+
+def _prepare_clip(video_url: str, metadata: Optional[Dict[str, Any]], share_frames: bool) -> Dict[str, Any]:
+    clip = {"video_url": video_url, "frames": None, "features": None}
+    path, content_hash = clip_source(video_url)
+    if path:
+        frames, fps, window = decode_swing_window(path)
+        clip["features"] = extract_swing_features(frames, fps)
+        clip["features"]["swing_window"] = window
+        if share_frames:
+            shm, clip["frames"] = frames_to_shared(frames)
+            shm.close()
+    analyzer = get_shared_analyzer() if _in_worker_process else None
+    # Without the bytes the URL stands in, as it does in analyze_swing_cached
+    content_hash = content_hash or content_hash_for(video_url)
+    clip["analysis"] = analyze_swing_cached(video_url, metadata, content_hash=content_hash, analyzer=analyzer)
+    return clip
+
+def clip_result(future: Future) -> Dict[str, Any]:
+    """A pooled prepare_clip result, with its worker timings added to this process's metrics"""
+    clip = future.result()
+    record_timings(clip.pop("timings", ()))
+    return clip
+
+def analyze_clip(video_url: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Analyse a single clip in the calling process, attaching swing timing features when the video is local"""
+    clip = prepare_clip(video_url, metadata, share_frames=False)
+    analysis = clip["analysis"]
+    analysis["swing_features"] = clip["features"]
+    return analysis
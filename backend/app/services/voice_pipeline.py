@@ -0,0 +1,291 @@
+import abc
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = float(os.getenv("VOICE_CHUNK_SECONDS", "1.0"))
+VAD_FRAME_MS = 30
+# A frame is speech when it is this many dB above the running noise floor
+VAD_MARGIN_DB = float(os.getenv("VOICE_VAD_MARGIN_DB", "12"))
+# The noise floor starts at this percentile of the first chunk's frame levels,
+# so a clip that opens mid-sentence does not take speech for background noise
+VAD_FLOOR_PERCENTILE = 10
+VAD_MIN_SPEECH_SECONDS = 0.25
+# Silence shorter than this does not end a segment
+VAD_HANGOVER_SECONDS = 0.3
+MAX_SEGMENT_SECONDS = 30.0
+TRANSCRIBE_CONCURRENCY = int(os.getenv("VOICE_TRANSCRIBE_CONCURRENCY", "4"))
+
+class AudioUnavailable(Exception):
+    """The clip's audio track could not be decoded"""
+
+@dataclass
+class SpeechSegment:
+    start_s: float
+    end_s: float
+    samples: np.ndarray
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+def _iter_wav_chunks(path: str, chunk_samples: int) -> Iterator[np.ndarray]:
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise AudioUnavailable(f"{path}: only 16-bit PCM WAV is supported without ffmpeg")
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        # Read at the file's rate, then resample each chunk to SAMPLE_RATE
+        frames_per_read = max(1, int(chunk_samples * rate / SAMPLE_RATE))
+        while True:
+            raw = wav.readframes(frames_per_read)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=np.int16)
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            if rate != SAMPLE_RATE:
+                positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+                samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+            yield samples
+
+def _iter_ffmpeg_chunks(path: str, chunk_samples: int) -> Iterator[np.ndarray]:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioUnavailable("ffmpeg is not installed")
+    process = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-i", path, "-vn",
+         "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        chunk_bytes = chunk_samples * 2
+        while True:
+            raw = process.stdout.read(chunk_bytes)
+            if not raw:
+                break
+            yield np.frombuffer(raw[:len(raw) - len(raw) % 2], dtype=np.int16)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+def iter_audio_chunks(path: str, chunk_seconds: float = CHUNK_SECONDS) -> Iterator[np.ndarray]:
+    """
+    Stream a clip's audio as mono 16 kHz int16 chunks
+
+    WAV files are read directly; anything else is piped through ffmpeg so
+    only one chunk of decoded audio is held in memory at a time.
+    """
+    chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+    if path.lower().endswith(".wav"):
+        return _iter_wav_chunks(path, chunk_samples)
+    return _iter_ffmpeg_chunks(path, chunk_samples)
+
+def detect_speech_segments(chunks: Iterator[np.ndarray], margin_db: float = VAD_MARGIN_DB) -> Iterator[SpeechSegment]:
+    """
+    Energy-based voice activity detection over streamed audio chunks
+
+    Each 30 ms frame's RMS level is compared with an adaptive noise floor,
+    seeded from the quietest frames of the first chunk; runs of loud frames
+    (bridging short pauses) are yielded as segments as soon as they end, so
+    transcription can start before decoding finishes.
+    """
+    frame_len = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    hangover_frames = int(VAD_HANGOVER_SECONDS * 1000 / VAD_FRAME_MS)
+    min_frames = int(VAD_MIN_SPEECH_SECONDS * 1000 / VAD_FRAME_MS)
+    max_frames = int(MAX_SEGMENT_SECONDS * 1000 / VAD_FRAME_MS)
+
+    noise_floor: Optional[float] = None
+    carry = np.zeros(0, dtype=np.int16)
+    frame_index = 0
+    speech: List[np.ndarray] = []
+    speech_start = 0
+    silent_run = 0
+
+    def finish() -> Optional[SpeechSegment]:
+        voiced = len(speech) - silent_run
+        if voiced < min_frames:
+            return None
+        samples = np.concatenate(speech[:voiced])
+        start = speech_start * VAD_FRAME_MS / 1000
+        return SpeechSegment(start, start + voiced * VAD_FRAME_MS / 1000, samples)
+
+    for chunk in chunks:
+        buffer = np.concatenate([carry, chunk]) if len(carry) else chunk
+        usable = len(buffer) - len(buffer) % frame_len
+        carry = buffer[usable:]
+        if not usable:
+            continue
+        frames = buffer[:usable].reshape(-1, frame_len)
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        levels = 20 * np.log10(np.maximum(rms, 1.0))
+        if noise_floor is None:
+            noise_floor = float(np.percentile(levels, VAD_FLOOR_PERCENTILE))
+
+        for frame, level in zip(frames, levels):
+            is_speech = level > noise_floor + margin_db
+            if not is_speech:
+                # Track the floor on non-speech frames only: fast down, slow up
+                rate = 0.3 if level < noise_floor else 0.02
+                noise_floor += rate * (level - noise_floor)
+
+            if speech:
+                speech.append(frame)
+                silent_run = 0 if is_speech else silent_run + 1
+                if silent_run > hangover_frames or len(speech) >= max_frames:
+                    segment = finish()
+                    if segment is not None:
+                        yield segment
+                    speech, silent_run = [], 0
+            elif is_speech:
+                speech, speech_start, silent_run = [frame], frame_index, 0
+            frame_index += 1
+
+    if speech:
+        segment = finish()
+        if segment is not None:
+            yield segment
+
+class Transcriber(abc.ABC):
+    """Turns one speech segment (mono 16 kHz int16) into text"""
+
+    @abc.abstractmethod
+    def transcribe(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+        ...
+
+class StubTranscriber(Transcriber):
+    """Deterministic stand-in: the same audio always yields the same golf phrase"""
+
+    PHRASES = [
+        "Morning practice session on driving range",
+        "Tee shot on hole 7",
+        "Bunker shot practice",
+        "Working on my driver tempo",
+        "Approach shot with a seven iron",
+        "Chipping around the green"
+    ]
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+        digest = hashlib.sha256(samples.tobytes()).digest()
+        return self.PHRASES[digest[0] % len(self.PHRASES)]
+
+class WhisperTranscriber(Transcriber):
+    """OpenAI Whisper transcription API; each segment is uploaded as a small WAV file"""
+
+    def __init__(self, api_key: str, model: str = "whisper-1",
+                 api_base: str = "https://api.openai.com/v1", timeout: float = 30.0):
+        self.api_key = api_key
+        self.model = model
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+        import httpx
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(samples.astype(np.int16).tobytes())
+        response = httpx.post(
+            f"{self.api_base}/audio/transcriptions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            data={"model": self.model},
+            files={"file": ("segment.wav", buffer.getvalue(), "audio/wav")},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("text", "").strip()
+
+_transcriber: Optional[Transcriber] = None
+_transcriber_loaded = False
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def create_transcriber_from_env() -> Optional[Transcriber]:
+    """
+    Pick the backend named by VOICE_TRANSCRIBER: whisper, or stub for tests
+    and demos; unset (the default) means no transcription
+    """
+    name = os.getenv("VOICE_TRANSCRIBER", "").strip().lower()
+    if name == "whisper":
+        return WhisperTranscriber(
+            api_key=os.getenv("OPENAI_API_KEY", ""),
+            model=os.getenv("WHISPER_MODEL", "whisper-1"),
+            api_base=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+        )
+    if name == "stub":
+        return StubTranscriber()
+    if name not in ("", "none"):
+        logger.warning(f"Unknown VOICE_TRANSCRIBER {name!r}; voice transcription is off")
+    return None
+
+def get_transcriber() -> Optional[Transcriber]:
+    """The configured transcription backend, or None when transcription is off"""
+    global _transcriber, _transcriber_loaded
+    if not _transcriber_loaded:
+        _transcriber = create_transcriber_from_env()
+        _transcriber_loaded = True
+    return _transcriber
+
+def set_transcriber(transcriber: Optional[Transcriber]) -> None:
+    """Swap the transcription backend (e.g. a stub in tests); None turns transcription off"""
+    global _transcriber, _transcriber_loaded
+    _transcriber = transcriber
+    _transcriber_loaded = True
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_CONCURRENCY, thread_name_prefix="transcribe")
+    return _executor
+
+def transcribe_clip(path: str, transcriber: Optional[Transcriber] = None) -> Dict[str, Any]:
+    """
+    Transcribe only the speech in a clip
+
+    Segments are handed to the transcriber in parallel as the VAD finds them,
+    so cost follows the seconds of speech rather than the clip length.
+    """
+    transcriber = transcriber or get_transcriber()
+    if transcriber is None:
+        raise ValueError("No transcription backend configured (VOICE_TRANSCRIBER)")
+    audio_seconds = 0.0
+
+    def counted(chunks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        nonlocal audio_seconds
+        for chunk in chunks:
+            audio_seconds += len(chunk) / SAMPLE_RATE
+            yield chunk
+
+    pending = []
+    for segment in detect_speech_segments(counted(iter_audio_chunks(path))):
+        future = _get_executor().submit(transcriber.transcribe, segment.samples, SAMPLE_RATE)
+        pending.append((segment.start_s, segment.end_s, future))
+
+    segments = [
+        {"start_s": round(start, 2), "end_s": round(end, 2), "text": future.result()}
+        for start, end, future in pending
+    ]
+    return {
+        "text": " ".join(s["text"] for s in segments if s["text"]),
+        "segments": segments,
+        "speech_seconds": round(sum(s["end_s"] - s["start_s"] for s in segments), 2),
+        "audio_seconds": round(audio_seconds, 2)
+    }
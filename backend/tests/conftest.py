@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class StandInServer:
+    """
+    Local HTTP server standing in for a third-party API or media host
+
+    Tests register a handler per (method, path); a handler gets the request
+    as a dict (method, path, query, headers, body) and returns (status,
+    headers, body), where a non-bytes body is sent as JSON. Every request
+    seen is kept in `requests`.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get("content-length") or 0)
+                path, _, query = self.path.partition("?")
+                request = {
+                    "method": self.command,
+                    "path": path,
+                    "query": query,
+                    "headers": {name.lower(): value for name, value in self.headers.items()},
+                    "body": self.rfile.read(length) if length else b""
+                }
+                server.requests.append(request)
+                handler = server.handlers.get((self.command, path))
+                status, headers, body = handler(request) if handler else (404, {}, b"")
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **headers}
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def on(self, method: str, path: str, handler) -> None:
+        self.handlers[(method, path)] = handler
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def seen(self, method: str, path: str) -> list:
+        return [r for r in self.requests if r["method"] == method and r["path"] == path]
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+@pytest.fixture
+def standin():
+    server = StandInServer()
+    yield server
+    server.close()
@@ -0,0 +1,95 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.app.middleware import admission
+from backend.app.middleware.admission import AdmissionControlMiddleware
+from backend.app.services.rate_limiter import SharedTokenBuckets
+
+class FakeQueue:
+    depth_value = 0
+
+    def depth(self):
+        return self.depth_value
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = FakeQueue()
+    monkeypatch.setattr(admission, "get_job_queue", lambda: queue)
+    return queue
+
+@pytest.fixture
+def limits(monkeypatch):
+    for name, value in {"PLAYER_RATE": 0.001, "PLAYER_BURST": 2, "READ_RATE": 0.001, "READ_BURST": 3,
+                        "PLAYERS_PER_CLIENT": 2, "GLOBAL_RATE": 0.001, "GLOBAL_BURST": 100,
+                        "SHED_QUEUE_DEPTH": 5, "ADMISSION_ENABLED": True}.items():
+        monkeypatch.setattr(admission, name, value)
+
+@pytest.fixture
+def client(tmp_path, queue, limits):
+    app = FastAPI()
+
+    @app.post("/api/swing/jobs")
+    async def submit(request: Request):
+        return {"body": (await request.body()).decode()}
+
+    @app.get("/api/swing/jobs/{job_id}")
+    def status(job_id: str):
+        return {"job_id": job_id}
+
+    @app.post("/api/chatbot/chat")
+    def chat():
+        return {}
+
+    app.add_middleware(AdmissionControlMiddleware, buckets=SharedTokenBuckets(str(tmp_path / "buckets"), slots=1024))
+    return TestClient(app)
+
+def post(client, player=None, **kwargs):
+    headers = {"X-Player-Id": player} if player else {}
+    return client.post("/api/swing/jobs", headers=headers, **kwargs)
+
+def test_each_player_has_its_own_bucket(client):
+    assert [post(client, "p1").status_code for _ in range(4)] == [200, 200, 429, 429]
+    assert int(post(client, "p1").headers["retry-after"]) >= 1
+    # A throttled player's retries don't use up the address's budget
+    assert [post(client, "p2").status_code for _ in range(2)] == [200, 200]
+
+def test_rotating_player_ids_hit_the_client_address_budget(client):
+    # Two players' worth of burst per address, whatever ids are claimed
+    statuses = [post(client, f"player-{i}").status_code for i in range(5)]
+
+    assert statuses == [200, 200, 200, 200, 429]
+
+def test_the_player_is_read_from_small_json_bodies(client):
+    responses = [post(client, json={"player_id": "p9", "video_url": "v"}) for _ in range(3)]
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert '"player_id": "p9"' in responses[0].json()["body"]
+
+def test_the_global_bucket_sheds_with_503(client, monkeypatch):
+    monkeypatch.setattr(admission, "GLOBAL_BURST", 1)
+
+    assert post(client, "p1").status_code == 200
+    assert post(client, "p2").status_code == 503
+
+def test_new_work_is_shed_while_the_queue_is_deep(client, queue, monkeypatch):
+    monkeypatch.setattr(admission, "DEFAULT_WORKERS", 2)
+    queue.depth_value = 10
+
+    shed = post(client, "p1")
+
+    assert shed.status_code == 503
+    # Six jobs over the threshold for two workers
+    assert shed.headers["retry-after"] == "3"
+    assert client.get("/api/swing/jobs/job_1", headers={"X-Player-Id": "p1"}).status_code == 200
+
+def test_reads_have_a_budget_of_their_own(client):
+    post(client, "p1")
+    post(client, "p1")
+    assert post(client, "p1").status_code == 429
+
+    reads = [client.get("/api/swing/jobs/job_1", headers={"X-Player-Id": "p1"}).status_code for _ in range(4)]
+    assert reads == [200, 200, 200, 429]
+
+def test_other_routes_are_not_admission_controlled(client):
+    assert [client.post("/api/chatbot/chat").status_code for _ in range(10)] == [200] * 10
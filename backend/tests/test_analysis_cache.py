@@ -0,0 +1,87 @@
+import hashlib
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.app.services import analysis_cache, swing_frames, swing_workers
+from backend.app.services.analysis_cache import AnalysisCache, content_hash_for
+from backend.app.services.swing_analysis import analyze_swing_cached
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(analysis_cache, "_analysis_cache", cache)
+    return cache
+
+@pytest.fixture
+def media_dir(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    monkeypatch.setattr(swing_frames, "LOCAL_MEDIA_DIRS", [str(media)])
+    monkeypatch.setattr(swing_workers, "MEDIA_DOWNLOADS_ENABLED", False)
+    return media
+
+def write_clip(path, frames=12):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48))
+    for i in range(frames):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (i * 4, 10), (i * 4 + 8, 30), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def test_a_clip_is_keyed_on_its_content_whichever_path_analyses_it(cache, media_dir):
+    clip = write_clip(media_dir / "swing.mp4")
+
+    direct = analyze_swing_cached(clip)
+    pooled = swing_workers.prepare_clip(clip, share_frames=False)["analysis"]
+
+    assert direct["content_hash"] == pooled["content_hash"] == file_hash(clip)
+    assert direct["overall_rating"] == pooled["overall_rating"]
+    assert cache.stats["misses"] == 1
+
+def test_the_same_clip_under_another_name_is_a_cache_hit(cache, media_dir):
+    clip = write_clip(media_dir / "swing.mp4")
+    copy = shutil.copy(clip, media_dir / "resent.mp4")
+
+    first = analyze_swing_cached(clip)
+    second = analyze_swing_cached(str(copy))
+
+    assert second["content_hash"] == first["content_hash"]
+    assert second["video_url"] == str(copy)
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+
+def test_downloaded_clips_are_keyed_on_the_downloaded_bytes(cache, media_dir, monkeypatch):
+    clip = write_clip(media_dir / "swing.mp4")
+    monkeypatch.setattr(swing_workers, "MEDIA_DOWNLOADS_ENABLED", True)
+    monkeypatch.setattr(swing_workers, "download_video",
+                        lambda url: {"path": clip, "content_hash": file_hash(clip)})
+
+    remote = analyze_swing_cached("https://media.example.com/swing.mp4")
+
+    assert remote["content_hash"] == analyze_swing_cached(clip)["content_hash"] == file_hash(clip)
+
+def test_unreachable_clips_fall_back_to_the_url_on_every_path(cache, media_dir):
+    url = "https://media.example.com/missing.mp4"
+
+    direct = analyze_swing_cached(url)
+    pooled = swing_workers.prepare_clip(url, share_frames=False)["analysis"]
+
+    assert direct["content_hash"] == pooled["content_hash"] == content_hash_for(url)
+    assert direct["overall_rating"] == pooled["overall_rating"]
+
+def test_results_survive_a_restart_on_disk(tmp_path):
+    key = AnalysisCache.make_key("abc123", "v1", {"club": "driver"})
+    AnalysisCache(str(tmp_path)).set(key, {"overall_rating": 81.5})
+
+    restarted = AnalysisCache(str(tmp_path))
+    assert restarted.get(key) == {"overall_rating": 81.5}
+    assert restarted.get(key) == {"overall_rating": 81.5}
+    assert restarted.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0}
+    assert restarted.get(AnalysisCache.make_key("abc123", "v1", {"club": "wedge"})) is None
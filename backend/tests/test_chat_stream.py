@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routes import chatbot
+from backend.app.services import conversation_store, knowledge_retrieval
+from backend.app.services.conversation_store import ConversationStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ConversationStore(str(tmp_path / "chat_sessions.db"))
+    monkeypatch.setattr(conversation_store, "_conversation_store", store)
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index", None)
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index_loaded", True)
+    return store
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/api/chatbot")
+    return TestClient(app)
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_the_stream_sends_start_chunks_and_done(client, store):
+    question = "What's the penalty for out of bounds?"
+    response = client.post("/api/chatbot/chat/stream", json={"message": question})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "done" and set(names[1:-1]) == {"chunk"}
+
+    conversation_id = events[0][1]["conversation_id"]
+    answer = "".join(data["text"] for name, data in events if name == "chunk")
+    assert answer == client.post("/api/chatbot/chat", json={"message": question}).json()["response"]
+    assert store.recent(conversation_id) == [
+        {"role": "user", "content": question}, {"role": "assistant", "content": answer}
+    ]
+
+def test_a_failed_answer_ends_the_stream_with_an_error_and_records_nothing(client, store, monkeypatch):
+    def broken(message, context):
+        raise RuntimeError("index unavailable")
+    monkeypatch.setattr(chatbot, "get_golf_chat_response", broken)
+
+    events = sse_events(client.post("/api/chatbot/chat/stream", json={"message": "putting tips"}).text)
+
+    assert [name for name, _ in events] == ["start", "error"]
+    assert "index unavailable" in events[1][1]["detail"]
+    assert store.recent(events[0][1]["conversation_id"]) == []
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routes import chatbot
+from backend.app.services import conversation_store
+from backend.app.services.conversation_store import ConversationStore, merge_context
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "chat_sessions.db")
+
+def test_workers_sharing_the_file_resume_each_others_sessions(db_path):
+    first, second = ConversationStore(db_path), ConversationStore(db_path)
+    conversation_id, history = first.open(player_id="player-1")
+    first.append(conversation_id, "user", "How do I fix a slice?")
+    first.append(conversation_id, "assistant", "Strengthen your grip.")
+
+    resumed_id, history = second.open(conversation_id)
+
+    assert resumed_id == conversation_id
+    assert [turn["role"] for turn in history] == ["user", "assistant"]
+    assert second.recent(conversation_id, limit=1) == [{"role": "assistant", "content": "Strengthen your grip."}]
+
+def test_sessions_keep_only_their_last_turns(db_path):
+    store = ConversationStore(db_path, max_turns=3, max_message_chars=5)
+    conversation_id, _ = store.open()
+    for i in range(5):
+        store.append(conversation_id, "user", f"turn {i} and more")
+
+    assert [turn["content"] for turn in store.recent(conversation_id)] == ["turn ", "turn ", "turn "]
+    assert store.metrics()["total_bytes"] == 3 * (5 + conversation_store.TURN_OVERHEAD_BYTES)
+
+def test_idle_sessions_expire(db_path):
+    store = ConversationStore(db_path, ttl_seconds=0.05)
+    conversation_id, _ = store.open()
+    store.append(conversation_id, "user", "hello")
+    time.sleep(0.1)
+
+    new_id, history = store.open(conversation_id)
+
+    assert new_id != conversation_id and history == []
+    assert store.recent(conversation_id) == []
+    assert store.metrics()["expired"] == 1
+
+def test_least_recently_active_sessions_are_evicted_over_budget(db_path):
+    turn_bytes = 10 + conversation_store.TURN_OVERHEAD_BYTES
+    store = ConversationStore(db_path, max_total_bytes=2 * turn_bytes)
+    idle, _ = store.open()
+    store.append(idle, "user", "x" * 10)
+    busy, _ = store.open()
+    store.append(busy, "user", "y" * 10)
+    store.append(busy, "user", "z" * 10)
+
+    assert store.recent(idle) == []
+    assert len(store.recent(busy)) == 2
+    metrics = store.metrics()
+    assert metrics["evicted"] == 1 and metrics["sessions"] == 1 and metrics["total_bytes"] == 2 * turn_bytes
+
+def test_client_context_is_added_after_the_stored_turns():
+    history = [{"role": "user", "content": "rules for a lost ball"}]
+    context = [{"role": "user", "content": "rules for a lost ball"}, {"role": "user", "content": "bunker tips"}]
+
+    assert merge_context(history, context) == history + [context[1]]
+    assert merge_context(history, []) == history
+
+def test_chat_follow_ups_use_the_stored_conversation(db_path, monkeypatch):
+    monkeypatch.setattr(conversation_store, "_conversation_store", ConversationStore(db_path))
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/api/chatbot")
+    client = TestClient(app)
+
+    first = client.post("/api/chatbot/chat", json={"message": "How do I hit out of a bunker?"}).json()
+    client.post("/api/chatbot/chat", json={"message": "thanks", "conversation_id": first["conversation_id"]})
+
+    # A second worker process sees the same conversation
+    turns = ConversationStore(db_path).recent(first["conversation_id"])
+    assert [turn["content"] for turn in turns[::2]] == ["How do I hit out of a bunker?", "thanks"]
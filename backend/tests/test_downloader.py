@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from backend.app.services import downloader as downloader_module
+from backend.app.services.downloader import DownloadError, VideoDownloader
+
+BODY = bytes(range(256)) * 4096
+ETAG = '"v1"'
+
+def serve_clip(server, body=BODY, etag=ETAG, delay=0.0):
+    """Media host honouring Range only while If-Range still names the current ETag"""
+    def handler(request):
+        time.sleep(delay)
+        headers = {"ETag": etag, "Content-Type": "video/mp4"}
+        range_header = request["headers"].get("range")
+        if range_header and request["headers"].get("if-range", etag) == etag:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return 206, headers, body[start:]
+        return 200, headers, body
+    server.on("GET", "/clip.mp4", handler)
+
+def download(tmp_path, url, **kwargs):
+    kwargs.setdefault("allow_private_networks", True)
+
+    async def run():
+        downloader = VideoDownloader(download_dir=str(tmp_path), **kwargs)
+        try:
+            return await downloader.download(url)
+        finally:
+            await downloader.aclose()
+    return asyncio.run(run())
+
+def part_path(tmp_path, url):
+    return os.path.join(str(tmp_path), hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part")
+
+def test_download_is_content_addressed(standin, tmp_path):
+    serve_clip(standin)
+    result = download(tmp_path, standin.url("/clip.mp4"))
+    assert result["content_hash"] == hashlib.sha256(BODY).hexdigest()
+    assert result["path"] == os.path.join(str(tmp_path), result["content_hash"] + ".mp4")
+    with open(result["path"], "rb") as f:
+        assert f.read() == BODY
+    assert not [name for name in os.listdir(tmp_path) if name.endswith((".part", ".validator"))]
+
+def test_resume_sends_if_range(standin, tmp_path):
+    serve_clip(standin)
+    url = standin.url("/clip.mp4")
+    with open(part_path(tmp_path, url), "wb") as f:
+        f.write(BODY[:1000])
+    with open(part_path(tmp_path, url) + ".validator", "w") as f:
+        f.write(ETAG)
+
+    result = download(tmp_path, url)
+    assert result["content_hash"] == hashlib.sha256(BODY).hexdigest()
+    request = standin.seen("GET", "/clip.mp4")[0]
+    assert request["headers"]["range"] == "bytes=1000-"
+    assert request["headers"]["if-range"] == ETAG
+
+def test_changed_body_is_not_spliced_onto_a_stale_part(standin, tmp_path):
+    serve_clip(standin, etag='"v2"')
+    url = standin.url("/clip.mp4")
+    with open(part_path(tmp_path, url), "wb") as f:
+        f.write(b"x" * 1000)
+    with open(part_path(tmp_path, url) + ".validator", "w") as f:
+        f.write(ETAG)
+
+    result = download(tmp_path, url)
+    assert result["content_hash"] == hashlib.sha256(BODY).hexdigest()
+    assert result["size"] == len(BODY)
+
+def test_part_without_validator_starts_over(standin, tmp_path):
+    serve_clip(standin)
+    url = standin.url("/clip.mp4")
+    with open(part_path(tmp_path, url), "wb") as f:
+        f.write(b"x" * 1000)
+
+    result = download(tmp_path, url)
+    assert result["content_hash"] == hashlib.sha256(BODY).hexdigest()
+    assert "range" not in standin.seen("GET", "/clip.mp4")[0]["headers"]
+
+@pytest.mark.parametrize("url", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://localhost/clip.mp4",
+    "http://[::1]/clip.mp4",
+    "file:///etc/passwd",
+])
+def test_non_public_urls_are_refused(tmp_path, url):
+    with pytest.raises(DownloadError):
+        download(tmp_path, url, allow_private_networks=False)
+
+def test_loopback_stand_in_is_refused_without_a_request(standin, tmp_path):
+    serve_clip(standin)
+    with pytest.raises(DownloadError):
+        download(tmp_path, standin.url("/clip.mp4"), allow_private_networks=False)
+    assert standin.requests == []
+
+def test_host_allowlist(standin, tmp_path):
+    serve_clip(standin)
+    with pytest.raises(DownloadError, match="not an allowed media host"):
+        download(tmp_path, standin.url("/clip.mp4"), allowed_hosts=("media.example.com",))
+    assert download(tmp_path, standin.url("/clip.mp4"), allowed_hosts=("127.0.0.1",))["size"] == len(BODY)
+
+def test_every_redirect_hop_is_checked(standin, tmp_path, monkeypatch):
+    # Treat the stand-in as a public host so only the redirect target is in question
+    monkeypatch.setattr(downloader_module, "_is_public", lambda address: address == "127.0.0.1")
+    serve_clip(standin)
+    standin.on("GET", "/to-clip", lambda r: (302, {"Location": "/clip.mp4"}, b""))
+    standin.on("GET", "/to-metadata", lambda r: (302, {"Location": "http://169.254.169.254/latest/"}, b""))
+
+    assert download(tmp_path, standin.url("/to-clip"), allow_private_networks=False)["size"] == len(BODY)
+    with pytest.raises(DownloadError, match="non-public"):
+        download(tmp_path, standin.url("/to-metadata"), allow_private_networks=False)
+
+def test_same_url_from_separate_processes_shares_the_part_file_safely(standin, tmp_path):
+    # Two downloaders stand in for two worker processes: no shared in-memory dedupe
+    serve_clip(standin, delay=0.2)
+    url = standin.url("/clip.mp4")
+
+    async def run():
+        downloaders = [VideoDownloader(download_dir=str(tmp_path), allow_private_networks=True) for _ in range(2)]
+        try:
+            return await asyncio.gather(*(d.download(url) for d in downloaders))
+        finally:
+            for d in downloaders:
+                await d.aclose()
+
+    results = asyncio.run(run())
+    assert {r["content_hash"] for r in results} == {hashlib.sha256(BODY).hexdigest()}
+    with open(results[0]["path"], "rb") as f:
+        assert f.read() == BODY
+
+def test_sweep_removes_expired_files(tmp_path):
+    downloader = VideoDownloader(download_dir=str(tmp_path), retention_seconds=3600)
+    for name in ("old.mp4", "abc.part", "abc.part.validator", "new.mp4"):
+        with open(tmp_path / name, "wb") as f:
+            f.write(b"x")
+    old = time.time() - 7200
+    for name in ("old.mp4", "abc.part", "abc.part.validator"):
+        os.utime(tmp_path / name, (old, old))
+
+    assert downloader.sweep() == 3
+    assert sorted(os.listdir(tmp_path)) == ["abc.part.lock", "new.mp4"]
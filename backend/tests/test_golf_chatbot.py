@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from backend.app.services import golf_chatbot, knowledge_retrieval
+from backend.app.services.golf_chatbot import (
+    AnswerCache, GolfChatbotAI, get_golf_chatbot, iter_answer_chunks, last_user_message, normalize_question
+)
+
+@pytest.fixture(autouse=True)
+def no_knowledge_corpus(monkeypatch):
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index", None)
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index_loaded", True)
+
+def test_questions_normalise_to_one_cache_key():
+    assert normalize_question("  How do I PUTT better?? ") == normalize_question("how do i putt better")
+
+def test_the_last_user_turn_is_taken_from_either_history_shape():
+    history = [{"message": "first"}, {"role": "user", "content": "second"}, {"role": "assistant", "content": "reply"}]
+
+    assert last_user_message(history) == "second"
+    assert last_user_message([]) is None
+
+def test_the_cache_evicts_least_recently_used_answers():
+    cache = AnswerCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.metrics()["evictions"] == 1
+
+def test_cached_answers_expire():
+    cache = AnswerCache(ttl_seconds=0.05)
+    cache.set("a", "A")
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert cache.metrics()["expired"] == 1
+
+def test_repeated_questions_are_answered_from_the_cache():
+    bot = GolfChatbotAI()
+
+    first = bot.answer("Any tips for bunker shots?")
+    second = bot.answer("any TIPS for bunker shots")
+
+    assert first == second == bot.golf_knowledge["techniques"]["bunker"]
+    assert bot.answer_cache.metrics()["hits"] == 1
+
+def test_greetings_and_context_dependent_answers_are_not_cached():
+    bot = GolfChatbotAI()
+    bot.answer("hello")
+    bot.answer("what about putting?", history=[{"role": "user", "content": "any driving tips?"}])
+
+    assert bot.answer_cache.metrics()["entries"] == 0
+
+def test_the_chatbot_is_built_once_per_process(monkeypatch):
+    monkeypatch.setattr(golf_chatbot, "_chatbot", None)
+
+    assert get_golf_chatbot() is get_golf_chatbot()
+
+def test_answer_chunks_join_back_into_the_answer():
+    text = "Keep your head still and accelerate through the ball every single time"
+
+    chunks = list(iter_answer_chunks(text, words_per_chunk=4))
+
+    assert len(chunks) == 3 and "".join(chunks) == text
@@ -0,0 +1,51 @@
+from backend.app.services.golf_chatbot import GolfChatbotAI
+from backend.app.services.intent_router import IntentRouter
+
+def router():
+    return (IntentRouter()
+            .add("intent", "greeting", ["hi", "hello"], 20)
+            .add("intent", "rules", ["rule", "penalty"], 70)
+            .add("intent", "technique", ["how to", "swing*"], 60)
+            .add("rules", "out_of_bounds", ["out of bounds", "ob"], 3))
+
+def test_keywords_match_whole_words_only():
+    match = router().match("This is a thing about my Bob")
+
+    assert match.hits == {}
+
+def test_prefixes_and_phrases_match():
+    match = router().match("How to stop swinging over the top, it went out of bounds")
+
+    assert match.has("intent", "technique")
+    assert match.best("rules") == "out_of_bounds"
+    assert not router().match("how do I get out").has("rules", "out_of_bounds")
+
+def test_priority_wins_and_earlier_hits_break_ties():
+    assert router().match("hi, what's the penalty?").best("intent") == "rules"
+    assert router().match("hello hi").hits["intent"]["greeting"] == (20, 0)
+    assert router().match("how to swing").best("intent") == "technique"
+
+def test_a_follow_up_keeps_its_own_groups_over_the_earlier_ones():
+    earlier = router().match("penalty for ob")
+    follow_up = router().match("how to hit it")
+
+    merged = follow_up.merged_over(earlier)
+
+    assert merged.best("intent") == "technique"
+    assert merged.best("rules") == "out_of_bounds"
+    assert follow_up.best("rules") is None
+
+def test_the_chatbot_routes_each_intent_to_its_answer():
+    bot = GolfChatbotAI()
+    knowledge = bot.golf_knowledge
+
+    assert bot.generate_response("What's the rule for out of bounds?") == knowledge["rules"]["out_of_bounds"]
+    assert bot.generate_response("Any putting tips?") == knowledge["techniques"]["putting"]
+    assert bot.generate_response("Which wedges should I carry in my clubs?") == knowledge["equipment"]["wedges"]
+    assert bot.generate_response("What is a double bogey") == "Double Bogey: " + bot.golf_terms["double_bogey"]
+
+def test_follow_ups_borrow_the_earlier_questions_intent():
+    bot = GolfChatbotAI()
+    history = [{"role": "user", "content": "How can I improve my putting?"}]
+
+    assert bot.answer("what about chipping?", history=history) == bot.golf_knowledge["techniques"]["chipping"]
@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routes import swing
+from backend.app.services import job_queue
+from backend.app.services.job_queue import JobQueue
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+@pytest.fixture
+def handled(monkeypatch):
+    calls = []
+
+    def echo(payload):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise RuntimeError("bad clip")
+        time.sleep(payload.get("seconds", 0))
+        return {"echo": payload["n"]}
+    monkeypatch.setitem(job_queue._job_handlers, "echo", echo)
+    return calls
+
+def test_jobs_run_in_priority_order_and_store_their_result(db_path, handled):
+    queue = JobQueue(db_path, workers=0)
+    low = queue.submit("echo", {"n": 1})
+    high = queue.submit("echo", {"n": 2}, priority=5)
+    assert queue.depth() == 2
+
+    assert queue.run_once() and queue.run_once() and not queue.run_once()
+
+    assert [call["n"] for call in handled] == [2, 1]
+    assert queue.get(low)["status"] == "completed" and queue.get(low)["result"] == {"echo": 1}
+    assert queue.get(high)["attempts"] == 1
+    assert queue.depth() == 0
+
+def test_failures_and_unknown_kinds_are_recorded(db_path, handled):
+    queue = JobQueue(db_path, workers=0)
+    failing = queue.submit("echo", {"n": 1, "fail": True})
+    unknown = queue.submit("no_such_kind", {})
+    while queue.run_once():
+        pass
+
+    assert queue.get(failing)["status"] == "failed" and queue.get(failing)["error"] == "bad clip"
+    assert "No handler registered" in queue.get(unknown)["error"]
+
+def test_a_job_whose_lease_expired_is_retried(db_path, handled):
+    crashed = JobQueue(db_path, workers=0, lease_seconds=0.05)
+    job_id = crashed.submit("echo", {"n": 1})
+    assert crashed.claim()["id"] == job_id
+    assert crashed.claim() is None
+
+    time.sleep(0.1)
+    assert JobQueue(db_path, workers=0).run_once()
+
+    job = crashed.get(job_id)
+    assert job["status"] == "completed" and job["attempts"] == 2
+
+def test_a_job_abandoned_too_often_fails(db_path, handled):
+    queue = JobQueue(db_path, workers=0, lease_seconds=0.01)
+    job_id = queue.submit("echo", {"n": 1})
+    for _ in range(job_queue.MAX_ATTEMPTS):
+        assert queue.claim() is not None
+        time.sleep(0.02)
+
+    assert queue.run_once()
+    assert queue.get(job_id)["status"] == "failed" and handled == []
+
+def test_a_running_job_keeps_its_lease(db_path, handled):
+    queue = JobQueue(db_path, workers=0, lease_seconds=0.2)
+    job_id = queue.submit("echo", {"n": 1, "seconds": 0.8})
+    worker = threading.Thread(target=queue.run_once)
+    worker.start()
+    while queue.get(job_id)["status"] != "running":
+        time.sleep(0.01)
+
+    other = JobQueue(db_path, workers=0, lease_seconds=0.2)
+    stolen = []
+    while worker.is_alive():
+        row = other.claim()
+        if row is not None:
+            stolen.append(row["id"])
+        time.sleep(0.05)
+    worker.join()
+
+    assert stolen == []
+    assert queue.get(job_id)["status"] == "completed" and queue.get(job_id)["attempts"] == 1
+
+def test_a_lost_lease_is_not_renewed(db_path):
+    queue = JobQueue(db_path, workers=0, lease_seconds=0.01)
+    job_id = queue.submit("echo", {"n": 1})
+    queue.claim()
+    time.sleep(0.02)
+    queue.claim()
+
+    assert not queue.renew(job_id, attempt=1)
+    assert queue.renew(job_id, attempt=2)
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    queue = JobQueue(db_path, workers=0)
+    monkeypatch.setattr(job_queue, "_job_queue", queue)
+    monkeypatch.setattr(swing, "JOB_EVENT_POLL_SECONDS", 0.01)
+    app = FastAPI()
+    app.include_router(swing.router, prefix="/api/swing")
+    return TestClient(app)
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_submitted_jobs_report_status_and_stream_their_result(client, monkeypatch):
+    monkeypatch.setitem(job_queue._job_handlers, "swing_analysis", lambda payload: {"overall_rating": 80})
+
+    submitted = client.post("/api/swing/jobs", json={"video_url": "https://example.com/swing.mp4"})
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job_id"]
+    assert client.get(submitted.json()["status_url"]).json()["status"] == "queued"
+
+    threading.Timer(0.05, job_queue._job_queue.run_once).start()
+    events = sse_events(client.get(submitted.json()["events_url"]).text)
+
+    assert events[0][0] == "queued"
+    assert events[-1] == ("completed", client.get(f"/api/swing/jobs/{job_id}").json())
+    assert events[-1][1]["result"] == {"overall_rating": 80}
+
+def test_unknown_jobs_are_404(client):
+    assert client.get("/api/swing/jobs/job_missing").status_code == 404
+    assert client.get("/api/swing/jobs/job_missing/events").status_code == 404
+
+def test_a_job_deleted_mid_stream_ends_with_an_error_event(client, db_path):
+    job_id = job_queue._job_queue.submit("swing_analysis", {"video_url": "https://example.com/swing.mp4"})
+
+    def delete():
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+    threading.Timer(0.05, delete).start()
+    events = sse_events(client.get(f"/api/swing/jobs/{job_id}/events").text)
+
+    assert [event for event, _ in events] == ["queued", "error"]
+    assert events[-1][1] == {"job_id": job_id, "detail": "Job not found"}
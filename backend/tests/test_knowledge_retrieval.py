@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+from backend.app.services import knowledge_retrieval
+from backend.app.services.golf_chatbot import GolfChatbotAI
+from backend.app.services.knowledge_retrieval import (
+    BM25_B, BM25_K1, KnowledgeIndex, analyze, build_index_file, load_corpus_dir, retrieve_answer
+)
+
+PASSAGES = [
+    {"title": "Bunker play", "text": "Open the clubface and splash the sand two inches behind the ball."},
+    {"title": "Putting", "text": "Keep the putter face square and accelerate through the putt."},
+    {"title": "Lost ball", "text": "A lost ball costs stroke and distance; search for three minutes."},
+    {"title": "Fairway bunkers", "text": "From a fairway bunker take one more club and pick the ball clean."},
+]
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "short_game.md").write_text(
+        "# Bunkers\nOpen the clubface and splash the sand.\n\nKeep swinging through.\n\n"
+        "# Putting\nRead the green from below the hole.\n"
+    )
+    (tmp_path / "rules.jsonl").write_text('{"title": "Lost ball", "text": "Search for three minutes."}\n\n')
+    (tmp_path / "notes.pdf").write_bytes(b"ignored")
+    return tmp_path
+
+def reference_scores(passages, query):
+    """Textbook BM25, scored passage by passage"""
+    docs = [analyze(f"{p['title']} {p['text']}") for p in passages]
+    avg = sum(map(len, docs)) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(analyze(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg))
+        scores.append(score)
+    return scores
+
+def test_terms_drop_stopwords_and_fold_endings():
+    assert analyze("How do I stop slicing my drives?") == ["stop", "slic", "drive"]
+    assert analyze("Chipped grass") == ["chipp", "grass"]
+
+def test_corpus_files_split_into_titled_passages(corpus):
+    passages = load_corpus_dir(str(corpus))
+
+    assert [(p["title"], p["source"]) for p in passages] == [
+        ("Lost ball", "rules.jsonl"),
+        ("Bunkers", "short_game.md"), ("Bunkers", "short_game.md"), ("Putting", "short_game.md"),
+    ]
+    assert passages[2]["text"] == "Keep swinging through."
+
+def test_scores_match_textbook_bm25():
+    index = KnowledgeIndex.build(PASSAGES)
+    query = "how do I get out of a bunker with sand"
+
+    hits = index.search(query, k=len(PASSAGES))
+    expected = reference_scores(PASSAGES, query)
+
+    assert [hit["title"] for hit in hits] == ["Bunker play", "Fairway bunkers"]
+    for hit in hits:
+        position = next(i for i, p in enumerate(PASSAGES) if p["title"] == hit["title"])
+        assert hit["score"] == pytest.approx(expected[position], abs=1e-3)
+    assert index.search("the and of") == []
+
+def test_a_prebuilt_index_file_answers_like_the_built_one(corpus, tmp_path):
+    index_path = str(tmp_path / "index" / "knowledge.npz")
+    built = build_index_file(str(corpus), index_path)
+
+    loaded = KnowledgeIndex.load(index_path)
+
+    assert len(loaded) == len(built)
+    assert loaded.search("splash sand bunker") == built.search("splash sand bunker")
+
+def test_only_relevant_passages_answer_the_chatbot(monkeypatch):
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index", KnowledgeIndex.build(PASSAGES))
+    monkeypatch.setattr(knowledge_retrieval, "_knowledge_index_loaded", True)
+
+    assert retrieve_answer("lost ball search minutes")["title"] == "Lost ball"
+    assert retrieve_answer("putter", min_score=100.0) is None
+    assert GolfChatbotAI().answer("how long can I search for a lost ball?") == PASSAGES[2]["text"]
@@ -0,0 +1,102 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.app.routes import media
+from backend.app.services import media_ingest
+from backend.app.services.idempotency import IdempotencyStore
+from backend.app.services.notifier import LocalNotifier, set_notifier
+
+MESSAGE = {"message_id": "wamid.1", "from": "whatsapp:+15550001", "media_url": "https://example.com/swing.mp4"}
+UPLOAD = {"player_id": "whatsapp:+15550001", "video_url": "https://example.com/swing.mp4", "message_id": "wamid.1"}
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}
+
+    def submit(self, upload):
+        job_id = f"job_{len(self.jobs) + 1}"
+        self.jobs[job_id] = {"job_id": job_id, "status": "queued", "payload": {"upload": upload.model_dump()}}
+        return job_id
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"))
+    jobs = FakeJobQueue()
+    analyses = []
+
+    def analyze(upload):
+        analyses.append(upload)
+        return {"summary": f"Analysis for {upload.player_id}", "video_url": upload.video_url}
+
+    monkeypatch.setattr(media, "WHATSAPP_WEBHOOK_MODE", "async")
+    monkeypatch.setattr(media, "get_idempotency_store", lambda: store)
+    monkeypatch.setattr(media, "get_job_queue", lambda: jobs)
+    monkeypatch.setattr(media, "enqueue_media_upload", jobs.submit)
+    monkeypatch.setattr(media, "analyze_media_upload", analyze)
+    monkeypatch.setattr(media, "parse_whatsapp_payload", lambda payload: media.MediaUpload(
+        player_id=payload["from"], video_url=payload["media_url"], message_id=payload["message_id"]))
+
+    app = FastAPI()
+    app.include_router(media.router, prefix="/api/media")
+    test_client = TestClient(app)
+    test_client.jobs, test_client.analyses = jobs, analyses
+    return test_client
+
+def test_webhook_ack_is_not_replayed_as_an_analysis(client):
+    ack = client.post("/api/media/webhook", json=MESSAGE).json()
+    assert ack["status"] == "accepted"
+
+    response = client.post("/api/media/receive", json=UPLOAD)
+    assert response.status_code == 200
+    assert response.json()["summary"] == "Analysis for whatsapp:+15550001"
+
+    # And the other way round: the webhook still replays its own acknowledgement
+    assert client.post("/api/media/webhook", json=MESSAGE).json() == {**ack, "duplicate": True}
+
+def test_analysis_is_not_replayed_as_a_webhook_ack(client):
+    client.post("/api/media/receive", json=UPLOAD)
+    ack = client.post("/api/media/webhook", json=MESSAGE).json()
+    assert ack["status"] == "accepted" and "duplicate" not in ack
+
+def test_provider_retry_requeues_a_failed_job(client):
+    first = client.post("/api/media/webhook", json=MESSAGE).json()
+    client.jobs.jobs[first["job_id"]]["status"] = "failed"
+
+    retry = client.post("/api/media/webhook", json=MESSAGE).json()
+    assert retry["job_id"] != first["job_id"] and "duplicate" not in retry
+    assert client.post("/api/media/webhook", json=MESSAGE).json()["job_id"] == retry["job_id"]
+
+def test_twilio_form_webhook_is_analysed_and_answered(client, monkeypatch):
+    monkeypatch.setattr(media, "parse_whatsapp_payload", media_ingest.parse_whatsapp_payload)
+    monkeypatch.setattr(media_ingest, "analyze_media_upload", lambda upload: {
+        "summary": f"Analysis for {upload.player_id}", "advice": "Slow the takeaway.",
+        "overall_rating": 7.5, "video_url": upload.video_url
+    })
+    notifier = LocalNotifier()
+    set_notifier(notifier)
+    try:
+        response = client.post("/api/media/webhook", data={
+            "From": "whatsapp:+15550002", "MediaUrl0": "https://example.com/drive.mp4",
+            "MessageSid": "SM1", "Body": "Driver on the range"
+        })
+        assert response.status_code == 200 and response.json()["status"] == "accepted"
+
+        job = client.jobs.get(response.json()["job_id"])
+        media_ingest.run_whatsapp_media_job(job["payload"])
+    finally:
+        set_notifier(None)
+
+    assert notifier.sent == [{
+        "to": "whatsapp:+15550002",
+        "message": "Analysis for whatsapp:+15550002 Slow the takeaway.",
+        "data": {"overall_rating": 7.5, "video_url": "https://example.com/drive.mp4"}
+    }]
+    assert job["payload"]["upload"]["voice_tag"] == "Driver on the range"
+
+def test_webhook_rejects_a_body_that_is_neither_json_nor_a_form(client):
+    response = client.post("/api/media/webhook", content=b"<xml/>", headers={"Content-Type": "text/xml"})
+    assert response.status_code == 400
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.app.middleware.metrics import MetricsMiddleware
+from backend.app.services.metrics import MetricsRegistry
+
+class ShedPosts:
+    """Rejects every POST before routing, as admission control does when overloaded"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            await JSONResponse({"detail": "Server busy"}, status_code=503)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+@pytest.fixture
+def app_and_registry():
+    registry = MetricsRegistry()
+    router = APIRouter()
+
+    @router.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        return {"job_id": job_id}
+
+    @router.post("/analyze")
+    def analyze():
+        return {}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/swing")
+    app.add_middleware(ShedPosts)
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    return TestClient(app), registry
+
+def test_shed_requests_are_labelled_by_router_prefix(app_and_registry):
+    client, registry = app_and_registry
+    assert client.get("/api/swing/jobs/1").status_code == 200
+    assert client.post("/api/swing/analyze").status_code == 503
+    assert client.get("/wp-admin/setup.php").status_code == 404
+
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/api/swing/jobs/{job_id}",status="200"} 1' in text
+    assert 'http_requests_total{method="POST",route="/api/swing/*",status="503"} 1' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+
+def test_counter_and_gauge_names_do_not_mix():
+    registry = MetricsRegistry()
+    registry.gauge("queue_depth", "Jobs waiting")
+    registry.counter("jobs_total", "Jobs run")
+
+    with pytest.raises(ValueError):
+        registry.counter("queue_depth", "Jobs waiting")
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Jobs run")
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+
+from backend.app.services import perceptual_hash
+from backend.app.services.perceptual_hash import NearDuplicateIndex, clip_fingerprint
+
+BACKGROUND = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8), (0, 0), 6)
+
+def write_swing(path, start=40, speed=8, size=(320, 240), fourcc="mp4v", brightness=0):
+    """A club-like bar sweeping across the same fixed-camera background"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), 30, size)
+    for i in range(48):
+        frame = BACKGROUND.copy()
+        x = (start + speed * i) % 300
+        cv2.rectangle(frame, (x, 60), (x + 20, 200), (255, 255, 255), -1)
+        frame = cv2.convertScaleAbs(frame, beta=brightness)
+        writer.write(cv2.resize(frame, size))
+    writer.release()
+    return clip_fingerprint(str(path))
+
+def test_a_re_encoded_copy_matches_the_same_players_clip(tmp_path):
+    index = NearDuplicateIndex(log_path=None)
+    index.add(write_swing(tmp_path / "swing.mp4"), "original", "player-1")
+
+    resent = write_swing(tmp_path / "resent.avi", fourcc="MJPG", size=(640, 480), brightness=6)
+    match = index.find(resent, "player-1")
+
+    assert match is not None and match["content_hash"] == "original"
+    assert match["distance"] <= perceptual_hash.MAX_CLIP_DISTANCE
+
+def test_another_players_clip_is_never_a_match(tmp_path):
+    index = NearDuplicateIndex(log_path=None)
+    fingerprint = write_swing(tmp_path / "swing.mp4")
+    index.add(fingerprint, "original", "player-1")
+
+    assert index.find(fingerprint, "player-2") is None
+    assert index.find(fingerprint, None) is None
+    assert index.add(fingerprint, "original", "player-2")
+
+def test_a_different_swing_from_the_same_camera_is_not_a_match(tmp_path):
+    index = NearDuplicateIndex(log_path=None)
+    index.add(write_swing(tmp_path / "first.mp4"), "first", "player-1")
+
+    assert index.find(write_swing(tmp_path / "second.mp4", start=60, speed=7), "player-1") is None
+
+def test_the_index_is_rebuilt_per_player_from_its_log(tmp_path):
+    log_path = str(tmp_path / "near_duplicates.jsonl")
+    fingerprint = write_swing(tmp_path / "swing.mp4")
+    index = NearDuplicateIndex(log_path)
+    assert index.add(fingerprint, "original", "player-1")
+    assert not index.add(fingerprint, "original", "player-1")
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+
+    replayed = NearDuplicateIndex(log_path)
+
+    assert replayed.find(fingerprint, "player-1")["content_hash"] == "original"
+    assert replayed.find(fingerprint, "player-2") is None
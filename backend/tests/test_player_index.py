@@ -0,0 +1,35 @@
+from backend.app.services import linkedin_agent
+from backend.app.services.player_index import DEMO_PLAYERS, PlayerIndex
+
+def profiles():
+    return [
+        {"id": f"p{i}", "name": f"Player {i}", "location": "San Diego, CA", "skill_level": "Amateur",
+         "latitude": 32.7 + i * 0.01, "longitude": -117.1, "handicap": float(i)}
+        for i in range(5)
+    ]
+
+def test_unknown_location_lists_players_unranked(monkeypatch):
+    monkeypatch.setattr(linkedin_agent, "get_player_index", lambda: PlayerIndex(profiles()))
+
+    first, cursor = linkedin_agent.search_golfers("Atlantis", radius_km=10, k=3, limit=2)
+    second, last_cursor = linkedin_agent.search_golfers("Atlantis", limit=2, cursor=cursor)
+    rest, _ = linkedin_agent.search_golfers("Atlantis", limit=2, cursor=last_cursor)
+
+    assert [p["id"] for p in first + second + rest] == ["p0", "p1", "p2", "p3", "p4"]
+    assert all(p["distance_km"] is None for p in first)
+
+def test_demo_players_are_found_by_any_location(monkeypatch):
+    monkeypatch.setattr(linkedin_agent, "get_player_index", lambda: PlayerIndex(list(DEMO_PLAYERS)))
+
+    players, _ = linkedin_agent.search_golfers("Somewhere else")
+    assert len(players) == len(DEMO_PLAYERS)
+
+def test_paging_by_distance_cursor():
+    index = PlayerIndex(profiles())
+    seen, cursor = [], None
+    while True:
+        page, cursor = index.search(32.7, -117.1, radius_km=50, limit=2, cursor=cursor)
+        seen += [p["id"] for p in page]
+        if cursor is None:
+            break
+    assert seen == ["p0", "p1", "p2", "p3", "p4"]
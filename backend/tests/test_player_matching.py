@@ -0,0 +1,86 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from backend.app.services import player_matching
+from backend.app.services.player_index import SKILL_LEVELS
+from backend.app.services.player_matching import (
+    COURSES_FOR_FULL_SCORE, HANDICAP_SCALE, WEIGHTS, CompatibilityIndex, _popcount
+)
+
+INTERESTS = ["walking", "match play", "night golf", "scramble", "links", "practice", "betting"]
+COURSES = ["Pebble Beach", "Bethpage Black", "Torrey Pines", "Kiawah", "Pinehurst No. 2"]
+
+def profiles(count, seed=3):
+    rng = random.Random(seed)
+    return [{
+        "player_id": f"p{i}",
+        "handicap": None if i % 11 == 0 else round(rng.uniform(0, 36), 1),
+        "skill_level": None if i % 13 == 0 else rng.choice(SKILL_LEVELS),
+        "interests": rng.sample(INTERESTS, rng.randint(0, 4)),
+        "favorite_courses": rng.sample(COURSES, rng.randint(0, 3))
+    } for i in range(count)]
+
+def reference_score(player, other):
+    """The scoring rules written out one pair at a time"""
+    if player.get("handicap") is None or other.get("handicap") is None:
+        handicap = 0.5
+    else:
+        handicap = math.exp(-abs(player["handicap"] - other["handicap"]) / HANDICAP_SCALE)
+    codes = {level: code for code, level in enumerate(SKILL_LEVELS)}
+    if player.get("skill_level") not in codes or other.get("skill_level") not in codes:
+        skill = 0.5
+    else:
+        skill = 1 - abs(codes[player["skill_level"]] - codes[other["skill_level"]]) / (len(SKILL_LEVELS) - 1)
+    mine, theirs = set(player["interests"]), set(other["interests"])
+    interests = len(mine & theirs) / len(mine | theirs) if mine else 0.0
+    shared_courses = len(set(player["favorite_courses"]) & set(other["favorite_courses"]))
+    courses = min(shared_courses, COURSES_FOR_FULL_SCORE) / COURSES_FOR_FULL_SCORE
+    return 100 * (WEIGHTS["handicap"] * handicap + WEIGHTS["skill"] * skill
+                  + WEIGHTS["interests"] * interests + WEIGHTS["courses"] * courses)
+
+def test_popcount_counts_every_bit():
+    words = np.array([0, 1, 0xFFFFFFFFFFFFFFFF, 0x8000000000000001, 0x0F0F0F0F0F0F0F0F], dtype=np.uint64)
+
+    assert _popcount(words).tolist() == [0, 1, 64, 2, 32]
+
+def test_vectorised_scores_match_the_pairwise_rules():
+    players = profiles(60)
+    index = CompatibilityIndex(players)
+
+    for player in players[:5]:
+        expected = [reference_score(player, other) for other in players]
+        assert index.score(player) == pytest.approx(expected, abs=1e-3)
+
+def test_top_k_is_the_best_k_in_order_without_the_player():
+    players = profiles(200)
+    index = CompatibilityIndex(players)
+    scores = index.score(players[7])
+
+    top = index.top_k(players[7], k=5, exclude=7)
+
+    assert "p7" not in [p["player_id"] for p in top]
+    ranked = sorted((s for i, s in enumerate(scores) if i != 7), reverse=True)[:5]
+    assert [p["compatibility_score"] for p in top] == [round(float(s), 1) for s in ranked]
+
+def test_top_k_within_candidates_only_returns_candidates():
+    players = profiles(50)
+    index = CompatibilityIndex(players)
+    candidates = np.array([3, 9, 21, 30, 44])
+
+    top = index.top_k(players[3], k=10, candidates=candidates, exclude=3)
+
+    assert sorted(p["player_id"] for p in top) == ["p21", "p30", "p44", "p9"]
+    assert index.top_k(players[3], k=3, candidates=np.array([3]), exclude=3) == []
+
+def test_the_index_is_built_from_the_player_index_once(monkeypatch):
+    class Players:
+        profiles = profiles(5)
+    monkeypatch.setattr(player_matching, "get_player_index", lambda: Players)
+    monkeypatch.setattr(player_matching, "_compatibility_index", None)
+
+    index = player_matching.get_compatibility_index()
+
+    assert len(index) == 5 and player_matching.get_compatibility_index() is index
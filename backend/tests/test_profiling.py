@@ -0,0 +1,45 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.app.middleware import profiling as profiling_middleware
+from backend.app.middleware.profiling import ProfilingMiddleware
+from backend.app.routes import admin
+from backend.app.services.profiling import ProfileStore
+
+TOKEN = "s3cret"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling_middleware, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", TOKEN)
+    store = ProfileStore(str(tmp_path))
+    monkeypatch.setattr(admin, "get_profile_store", lambda: store)
+
+    app = FastAPI()
+
+    @app.get("/public")
+    def public():
+        return {"ok": True}
+
+    app.include_router(admin.router, prefix="/api/admin")
+    app.add_middleware(ProfilingMiddleware, store=store, sample_rate=0)
+    return TestClient(app)
+
+def test_profile_header_with_the_token_profiles_the_request(client):
+    response = client.get("/public", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    listed = client.get("/api/admin/profiles", headers={"X-Admin-Token": TOKEN}).json()["profiles"]
+    assert [p["id"] for p in listed] == [profile_id]
+
+@pytest.mark.parametrize("value", ["wrong", "sécret", "s3creté"])
+def test_other_profile_headers_are_ignored(client, value):
+    response = client.get("/public", headers={"X-Profile": value.encode("utf-8")})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+@pytest.mark.parametrize("value", [None, "wrong", "sécret"])
+def test_admin_endpoints_need_the_token(client, value):
+    headers = {"X-Admin-Token": value.encode("utf-8")} if value else {}
+    assert client.get("/api/admin/profiles", headers=headers).status_code == 403
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+
+from backend.app.models import PlayerProfile
+from backend.app.services.sponsor_match import (
+    CampaignIndex, CampaignRegistry, DEFAULT_CAMPAIGNS, profile_fingerprint
+)
+from backend.app.services.sponsor_offers import OfferStore
+
+def test_raw_records_fingerprint_like_the_api_model():
+    record = {"id": "p1", "name": "Sam", "handicap": 2, "interests": ["Charity Events"]}
+    model = PlayerProfile(**record).model_dump()
+
+    assert profile_fingerprint(record) == profile_fingerprint(model)
+    index = CampaignIndex(list(DEFAULT_CAMPAIGNS))
+    assert index.match(record) == index.match(model)
+
+def test_concurrent_builds_run_one_after_the_other(tmp_path):
+    store = OfferStore(str(tmp_path / "offers.db"))
+    errors = []
+
+    def chunks(player_id):
+        for _ in range(3):
+            time.sleep(0.05)
+            yield [(player_id, 1, "campaign")]
+
+    def build(player_id, version):
+        try:
+            store.build(chunks(player_id), version)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build, args=(f"p{i}", f"v{i}")) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    version = store.status()["campaigns_version"]
+    winner = "p" + version[1:]
+    assert store.lookup(winner, 1, version) == ["campaign"]
+
+def test_invalid_campaign_files_keep_the_last_good_campaigns(tmp_path):
+    path = tmp_path / "campaigns.json"
+    registry = CampaignRegistry(str(path), check_interval=0)
+    good = {"id": "pros", "sponsor_name": "Acme", "offer_text": "Deal", "criteria": {"skill_levels": ["Pro"]}}
+    path.write_text(json.dumps([good]))
+    assert registry.index().by_id.keys() == {"pros"}
+
+    for mtime, broken in enumerate([
+        [good, "oops"],
+        [{**good, "criteria": {"skill_levels": "Pro"}}],
+        [{**good, "criteria": {"max_handicap": "ten"}}],
+        {"campaigns": 3},
+        "not json",
+    ], start=1):
+        path.write_text(broken if isinstance(broken, str) else json.dumps(broken))
+        os.utime(path, (mtime, mtime))
+        assert registry.index().by_id.keys() == {"pros"}
+    assert registry.stats["reload_errors"] == 5
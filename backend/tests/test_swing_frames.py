@@ -0,0 +1,113 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.app.services import swing_frames
+from backend.app.services.swing_frames import (
+    attach_shared_frames, decode_swing_window, extract_swing_features, find_active_window, frames_to_shared,
+    resolve_local_video
+)
+
+FPS = 30
+
+@pytest.fixture
+def media_dir(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    monkeypatch.setattr(swing_frames, "LOCAL_MEDIA_DIRS", [str(media)])
+    return media
+
+def test_clips_inside_the_media_directory_resolve(media_dir):
+    clip = media_dir / "swing.mp4"
+    clip.write_bytes(b"clip")
+
+    assert resolve_local_video(str(clip)) == os.path.realpath(clip)
+    assert resolve_local_video(f"file://{clip}") == os.path.realpath(clip)
+
+def test_paths_outside_the_media_directory_are_never_local(media_dir, tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("hunter2")
+    (media_dir / "link.mp4").symlink_to(secret)
+
+    for reference in [str(secret), f"file://{secret}", str(media_dir / ".." / "secret.txt"),
+                      str(media_dir / "link.mp4"), "/etc/passwd", "file:///etc/passwd"]:
+        assert resolve_local_video(reference) is None, reference
+
+def test_an_outside_file_is_not_hashed_by_the_clip_pipeline(media_dir, tmp_path, monkeypatch):
+    from backend.app.services import swing_workers
+
+    secret = tmp_path / "secret.txt"
+    secret.write_text("hunter2")
+    monkeypatch.setattr(swing_workers, "MEDIA_DOWNLOADS_ENABLED", False)
+
+    clip = swing_workers.prepare_clip(str(secret), share_frames=False)
+
+    assert clip["features"] is None
+    assert hashlib.sha256(b"hunter2").hexdigest() not in str(clip["analysis"])
+
+def write_range_clip(path, seconds, swing_at=None, swing_seconds=1.0):
+    """A still range scene, with a bar sweeping across it for swing_seconds from swing_at"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, (160, 120))
+    for i in range(int(seconds * FPS)):
+        frame = np.full((120, 160, 3), 90, dtype=np.uint8)
+        t = i / FPS
+        if swing_at is not None and swing_at <= t < swing_at + swing_seconds:
+            x = int((t - swing_at) / swing_seconds * 140)
+            cv2.rectangle(frame, (x, 20), (x + 20, 100), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+def test_only_the_swing_window_of_a_long_clip_is_decoded(tmp_path):
+    clip = write_range_clip(tmp_path / "glasses.mp4", seconds=12, swing_at=7.0)
+
+    window = find_active_window(clip)
+    frames, fps, summary = decode_swing_window(clip)
+
+    assert window["motion_detected"] and window["total_frames"] == 12 * FPS
+    assert window["start_frame"] <= 7 * FPS and window["end_frame"] >= 8 * FPS
+    assert len(frames) == summary["frames_analyzed"] <= swing_frames.SWING_WINDOW_SECONDS * FPS
+    assert summary["start_s"] <= 7.0 <= 8.0 <= summary["end_s"]
+
+def test_a_short_clip_is_decoded_whole(tmp_path):
+    clip = write_range_clip(tmp_path / "short.mp4", seconds=2, swing_at=0.5)
+
+    frames, fps, summary = decode_swing_window(clip)
+
+    assert summary["frames_analyzed"] == summary["total_frames"] == 2 * FPS
+    assert summary["motion_detected"] is None
+
+def test_a_still_clip_falls_back_to_its_opening_seconds(tmp_path):
+    clip = write_range_clip(tmp_path / "still.mp4", seconds=8)
+
+    window = find_active_window(clip)
+
+    assert not window["motion_detected"]
+    assert window["start_frame"] == 0 and window["end_frame"] == int(swing_frames.SWING_WINDOW_SECONDS * FPS)
+
+def test_swing_features_time_the_backswing_against_the_downswing():
+    # Motion builds, nearly stops at the top, then peaks sharply at impact
+    steps = [2, 6, 7, 7, 6, 5, 1, 4, 9, 20, 5]
+    frames = np.cumsum([np.zeros((4, 4))] + [np.full((4, 4), step) for step in steps], axis=0).astype(np.uint8)
+
+    features = extract_swing_features(frames, fps=30.0)
+
+    assert features["impact_frame"] == 10
+    # Takeaway at 2, top at 6, impact at 9: four steps back, three down
+    assert features["tempo_ratio"] == 1.33
+    assert max(features["motion_profile"]) == 1.0
+
+def test_frames_round_trip_through_shared_memory():
+    frames = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+    shm, descriptor = frames_to_shared(frames)
+    try:
+        attached, view = attach_shared_frames(descriptor)
+        assert np.array_equal(view, frames)
+        del view
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
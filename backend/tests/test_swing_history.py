@@ -0,0 +1,59 @@
+import random
+
+from backend.app.services.swing_history import DAY_SECONDS, SwingHistoryStore
+
+NOW = 1_700_000_000.0
+
+def analysis(rating):
+    return {"overall_rating": rating, "mechanics_breakdown": {"tempo": int(rating * 10)}}
+
+def test_each_store_sees_the_others_analyses(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    first, second = SwingHistoryStore(path), SwingHistoryStore(path)
+
+    first.record("p1", analysis(7.0), timestamp=NOW - DAY_SECONDS)
+    second.record("p1", analysis(8.0), timestamp=NOW)
+
+    for store in (first, second):
+        history = store.history("p1", now=NOW)
+        assert history["total_analyses"] == 2
+        assert history["rollups"]["7d"]["avg_rating"] == 7.5
+
+def test_a_partly_written_line_waits_for_the_next_read(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = SwingHistoryStore(str(path))
+    store.record("p1", analysis(7.0), timestamp=NOW)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"player_id": "p1", "timestamp": ')
+
+    assert store.history("p1", now=NOW)["total_analyses"] == 1
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f'{NOW}, "overall_rating": 9.0, "mechanics": {{}}, "analysis_id": "ana_late"}}\n')
+    assert store.history("p1", now=NOW)["total_analyses"] == 2
+
+def test_out_of_order_analyses_match_an_in_order_history(tmp_path):
+    ratings = [(NOW - day * DAY_SECONDS, float(day % 10)) for day in range(60)]
+    shuffled = SwingHistoryStore(None)
+    ordered = SwingHistoryStore(None)
+    for timestamp, rating in random.Random(7).sample(ratings, len(ratings)):
+        shuffled.record("p1", analysis(rating), timestamp=timestamp)
+    for timestamp, rating in sorted(ratings):
+        ordered.record("p1", analysis(rating), timestamp=timestamp)
+
+    assert shuffled.trends("p1", now=NOW) == ordered.trends("p1", now=NOW)
+    recent = shuffled.history("p1", limit=5, now=NOW)["recent_analyses"]
+    assert [r["overall_rating"] for r in recent] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_record_once_skips_a_clip_the_player_already_has(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = SwingHistoryStore(path)
+    clip = {**analysis(7.0), "content_hash": "abc"}
+
+    first = store.record_once("p1", clip, timestamp=NOW)
+    assert store.record_once("p1", clip, timestamp=NOW + 60) == first
+    assert store.record_once("p2", clip, timestamp=NOW) != first
+    # Another worker sees the clip through the shared log
+    assert SwingHistoryStore(path).record_once("p1", clip, timestamp=NOW + 120) == first
+
+    assert store.history("p1", now=NOW)["total_analyses"] == 1
+    assert store.history("p2", now=NOW)["total_analyses"] == 1
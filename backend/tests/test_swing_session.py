@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.services import analysis_cache, swing_history, swing_session, swing_workers
+from backend.app.services.analysis_cache import AnalysisCache
+from backend.app.services.swing_history import SwingHistoryStore
+from backend.app.services.swing_session import analyze_session
+
+CLIPS = [f"https://media.example.com/range/clip{i}.mp4" for i in range(3)]
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    store = SwingHistoryStore(str(tmp_path / "history.jsonl"))
+    monkeypatch.setattr(swing_history, "_history_store", store)
+    monkeypatch.setattr(analysis_cache, "_analysis_cache", AnalysisCache(None))
+    monkeypatch.setattr(swing_workers, "MEDIA_DOWNLOADS_ENABLED", False)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(swing_session, "get_swing_pool", lambda: pool)
+    yield store
+    pool.shutdown()
+
+def test_a_session_reports_every_clip_and_its_consistency(history):
+    session = analyze_session(CLIPS, player_id="p1")
+
+    assert session["clip_count"] == 3
+    assert [clip["index"] for clip in session["clips"]] == [0, 1, 2]
+    assert set(session["session_stats"]) >= {"overall_rating", "mechanics", "tempo_drift", "consistency_score"}
+
+def test_a_resubmitted_session_is_recorded_once(history):
+    analyze_session(CLIPS, player_id="p1")
+    analyze_session(CLIPS + [CLIPS[0]], player_id="p1")
+
+    assert history.history("p1")["total_analyses"] == 3
+
+def test_sessions_are_bounded(history):
+    with pytest.raises(ValueError):
+        analyze_session([])
+    with pytest.raises(ValueError):
+        analyze_session(["https://media.example.com/clip.mp4"] * (swing_session.MAX_SESSION_CLIPS + 1))
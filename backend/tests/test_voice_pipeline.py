@@ -0,0 +1,75 @@
+import wave
+
+import numpy as np
+import pytest
+
+from backend.app.services import media_processor, swing_frames, voice_pipeline
+from backend.app.services.voice_pipeline import (
+    SAMPLE_RATE, StubTranscriber, WhisperTranscriber, create_transcriber_from_env, detect_speech_segments
+)
+
+@pytest.fixture(autouse=True)
+def media_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(swing_frames, "LOCAL_MEDIA_DIRS", [str(tmp_path)])
+    monkeypatch.setattr(media_processor, "VOICE_TRANSCRIPTION_ENABLED", True)
+
+@pytest.fixture
+def use_transcriber(monkeypatch):
+    def use(transcriber):
+        monkeypatch.setattr(voice_pipeline, "_transcriber", transcriber)
+        monkeypatch.setattr(voice_pipeline, "_transcriber_loaded", True)
+    return use
+
+def tone(seconds, amplitude):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+def write_wav(path, samples):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return str(path)
+
+def test_speech_at_the_very_start_is_detected():
+    audio = np.concatenate([tone(0.6, 8000), tone(0.4, 50), tone(0.6, 8000), tone(0.4, 50)])
+    chunks = [audio[i:i + SAMPLE_RATE] for i in range(0, len(audio), SAMPLE_RATE)]
+
+    segments = list(detect_speech_segments(iter(chunks)))
+
+    assert len(segments) == 2
+    assert segments[0].start_s == 0.0
+
+def test_transcription_is_off_unless_a_backend_is_configured(tmp_path, monkeypatch, use_transcriber):
+    monkeypatch.delenv("VOICE_TRANSCRIBER", raising=False)
+    assert create_transcriber_from_env() is None
+    use_transcriber(None)
+    clip = write_wav(tmp_path / "morning.wav", np.concatenate([tone(0.6, 8000), tone(0.4, 50)]))
+
+    assert media_processor.transcribe_media(clip) is None
+    assert media_processor.extract_voice_tag(clip) == "Morning practice session on driving range"
+
+def test_the_stub_transcriber_must_be_chosen_explicitly(tmp_path, monkeypatch, use_transcriber):
+    monkeypatch.setenv("VOICE_TRANSCRIBER", "stub")
+    assert isinstance(create_transcriber_from_env(), StubTranscriber)
+    use_transcriber(StubTranscriber())
+    clip = write_wav(tmp_path / "clip.wav", np.concatenate([tone(0.6, 8000), tone(0.4, 50)]))
+
+    assert media_processor.extract_voice_tag(clip) in StubTranscriber.PHRASES
+
+def test_transcription_service_errors_fall_back_to_the_keyword_tag(standin, tmp_path, use_transcriber):
+    standin.on("POST", "/v1/audio/transcriptions", lambda request: (503, {}, {"error": "overloaded"}))
+    use_transcriber(WhisperTranscriber("key", api_base=standin.url("/v1")))
+    clip = write_wav(tmp_path / "bunker.wav", np.concatenate([tone(0.6, 8000), tone(0.4, 50)]))
+
+    assert media_processor.transcribe_media(clip) is None
+    assert media_processor.extract_voice_tag(clip) == "Bunker shot practice"
+    assert standin.seen("POST", "/v1/audio/transcriptions")
+
+def test_undecodable_wav_gives_no_transcript(tmp_path, use_transcriber):
+    use_transcriber(StubTranscriber())
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"RIFF....not a wav")
+
+    assert media_processor.transcribe_media(str(path)) is None